@@ -21,6 +21,8 @@ def create_app():
     from routes.geofence import geofence_bp
     from routes.agentic import agentic_bp
     from routes.transaction_scoring import transaction_scoring_bp
+    from routes.models_admin import models_admin_bp
+    from routes.obligations import obligations_bp
 
     app.register_blueprint(agentic_bp, url_prefix="")
     app.register_blueprint(location_bp, url_prefix="")
@@ -30,7 +32,20 @@ def create_app():
     app.register_blueprint(rules_bp)
     app.register_blueprint(analytics_bp, url_prefix="")
     app.register_blueprint(transaction_scoring_bp, url_prefix="")
+    app.register_blueprint(models_admin_bp, url_prefix="")
+    app.register_blueprint(obligations_bp, url_prefix="")
 
+    # The planner reads obligations from the database once an app is bound
+    from services.obligations_store import bind_app
+    bind_app(app)
+
+    # Daily obligations summaries precompute (OBLIGATIONS_PRECOMPUTE_AT)
+    from services.obligations_precompute import start_precompute_schedule
+    start_precompute_schedule(database_uri=app.config["SQLALCHEMY_DATABASE_URI"])
+
+    if app.config["WARMUP_ON_START"]:
+        from services.transaction_scorer import warmup
+        warmup()
 
     # debug token route already added earlier; keep /whoami too
     return app
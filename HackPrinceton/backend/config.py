@@ -12,9 +12,48 @@ class Config:
     PAYMENTS_PROVIDER = os.getenv("PAYMENTS_PROVIDER", "mock")
     #STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET", "")
     CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "*")
+    ADMIN_API_TOKEN = os.environ.get("ADMIN_API_TOKEN", "")
+    # Without ADMIN_API_TOKEN admin endpoints answer 403 unless this is set (local/dev only)
+    ADMIN_API_OPEN = os.environ.get("ADMIN_API_OPEN", "false").lower() == "true"
+    # Load scoring models and data in create_app() instead of on first request
+    WARMUP_ON_START = os.environ.get("WARMUP_ON_START", "false").lower() == "true"
 
 
 # Transaction Scoring Configuration
+# "sklearn" runs guardian_pipeline.pkl as-is, "compiled" uses the pure-NumPy scorer
+SCORER_BACKEND = os.environ.get("SCORER_BACKEND", "sklearn")
+# How often each worker re-reads models/manifest.json to follow activations (0 = never)
+MODEL_MANIFEST_POLL_SECONDS = float(os.environ.get("MODEL_MANIFEST_POLL_SECONDS", "5"))
+
+# Micro-batching of concurrent /score-transaction calls; a window of 0 ms disables it
+SCORING_BATCH_WINDOW_MS = float(os.environ.get("SCORING_BATCH_WINDOW_MS", "0"))
+SCORING_BATCH_MAX_SIZE = int(os.environ.get("SCORING_BATCH_MAX_SIZE", "64"))
+# Transactions scored per model call by the NDJSON streaming endpoint
+STREAM_SCORING_BATCH_SIZE = int(os.environ.get("STREAM_SCORING_BATCH_SIZE", "256"))
+
+# Where scorer and geo-guardian state lives: "sqlite" is shared by all local
+# workers and survives restarts, "memory" is per process
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "sqlite")
+# SQLite file for the "sqlite" backend (empty = backend/state.db)
+STATE_DB_PATH = os.environ.get("STATE_DB_PATH", "")
+SPEND_CACHE_SIZE = int(os.environ.get("SPEND_CACHE_SIZE", "10000"))
+# Directory written by `python -m services.profile_store`; when set, user
+# profiles are memory-mapped from it instead of parsed from the CSV
+PROFILE_STORE_DIR = os.environ.get("PROFILE_STORE_DIR", "")
+
+# Registered model versions scored in shadow next to the active one
+# (comma-separated; empty = shadow evaluation off)
+SHADOW_MODEL_VERSIONS = [v.strip() for v in os.environ.get("SHADOW_MODEL_VERSIONS", "").split(",") if v.strip()]
+SHADOW_MAX_WORKERS = int(os.environ.get("SHADOW_MAX_WORKERS", "2"))
+# Transactions waiting for or in shadow scoring; more than this are dropped
+SHADOW_MAX_PENDING = int(os.environ.get("SHADOW_MAX_PENDING", "1000"))
+# CSV log of primary vs shadow results (empty = backend/logs/shadow_eval.csv)
+SHADOW_LOG_PATH = os.environ.get("SHADOW_LOG_PATH", "")
+
+# Per-stage latency histograms for transaction scoring (GET
+# /score-transaction/stage-timings); per-request breakdowns work either way
+STAGE_TIMING_ENABLED = os.environ.get("STAGE_TIMING_ENABLED", "false").lower() == "true"
+
 CATEGORIES = [
     "RENT_BILLS",
     "GROCERIES",
@@ -54,6 +93,54 @@ CATEGORY_MCC = {
     "MISC_ONLINE": 5999,
 }
 
+# Inclusive MCC ranges per category; exact CATEGORY_MCC codes take precedence
+CATEGORY_MCC_RANGES = [
+    (4111, 4131, "TRANSPORT"),        # commuter transport, taxis, bus lines
+    (4784, 4784, "TRANSPORT"),        # tolls
+    (5541, 5542, "TRANSPORT"),        # service stations, fuel dispensers
+    (7523, 7523, "TRANSPORT"),        # parking
+    (4900, 4900, "RENT_BILLS"),       # utilities
+    (6513, 6513, "RENT_BILLS"),       # real estate agents and managers - rentals
+    (5411, 5411, "GROCERIES"),        # grocery stores, supermarkets
+    (5422, 5499, "GROCERIES"),        # meat, dairy, bakeries, misc food stores
+    (5811, 5812, "FAST_FOOD"),        # caterers, restaurants
+    (5813, 5813, "ALCOHOL"),          # bars, taverns, nightclubs
+    (5814, 5814, "FAST_FOOD"),        # fast food restaurants
+    (5921, 5921, "ALCOHOL"),          # package stores - beer, wine, liquor
+    (5611, 5699, "CLOTHING"),         # apparel and accessory shops
+    (5045, 5045, "ELECTRONICS"),      # computers and peripherals
+    (5722, 5722, "ELECTRONICS"),      # household appliance stores
+    (5731, 5734, "ELECTRONICS"),      # electronics, computer and software stores
+    (5122, 5122, "PHARMACY_HEALTH"),  # drugs and druggist sundries
+    (5912, 5912, "PHARMACY_HEALTH"),  # drug stores and pharmacies
+    (8011, 8099, "PHARMACY_HEALTH"),  # doctors, dentists, medical services
+    (4899, 4899, "SUBSCRIPTION"),     # cable, satellite and streaming services
+    (5815, 5818, "SUBSCRIPTION"),     # digital goods
+    (5964, 5969, "MISC_ONLINE"),      # direct marketing
+    (5999, 5999, "MISC_ONLINE"),      # misc and specialty retail
+]
+
+# Per-user lock stripes guarding read-modify-write of scorer state
+SCORER_LOCK_STRIPES = int(os.environ.get("SCORER_LOCK_STRIPES", "1024"))
+
+# Dedupe window for retried /score-transaction calls carrying an idempotency key
+IDEMPOTENCY_TTL_SECONDS = float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", "100000"))
+
+# Per-user obligations planner summaries (LRU, also dropped at day change)
+OBLIGATIONS_CACHE_MAX_ENTRIES = int(os.environ.get("OBLIGATIONS_CACHE_MAX_ENTRIES", "100000"))
+OBLIGATIONS_CACHE_TTL_SECONDS = float(os.environ.get("OBLIGATIONS_CACHE_TTL_SECONDS", "3600"))
+# Recurring obligation rules expanded into concrete occurrences, cached per
+# (rule, month)
+RECURRING_EXPANSION_CACHE_SIZE = int(os.environ.get("RECURRING_EXPANSION_CACHE_SIZE", "65536"))
+# Daily batch precompute of every user's summary into the state backend:
+# "HH:MM" (UTC) runs it in-process once a day, empty leaves it to the CLI
+OBLIGATIONS_PRECOMPUTE_AT = os.environ.get("OBLIGATIONS_PRECOMPUTE_AT", "")
+# Worker processes for the precompute job (0 = one per CPU)
+OBLIGATIONS_PRECOMPUTE_WORKERS = int(os.environ.get("OBLIGATIONS_PRECOMPUTE_WORKERS", "0"))
+
+CATEGORY_CACHE_SIZE = int(os.environ.get("CATEGORY_CACHE_SIZE", "65536"))
+
 CATEGORY_BUDGET_RATIOS = {
     "RENT_BILLS": 0.30,
     "GROCERIES": 0.15,
@@ -149,6 +236,18 @@ OBLIGATION_CATEGORIES = {
     "GIFT": "optional",
 }
 
+# Largest DP table (items x budget cents) the exact knapsack fills before
+# switching to a DP over importance values; one byte per cell
+KNAPSACK_MAX_DP_CELLS = int(os.environ.get("KNAPSACK_MAX_DP_CELLS", "20000000"))
+
+# Optional-obligations solver: "exact", "greedy" or "qaoa". qaoa runs in a
+# process pool and falls back to the exact answer after the timeout
+OBLIGATIONS_SOLVER = os.environ.get("OBLIGATIONS_SOLVER", "exact")
+OBLIGATIONS_SOLVER_TIMEOUT_MS = float(os.environ.get("OBLIGATIONS_SOLVER_TIMEOUT_MS", "2000"))
+OBLIGATIONS_SOLVER_POOL_SIZE = int(os.environ.get("OBLIGATIONS_SOLVER_POOL_SIZE", "1"))
+# Memoized solves, keyed by the (amount, importance) multiset and the budget
+KNAPSACK_MEMO_SIZE = int(os.environ.get("KNAPSACK_MEMO_SIZE", "10000"))
+
 SAFETY_BUFFER_RATIO = 0.10
 SAVINGS_GOAL_RATIO = 0.15
 BASELINE_ESSENTIALS_RATIO = 0.30
@@ -8,6 +8,26 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
+from services.model_compiler import compile_pipeline, save_compiled
+from services.model_registry import register_version
+
+
+FEATURE_COLS_NUM = ["amount", "hour_of_day", "day_of_week", "saver_score"]
+FEATURE_COLS_CAT = ["base_category", "micro_category", "channel"]
+
+
+def build_pipeline() -> Pipeline:
+    numeric_transformer = StandardScaler()
+    categorical_transformer = OneHotEncoder(handle_unknown="ignore")
+    preprocess = ColumnTransformer(
+        transformers=[
+            ("num", numeric_transformer, FEATURE_COLS_NUM),
+            ("cat", categorical_transformer, FEATURE_COLS_CAT),
+        ]
+    )
+    clf = LogisticRegression(max_iter=1000, class_weight="balanced")
+    return Pipeline(steps=[("preprocess", preprocess), ("model", clf)])
+
 
 def main():
     base_dir = Path(__file__).resolve().parent
@@ -40,8 +60,8 @@ def main():
     if kmeans is not None:
         micro = kmeans.predict(df.loc[mask_g, ["amount", "hour_of_day", "day_of_week"]])
         df.loc[mask_g, "micro_category"] = micro.astype(str)
-    feature_cols_num = ["amount", "hour_of_day", "day_of_week", "saver_score"]
-    feature_cols_cat = ["base_category", "micro_category", "channel"]
+    feature_cols_num = FEATURE_COLS_NUM
+    feature_cols_cat = FEATURE_COLS_CAT
     missing_cols = [c for c in feature_cols_num + feature_cols_cat if c not in df.columns]
     if missing_cols:
         raise ValueError(f"Missing expected columns in df: {missing_cols}")
@@ -50,20 +70,15 @@ def main():
         raise ValueError("Column 'label_avoidable' not found in data.")
     y = df["label_avoidable"]
     print("Fitting logistic regression (guardian_pipeline) ...")
-    numeric_transformer = StandardScaler()
-    categorical_transformer = OneHotEncoder(handle_unknown="ignore")
-    preprocess = ColumnTransformer(
-        transformers=[
-            ("num", numeric_transformer, feature_cols_num),
-            ("cat", categorical_transformer, feature_cols_cat),
-        ]
-    )
-    clf = LogisticRegression(max_iter=1000, class_weight="balanced")
-    pipe = Pipeline(steps=[("preprocess", preprocess), ("model", clf)])
+    pipe = build_pipeline()
     pipe.fit(X, y)
     pipeline_path = models_dir / "guardian_pipeline.pkl"
     joblib.dump(pipe, pipeline_path)
     print(f"Saved {pipeline_path}")
+    compiled_path = save_compiled(compile_pipeline(pipe), models_dir / "guardian_pipeline.compiled.json")
+    print(f"Saved {compiled_path}")
+    version = register_version(models_dir)
+    print(f"Registered model version {version} (activate it via POST /admin/models/activate)")
     print("Done.")
 
 
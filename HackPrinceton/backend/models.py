@@ -94,3 +94,49 @@ class UserLocationPing(db.Model):
     longitude = db.Column(db.Float, nullable=False)
     accuracy_m = db.Column(db.Float)                         # optional GPS accuracy
     ts = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class Obligation(db.Model):
+    __tablename__ = "obligations"
+    id = db.Column(db.Integer, primary_key=True)
+    # Same ids the transaction scorer uses ("u1", or str(user.id) from the JWT)
+    user_id = db.Column(db.String(64), nullable=False)
+    event_id = db.Column(db.String(64))                      # external id, e.g. from obligations.csv
+
+    name = db.Column(db.String(128), nullable=False)
+    category = db.Column(db.String(32))                      # RENT_BILLS, TRIP, GIFT, ...
+    amount_cents = db.Column(db.Integer, nullable=False)
+    due_date = db.Column(db.DateTime, nullable=False)
+    mandatory = db.Column(db.Boolean, nullable=False, default=False)
+    importance = db.Column(db.Float, nullable=False, default=3.0)  # 1 (low) .. 5 (high)
+    min_pay_date = db.Column(db.DateTime)
+    max_pay_date = db.Column(db.DateTime)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+Index("ix_obligations_user_due", Obligation.user_id, Obligation.due_date)
+
+
+# Rule for an obligation that repeats (rent, subscriptions, bills); the
+# planner expands it into occurrences only for the horizon it looks at
+class RecurringObligation(db.Model):
+    __tablename__ = "recurring_obligations"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(64), nullable=False)
+    rule_id = db.Column(db.String(64))                       # external id, e.g. from recurring_obligations.csv
+
+    name = db.Column(db.String(128), nullable=False)
+    category = db.Column(db.String(32))
+    amount_cents = db.Column(db.Integer, nullable=False)
+    frequency = db.Column(db.String(16), nullable=False, default="monthly")  # monthly / quarterly / yearly
+    day_of_month = db.Column(db.Integer, nullable=False)     # clamped to short months
+    start_date = db.Column(db.DateTime, nullable=False)
+    end_date = db.Column(db.DateTime)                        # null = open-ended
+    mandatory = db.Column(db.Boolean, nullable=False, default=True)
+    importance = db.Column(db.Float, nullable=False, default=5.0)
+    pay_window_days = db.Column(db.Integer, nullable=False, default=0)  # may pay this many days early
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+Index("ix_recurring_obligations_user", RecurringObligation.user_id)
@@ -1,5 +1,5 @@
 # routes/__init__.py
-import time, requests
+import hmac, time, requests
 from jose import jwt, JWTError
 from flask import request, abort, current_app
 from models import db, User
@@ -57,3 +57,14 @@ def get_current_user_id() -> int:
         db.session.commit()
 
     return user.id
+
+def require_admin_token() -> None:
+    # Fails closed: with no ADMIN_API_TOKEN configured admin endpoints are
+    # only reachable when ADMIN_API_OPEN is set (local/dev)
+    expected = current_app.config.get("ADMIN_API_TOKEN")
+    if not expected:
+        if current_app.config.get("ADMIN_API_OPEN"):
+            return
+        abort(403, description="admin endpoints disabled: ADMIN_API_TOKEN is not set")
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode(), expected.encode()):
+        abort(403, description="admin token required")
@@ -22,12 +22,13 @@ def issuing():
         card_id = obj["card"]
         amount = obj["amount"]
         merchant = obj["merchant_data"]["name"]
+        mcc = obj["merchant_data"].get("category_code") or 0
         # map card -> user
         user = User.query.filter_by(guardian_card_id=card_id).first()
         if not user:
             stripe.issuing.Authorizations.decline(auth_id)
             return jsonify({"status":"declined","reason":"unknown_card"}), 200
-        decision, reason = apply_guardian_logic(user.id, int(amount), merchant, None)
+        decision, reason = apply_guardian_logic(user.id, int(amount), merchant, None, mcc=int(mcc))
         if decision == "APPROVE":
             stripe.issuing.Authorizations.approve(auth_id)
         else:
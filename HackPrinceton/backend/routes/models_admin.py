@@ -0,0 +1,49 @@
+# routes/models_admin.py
+from flask import Blueprint, request, jsonify
+from routes import require_admin_token
+from services import model_registry
+
+models_admin_bp = Blueprint("models_admin", __name__)
+
+
+@models_admin_bp.get("/admin/models")
+def list_models():
+    require_admin_token()
+    return jsonify({
+        "versions": model_registry.list_versions(),
+        "status": model_registry.get_status(),
+    })
+
+
+@models_admin_bp.post("/admin/models/activate")
+def activate_model():
+    """
+    Body: {"version": "20251109-101500", "wait": false}
+    Loads the version in the background and swaps it in once fully loaded;
+    pass "wait": true to block until the swap has happened.
+    """
+    require_admin_token()
+    data = request.get_json(force=True) or {}
+    version = data.get("version")
+    if not version:
+        return jsonify({"error": "version required"}), 400
+    wait = bool(data.get("wait", False))
+    try:
+        status = model_registry.activate(version, background=not wait)
+    except model_registry.LoadInProgress as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    return jsonify(status), (200 if wait else 202)
+
+
+@models_admin_bp.post("/admin/models/rollback")
+def rollback_model():
+    require_admin_token()
+    data = request.get_json(silent=True) or {}
+    wait = bool(data.get("wait", False))
+    try:
+        status = model_registry.rollback(background=not wait)
+    except (ValueError, model_registry.LoadInProgress) as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(status), (200 if wait else 202)
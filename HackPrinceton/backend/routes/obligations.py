@@ -0,0 +1,375 @@
+# routes/obligations.py
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from models import db, Obligation, RecurringObligation
+from routes import get_current_user_id, require_admin_token
+from services.obligations_planner import (
+    DATA_DIR,
+    get_obligations_cache_stats,
+    invalidate_obligations_summary,
+)
+from services.obligations_quantum import get_knapsack_memo_stats
+from services.obligations_recurring import RecurringRulesIndex, validate_rule
+from services.obligations_store import ObligationsIndex
+
+obligations_bp = Blueprint("obligations", __name__)
+
+_DATE_FIELDS = ("due_date", "min_pay_date", "max_pay_date")
+
+
+def _current_user_id() -> str:
+    # Obligations use the scorer's user ids; here the authenticated user's
+    # id as a string. Other users' rows are only reachable on /admin routes.
+    return str(get_current_user_id())
+
+
+def _parse_date(value, field):
+    if value in (None, ""):
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"{field} must be an ISO date")
+
+
+def _apply_fields(ob: Obligation, data: dict) -> None:
+    """
+    Copy the fields present in data onto ob. Raises ValueError with a
+    message for the client.
+    """
+    if "name" in data:
+        name = (data.get("name") or "").strip()
+        if not name:
+            raise ValueError("name must not be empty")
+        ob.name = name
+    if "event_id" in data:
+        ob.event_id = data.get("event_id") or None
+    if "category" in data:
+        ob.category = (data.get("category") or "").upper() or None
+    if "amount" in data:
+        amount = float(data["amount"])
+        if amount < 0:
+            raise ValueError("amount must be >= 0")
+        ob.amount_cents = int(round(amount * 100))
+    if "mandatory" in data:
+        ob.mandatory = bool(data["mandatory"])
+    if "importance" in data:
+        ob.importance = float(data["importance"])
+    for field in _DATE_FIELDS:
+        if field in data:
+            parsed = _parse_date(data[field], field)
+            if field == "due_date" and parsed is None:
+                raise ValueError("due_date must not be empty")
+            setattr(ob, field, parsed)
+
+
+def _to_dict(ob: Obligation) -> dict:
+    return {
+        "id": ob.id,
+        "user_id": ob.user_id,
+        "event_id": ob.event_id,
+        "name": ob.name,
+        "category": ob.category,
+        "amount": ob.amount_cents / 100.0,
+        "due_date": ob.due_date.isoformat(),
+        "mandatory": ob.mandatory,
+        "importance": ob.importance,
+        "min_pay_date": ob.min_pay_date.isoformat() if ob.min_pay_date else None,
+        "max_pay_date": ob.max_pay_date.isoformat() if ob.max_pay_date else None,
+    }
+
+
+@obligations_bp.post("/obligations")
+def create_obligation():
+    """
+    Body: {"name", "amount", "due_date", "category", "mandatory",
+           "importance", "min_pay_date", "max_pay_date", "event_id"}
+    The obligation belongs to the authenticated user.
+    """
+    data = request.get_json(force=True) or {}
+    if data.get("name") is None or data.get("amount") is None or not data.get("due_date"):
+        return jsonify({"error": "name, amount and due_date are required"}), 400
+
+    ob = Obligation(user_id=_current_user_id(), mandatory=False, importance=3.0)
+    try:
+        _apply_fields(ob, data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    db.session.add(ob)
+    db.session.commit()
+    invalidate_obligations_summary(ob.user_id)
+    return jsonify(_to_dict(ob)), 201
+
+
+@obligations_bp.get("/obligations")
+def list_obligations():
+    """
+    The authenticated user's obligations. Query: start / end (ISO dates,
+    optional) to limit the due_date window.
+    """
+    uid = _current_user_id()
+    try:
+        start = _parse_date(request.args.get("start"), "start")
+        end = _parse_date(request.args.get("end"), "end")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    q = Obligation.query.filter(Obligation.user_id == uid)
+    if start:
+        q = q.filter(Obligation.due_date >= start)
+    if end:
+        q = q.filter(Obligation.due_date <= end)
+    rows = q.order_by(Obligation.due_date, Obligation.id).all()
+    return jsonify([_to_dict(r) for r in rows])
+
+
+@obligations_bp.route("/obligations/<int:oid>", methods=["PUT", "PATCH"])
+def update_obligation(oid: int):
+    data = request.get_json(force=True) or {}
+    uid = _current_user_id()
+    ob = Obligation.query.filter_by(id=oid, user_id=uid).first()
+    if not ob:
+        return jsonify({"error": "not found"}), 404
+    try:
+        _apply_fields(ob, data)
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+    db.session.commit()
+    invalidate_obligations_summary(uid)
+    return jsonify(_to_dict(ob))
+
+
+@obligations_bp.delete("/obligations/<int:oid>")
+def delete_obligation(oid: int):
+    uid = _current_user_id()
+    ob = Obligation.query.filter_by(id=oid, user_id=uid).first()
+    if not ob:
+        return jsonify({"error": "not found"}), 404
+    db.session.delete(ob)
+    db.session.commit()
+    invalidate_obligations_summary(uid)
+    return jsonify({"status": "deleted"})
+
+
+_RULE_DATE_FIELDS = ("start_date", "end_date")
+
+
+def _apply_rule_fields(rule: RecurringObligation, data: dict) -> None:
+    """
+    Copy the fields present in data onto rule and validate the result.
+    Raises ValueError with a message for the client.
+    """
+    if "name" in data:
+        name = (data.get("name") or "").strip()
+        if not name:
+            raise ValueError("name must not be empty")
+        rule.name = name
+    if "rule_id" in data:
+        rule.rule_id = data.get("rule_id") or None
+    if "category" in data:
+        rule.category = (data.get("category") or "").upper() or None
+    if "amount" in data:
+        amount = float(data["amount"])
+        if amount < 0:
+            raise ValueError("amount must be >= 0")
+        rule.amount_cents = int(round(amount * 100))
+    if "frequency" in data:
+        rule.frequency = str(data["frequency"] or "").lower()
+    if "day_of_month" in data:
+        rule.day_of_month = int(data["day_of_month"])
+    if "mandatory" in data:
+        rule.mandatory = bool(data["mandatory"])
+    if "importance" in data:
+        rule.importance = float(data["importance"])
+    if "pay_window_days" in data:
+        rule.pay_window_days = int(data["pay_window_days"] or 0)
+    for field in _RULE_DATE_FIELDS:
+        if field in data:
+            parsed = _parse_date(data[field], field)
+            if field == "start_date" and parsed is None:
+                raise ValueError("start_date must not be empty")
+            setattr(rule, field, parsed)
+    validate_rule(rule)
+
+
+def _rule_to_dict(rule: RecurringObligation) -> dict:
+    return {
+        "id": rule.id,
+        "user_id": rule.user_id,
+        "rule_id": rule.rule_id,
+        "name": rule.name,
+        "category": rule.category,
+        "amount": rule.amount_cents / 100.0,
+        "frequency": rule.frequency,
+        "day_of_month": rule.day_of_month,
+        "start_date": rule.start_date.isoformat(),
+        "end_date": rule.end_date.isoformat() if rule.end_date else None,
+        "mandatory": rule.mandatory,
+        "importance": rule.importance,
+        "pay_window_days": rule.pay_window_days,
+    }
+
+
+@obligations_bp.post("/obligations/recurring")
+def create_recurring_obligation():
+    """
+    Body: {"name", "amount", "day_of_month", "start_date",
+           "frequency" ("monthly" | "quarterly" | "yearly"), "end_date",
+           "category", "mandatory", "importance", "pay_window_days",
+           "rule_id"}
+    The rule belongs to the authenticated user.
+    """
+    data = request.get_json(force=True) or {}
+    if (data.get("name") is None or data.get("amount") is None
+            or data.get("day_of_month") is None or not data.get("start_date")):
+        return jsonify({"error": "name, amount, day_of_month and start_date are required"}), 400
+
+    rule = RecurringObligation(
+        user_id=_current_user_id(),
+        frequency="monthly",
+        mandatory=True,
+        importance=5.0,
+        pay_window_days=0,
+    )
+    try:
+        _apply_rule_fields(rule, data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    db.session.add(rule)
+    db.session.commit()
+    invalidate_obligations_summary(rule.user_id)
+    return jsonify(_rule_to_dict(rule)), 201
+
+
+@obligations_bp.get("/obligations/recurring")
+def list_recurring_obligations():
+    uid = _current_user_id()
+    rules = (
+        RecurringObligation.query
+        .filter(RecurringObligation.user_id == uid)
+        .order_by(RecurringObligation.id)
+        .all()
+    )
+    return jsonify([_rule_to_dict(r) for r in rules])
+
+
+@obligations_bp.route("/obligations/recurring/<int:rid>", methods=["PUT", "PATCH"])
+def update_recurring_obligation(rid: int):
+    data = request.get_json(force=True) or {}
+    uid = _current_user_id()
+    rule = RecurringObligation.query.filter_by(id=rid, user_id=uid).first()
+    if not rule:
+        return jsonify({"error": "not found"}), 404
+    try:
+        _apply_rule_fields(rule, data)
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+    db.session.commit()
+    invalidate_obligations_summary(uid)
+    return jsonify(_rule_to_dict(rule))
+
+
+@obligations_bp.delete("/obligations/recurring/<int:rid>")
+def delete_recurring_obligation(rid: int):
+    uid = _current_user_id()
+    rule = RecurringObligation.query.filter_by(id=rid, user_id=uid).first()
+    if not rule:
+        return jsonify({"error": "not found"}), 404
+    db.session.delete(rule)
+    db.session.commit()
+    invalidate_obligations_summary(uid)
+    return jsonify({"status": "deleted"})
+
+
+@obligations_bp.get("/obligations/cache-stats")
+def obligations_cache_stats():
+    return jsonify({**get_obligations_cache_stats(), "knapsack_memo": get_knapsack_memo_stats()})
+
+
+@obligations_bp.delete("/admin/obligations/cache")
+def clear_obligations_cache():
+    """
+    Query: user_id (optional); without it every cached summary is dropped.
+    """
+    require_admin_token()
+    invalidate_obligations_summary(request.args.get("user_id") or None)
+    return jsonify(get_obligations_cache_stats())
+
+
+@obligations_bp.post("/admin/obligations/import")
+def import_obligations_csv():
+    """
+    Seed the obligations table from data/obligations.csv, and the
+    recurring rules from data/recurring_obligations.csv when present. Rows
+    whose (user_id, event_id) or (user_id, rule_id) already exist are
+    skipped.
+    """
+    require_admin_token()
+    csv_path = DATA_DIR / "obligations.csv"
+    if not csv_path.exists():
+        return jsonify({"error": "obligations.csv not found"}), 404
+
+    existing = set(db.session.query(Obligation.user_id, Obligation.event_id).all())
+    imported = skipped = 0
+    users = set()
+    for user_id, ob in ObligationsIndex.from_csv(csv_path).records():
+        if (user_id, ob.event_id) in existing:
+            skipped += 1
+            continue
+        db.session.add(Obligation(
+            user_id=user_id,
+            event_id=ob.event_id,
+            name=ob.name,
+            category=ob.category,
+            amount_cents=int(round(ob.amount * 100)),
+            due_date=ob.due_date,
+            mandatory=ob.mandatory,
+            importance=ob.importance,
+            min_pay_date=ob.min_pay_date,
+            max_pay_date=ob.max_pay_date,
+        ))
+        imported += 1
+        users.add(user_id)
+
+    rules_imported = 0
+    rules_path = DATA_DIR / "recurring_obligations.csv"
+    if rules_path.exists():
+        try:
+            rules_index = RecurringRulesIndex.from_csv(rules_path)
+        except (KeyError, ValueError) as e:
+            db.session.rollback()
+            return jsonify({"error": f"recurring_obligations.csv: {e}"}), 400
+        existing_rules = set(
+            db.session.query(RecurringObligation.user_id, RecurringObligation.rule_id).all()
+        )
+        for user_id, rule in rules_index.records():
+            if (user_id, rule.rule_id) in existing_rules:
+                skipped += 1
+                continue
+            db.session.add(RecurringObligation(
+                user_id=user_id,
+                rule_id=rule.rule_id,
+                name=rule.name,
+                category=rule.category,
+                amount_cents=int(round(rule.amount * 100)),
+                frequency=rule.frequency,
+                day_of_month=rule.day_of_month,
+                start_date=rule.start_date,
+                end_date=rule.end_date,
+                mandatory=rule.mandatory,
+                importance=rule.importance,
+                pay_window_days=rule.pay_window_days,
+            ))
+            rules_imported += 1
+            users.add(user_id)
+
+    db.session.commit()
+    for user_id in users:
+        invalidate_obligations_summary(user_id)
+    return jsonify({"imported": imported, "recurring_imported": rules_imported, "skipped": skipped})
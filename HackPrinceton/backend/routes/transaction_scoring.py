@@ -1,8 +1,12 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 import asyncio
-from routes import get_current_user_id
-from services.transaction_scorer import score_transaction
+import json
+from routes import get_current_user_id, require_admin_token
+from services.transaction_scorer import score_transaction, score_transactions, get_batcher_stats, get_shadow_report
 from services.geo_guardian import check_location as check_location_service
+from services.idempotency import IdempotencyConflict
+from services.stage_timing import get_stage_timings, reset_stage_timings
+from config import STREAM_SCORING_BATCH_SIZE
 
 transaction_scoring_bp = Blueprint("transaction_scoring", __name__)
 
@@ -19,8 +23,12 @@ def score_transaction_endpoint():
         "merchant_name": "string",
         "mcc": int (optional),
         "timestamp": "ISO string" (optional),
-        "channel": "string" (optional, default: "offline")
+        "channel": "string" (optional, default: "offline"),
+        "transaction_id": "string" (optional, dedupes retries),
+        "debug_timing": bool (optional, adds debug.timing_ms)
     }
+    An Idempotency-Key header can be sent instead of transaction_id, and an
+    X-Debug-Timing: 1 header instead of debug_timing.
     
     Response:
     {
@@ -47,6 +55,8 @@ def score_transaction_endpoint():
         mcc = data.get("mcc", 0)
         timestamp = data.get("timestamp", "")
         channel = data.get("channel", "offline")
+        idempotency_key = request.headers.get("Idempotency-Key") or data.get("transaction_id") or ""
+        debug_timing = bool(data.get("debug_timing")) or request.headers.get("X-Debug-Timing") == "1"
         
         if amount is None or merchant_name is None:
             return jsonify({"error": "amount and merchant_name are required"}), 400
@@ -57,17 +67,245 @@ def score_transaction_endpoint():
             merchant_name=merchant_name,
             mcc=int(mcc),
             timestamp=timestamp,
-            channel=channel
+            channel=channel,
+            idempotency_key=str(idempotency_key),
+            debug_timing=debug_timing,
         )
         
         return jsonify(result), 200
         
+    except IdempotencyConflict as err:
+        return jsonify({"error": "Idempotency conflict", "message": str(err)}), 409
     except ValueError as err:
         return jsonify({"error": "Validation error", "message": str(err)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def _default_user_id() -> str:
+    try:
+        return str(get_current_user_id())
+    except:
+        return "default_user"
+
+
+def _transaction_from_item(item, default_user_id) -> dict:
+    """
+    Validate one bulk-scoring item; default_user_id() supplies the user
+    when the item has none. Raises ValueError with a message for the client.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("must be an object")
+    
+    amount = item.get("amount")
+    merchant_name = item.get("merchant_name")
+    if amount is None or merchant_name is None:
+        raise ValueError("amount and merchant_name are required")
+    if not isinstance(merchant_name, str):
+        raise ValueError("merchant_name must be a string")
+    # float()/int() raise TypeError for lists and objects
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError):
+        raise ValueError("amount must be a number")
+    try:
+        mcc = int(item.get("mcc", 0) or 0)
+    except (TypeError, ValueError):
+        raise ValueError("mcc must be an integer")
+    
+    return {
+        "user_id": item.get("user_id") or default_user_id(),
+        "amount": amount,
+        "merchant_name": merchant_name,
+        "mcc": mcc,
+        "timestamp": item.get("timestamp", ""),
+        "channel": item.get("channel", "offline"),
+    }
+
+
+@transaction_scoring_bp.route("/score-transactions/batch", methods=["POST"])
+def score_transactions_batch_endpoint():
+    """
+    Score many transactions with one model call.
+    
+    Request body:
+    {
+        "transactions": [
+            {"user_id": "string", "amount": float, "merchant_name": "string",
+             "mcc": int, "timestamp": "ISO string", "channel": "string"},
+            ...
+        ]
+    }
+    Items use the same fields as /score-transaction; a bare JSON list is also accepted.
+    
+    Response:
+    {
+        "results": [{"decision": ..., "p_avoid": ..., "reason": ..., "debug": {...}}, ...]
+    }
+    Results are returned in input order. A row that fails to score gets
+    {"error": "..."} in its place; the other rows are still scored.
+    """
+    try:
+        data = request.get_json(force=True)
+        items = data if isinstance(data, list) else (data or {}).get("transactions")
+        if not isinstance(items, list):
+            return jsonify({"error": "transactions must be a list"}), 400
+        
+        default_user = None
+        
+        def default_user_id():
+            nonlocal default_user
+            if default_user is None:
+                default_user = _default_user_id()
+            return default_user
+        
+        transactions = []
+        for i, item in enumerate(items):
+            try:
+                transactions.append(_transaction_from_item(item, default_user_id))
+            except ValueError as err:
+                return jsonify({"error": f"transactions[{i}]: {err}"}), 400
+        
+        results = [
+            {"error": str(result)} if isinstance(result, Exception) else result
+            for result in score_transactions(transactions)
+        ]
+        return jsonify({"results": results}), 200
+        
+    except ValueError as err:
+        return jsonify({"error": "Validation error", "message": str(err)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Longest accepted NDJSON line; longer lines are skipped with an error
+MAX_STREAM_LINE_BYTES = 64 * 1024
+
+
+@transaction_scoring_bp.route("/score-transactions/stream", methods=["POST"])
+def score_transactions_stream_endpoint():
+    """
+    Score a newline-delimited JSON feed (Content-Type: application/x-ndjson),
+    e.g. a nightly reconciliation export sent with chunked transfer encoding.
+    
+    Each input line is one transaction with the same fields as
+    /score-transaction. Lines are scored in batches of
+    STREAM_SCORING_BATCH_SIZE and results are streamed back as NDJSON while
+    the request body is still being read, in input order:
+        {"line": 1, "transaction_id": ..., "decision": ..., "p_avoid": ..., "reason": ..., "debug": {...}}
+        {"line": 2, "error": "amount and merchant_name are required"}
+        ...
+        {"summary": {"scored": int, "errors": int}}
+    """
+    stream = request.stream
+    default_user = None
+    
+    def default_user_id():
+        nonlocal default_user
+        if default_user is None:
+            default_user = _default_user_id()
+        return default_user
+    
+    def generate():
+        batch = []
+        counts = {"scored": 0, "errors": 0}
+        
+        def flush():
+            if not batch:
+                return ""
+            try:
+                results = score_transactions([tx for _, tx, _ in batch])
+                out = []
+                for (line_no, _, transaction_id), result in zip(batch, results):
+                    head = {"line": line_no}
+                    if transaction_id is not None:
+                        head["transaction_id"] = transaction_id
+                    if isinstance(result, Exception):
+                        out.append(json.dumps({**head, "error": str(result)}))
+                        counts["errors"] += 1
+                    else:
+                        out.append(json.dumps({**head, **result}))
+                        counts["scored"] += 1
+            except Exception as e:
+                # Failed before any row was decided (e.g. the model), so no
+                # spend was recorded for this batch
+                out = [json.dumps({"line": line_no, "error": str(e)}) for line_no, _, _ in batch]
+                counts["errors"] += len(batch)
+            batch.clear()
+            return "\n".join(out) + "\n"
+        
+        line_no = 0
+        while True:
+            raw = stream.readline(MAX_STREAM_LINE_BYTES + 1)
+            if not raw:
+                break
+            line_no += 1
+            
+            error = None
+            if len(raw) > MAX_STREAM_LINE_BYTES and not raw.endswith(b"\n"):
+                while raw and not raw.endswith(b"\n"):
+                    raw = stream.readline(MAX_STREAM_LINE_BYTES)
+                error = f"line longer than {MAX_STREAM_LINE_BYTES} bytes"
+            elif raw.strip():
+                try:
+                    item = json.loads(raw)
+                    tx = _transaction_from_item(item, default_user_id)
+                    batch.append((line_no, tx, item.get("transaction_id")))
+                except ValueError as err:
+                    error = str(err)
+            
+            if error is not None:
+                # Keep output in input order: finish the pending batch first
+                pending = flush()
+                counts["errors"] += 1
+                yield pending + json.dumps({"line": line_no, "error": error}) + "\n"
+            elif len(batch) >= STREAM_SCORING_BATCH_SIZE:
+                yield flush()
+        
+        yield flush() + json.dumps({"summary": counts}) + "\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        # Ask reverse proxies not to buffer the streamed results
+        headers={"X-Accel-Buffering": "no"},
+    )
+
+
+@transaction_scoring_bp.route("/score-transaction/batcher-stats", methods=["GET"])
+def batcher_stats():
+    """
+    Micro-batching metrics for /score-transaction (batch sizes, queue wait).
+    """
+    return jsonify(get_batcher_stats()), 200
+
+
+@transaction_scoring_bp.route("/score-transaction/shadow-report", methods=["GET"])
+def shadow_report():
+    """
+    Agreement and latency of shadow models against the active model.
+    """
+    return jsonify(get_shadow_report()), 200
+
+
+@transaction_scoring_bp.route("/score-transaction/stage-timings", methods=["GET"])
+def stage_timings():
+    """
+    Per-stage latency histograms for scoring.
+    """
+    return jsonify(get_stage_timings()), 200
+
+
+@transaction_scoring_bp.route("/score-transaction/stage-timings", methods=["DELETE"])
+def reset_stage_timings_endpoint():
+    """
+    Clear the histograms; needs the admin token, like /admin/models.
+    """
+    require_admin_token()
+    reset_stage_timings()
+    return jsonify(get_stage_timings()), 200
+
+
 @transaction_scoring_bp.route("/location-check", methods=["GET", "POST"])
 def location_check():
     """
@@ -131,6 +369,8 @@ def health():
         "message": "Guardian Card Transaction Scoring API is running",
         "endpoints": {
             "transaction_scoring": "/score-transaction",
+            "transaction_scoring_batch": "/score-transactions/batch",
+            "transaction_scoring_stream": "/score-transactions/stream",
             "location_check": "/location-check"
         }
     })
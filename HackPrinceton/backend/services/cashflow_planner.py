@@ -0,0 +1,117 @@
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional
+
+from .obligations_store import ObligationRecord
+
+
+def _cents(amount: float) -> int:
+    return int(round(float(amount) * 100))
+
+
+def _as_date(value) -> Optional[date]:
+    return value.date() if isinstance(value, datetime) else value
+
+
+class CashFlowPlan:
+    """
+    Day-by-day cash flow for one user from the 1st of start's month through
+    start + horizon_days.
+
+    The month's free money (income after essentials, savings and the
+    safety buffer) comes in on the 1st of every month in the plan. Each
+    obligation is paid on the last day of its pay window (min_pay_date..
+    max_pay_date, else its due date) inside the plan: money only ever comes
+    in, so paying later never lowers any day's balance, and if this
+    schedule leaves a day negative no schedule avoids it. Obligations due
+    between the 1st and start are already paid and stay in the balance.
+
+    safe_left for a day is the least balance from that day on, i.e. what
+    can be spent that day without leaving a later payment uncovered.
+    """
+
+    def __init__(self, start: date, horizon_days: int, monthly_free: float):
+        self.start = start
+        self.horizon_days = horizon_days
+        self.monthly_free = monthly_free
+        self.origin = start.replace(day=1)
+        self._offset = (start - self.origin).days
+        # Whole cents, so many small payments add up exactly
+        self._outflow = [0] * (self._offset + horizon_days + 1)
+        self._payments = 0
+        self._balances: Optional[List[float]] = None
+        self._safe_left: Optional[List[float]] = None
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=self.horizon_days)
+
+    def _pay_day(self, ob: ObligationRecord) -> Optional[int]:
+        latest = _as_date(ob.max_pay_date or ob.due_date)
+        earliest = _as_date(ob.min_pay_date) or self.origin
+        if earliest > self.end:
+            return None
+        day = min(max(latest, self.origin, earliest), self.end)
+        return (day - self.origin).days
+
+    def pay(self, obligations: Iterable[ObligationRecord]) -> int:
+        """
+        Schedule each obligation on its pay day. Every one is paid, even
+        when several share an event_id. Returns how many fell inside the plan.
+        """
+        paid = 0
+        for ob in obligations:
+            day = self._pay_day(ob)
+            if day is not None:
+                self._outflow[day] += _cents(ob.amount)
+                paid += 1
+        self._payments += paid
+        self._balances = None
+        return paid
+
+    def _recompute(self) -> None:
+        balances = []
+        balance = 0.0
+        for i, outflow in enumerate(self._outflow):
+            if (self.origin + timedelta(days=i)).day == 1:
+                balance += self.monthly_free
+            balance -= outflow / 100.0
+            balances.append(balance)
+
+        # Days before start are history; only start onwards can be spent
+        balances = balances[self._offset:]
+        safe_left = [0.0] * len(balances)
+        lowest = float("inf")
+        for i in range(len(balances) - 1, -1, -1):
+            lowest = min(lowest, balances[i])
+            safe_left[i] = max(0.0, lowest)
+        self._balances = balances
+        self._safe_left = safe_left
+
+    def daily_safe_left(self) -> List[float]:
+        """
+        safe_left for start, start + 1 day, ..., start + horizon_days.
+        """
+        if self._balances is None:
+            self._recompute()
+        return list(self._safe_left)
+
+    def shortfall(self) -> float:
+        """
+        How far the lowest day's balance falls below zero (0 if it never does).
+        """
+        if self._balances is None:
+            self._recompute()
+        return max(0.0, -min(self._balances))
+
+    def __len__(self) -> int:
+        return self._payments
+
+
+def day_index(start: date, horizon_days: int, day: Optional[date]) -> int:
+    """
+    Bucket for day in a plan starting at start; days outside the horizon
+    use the nearest end.
+    """
+    if day is None:
+        return 0
+    return min(max((day - start).days, 0), horizon_days)
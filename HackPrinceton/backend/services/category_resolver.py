@@ -0,0 +1,91 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    MERCHANTS,
+    CATEGORY_MCC,
+    CATEGORY_MCC_RANGES,
+    CATEGORY_CACHE_SIZE,
+)
+
+DEFAULT_CATEGORY = "MISC_ONLINE"
+
+# Card processor / aggregator prefixes seen in issuing merchant strings
+_PROCESSOR_PREFIX_RE = re.compile(r"^(sq|tst|sp|pp|paypal|py|ic|dd|gglpay|apple pay)\s*\*\s*")
+_STORE_NUMBER_RE = re.compile(r"(#\s*\d+|\bstore\s*\d+|\bno\.?\s*\d+|\b[a-z]?\d{2,}\b)")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9&+ ]+")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_merchant(name: str) -> str:
+    """
+    Case-fold a raw merchant string and strip processor prefixes, store
+    numbers and punctuation: "SQ *STARBUCKS #1234 NYC" -> "starbucks nyc".
+    Trailing locations are left in place; prefix matching ignores them.
+    """
+    s = name.casefold().replace("'", "").replace("’", "")
+    s = _PROCESSOR_PREFIX_RE.sub("", s)
+    s = _STORE_NUMBER_RE.sub(" ", s)
+    s = _NON_ALNUM_RE.sub(" ", s)
+    return _SPACES_RE.sub(" ", s).strip()
+
+
+def _build_mcc_table() -> List[Optional[str]]:
+    table: List[Optional[str]] = [None] * 10000
+    for lo, hi, cat in CATEGORY_MCC_RANGES:
+        for code in range(lo, hi + 1):
+            table[code] = cat
+    for cat, code in CATEGORY_MCC.items():
+        table[code] = cat
+    return table
+
+
+def _build_merchant_index() -> Tuple[Dict[str, str], Dict[str, List[Tuple[Tuple[str, ...], str]]]]:
+    exact: Dict[str, str] = {}
+    by_first_token: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+    for cat, merchants in MERCHANTS.items():
+        for m in merchants:
+            exact[m] = cat
+            tokens = tuple(normalize_merchant(m).split())
+            if tokens:
+                by_first_token.setdefault(tokens[0], []).append((tokens, cat))
+    # Longest known name wins: "amazon prime ..." before "amazon ..."
+    for candidates in by_first_token.values():
+        candidates.sort(key=lambda c: len(c[0]), reverse=True)
+    return exact, by_first_token
+
+
+MCC_TABLE = _build_mcc_table()
+MERCHANT_EXACT, MERCHANT_PREFIX_INDEX = _build_merchant_index()
+
+
+def category_for_mcc(mcc: int) -> Optional[str]:
+    if 0 <= mcc < len(MCC_TABLE):
+        return MCC_TABLE[mcc]
+    return None
+
+
+def category_for_merchant(merchant_name: str) -> Optional[str]:
+    if merchant_name in MERCHANT_EXACT:
+        return MERCHANT_EXACT[merchant_name]
+    tokens = normalize_merchant(merchant_name).split()
+    if not tokens:
+        return None
+    for known, cat in MERCHANT_PREFIX_INDEX.get(tokens[0], ()):
+        if tuple(tokens[:len(known)]) == known:
+            return cat
+    return None
+
+
+@lru_cache(maxsize=CATEGORY_CACHE_SIZE)
+def resolve_category(merchant_name: str, mcc: int = 0) -> str:
+    """
+    Base category for a raw merchant string and MCC: known merchant name
+    first (exact, then normalized prefix), then the MCC index.
+    """
+    return (
+        category_for_merchant(merchant_name or "")
+        or category_for_mcc(int(mcc or 0))
+        or DEFAULT_CATEGORY
+    )
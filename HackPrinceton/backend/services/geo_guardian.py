@@ -3,10 +3,12 @@ import os
 import csv
 from datetime import datetime, timedelta
 from typing import List, Optional, Tuple, Dict
+from functools import lru_cache
 from pathlib import Path
-import httpx
 from dotenv import load_dotenv
 
+from .state_backend import get_state_backend
+
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
@@ -53,6 +55,9 @@ RESTAURANT_TYPES = {
 }
 
 
+# The CSVs below are read on first use, not at import
+
+@lru_cache(maxsize=None)
 def _load_mock_restaurants():
     places = []
     csv_path = DATA_DIR / "mock_restaurants.csv"
@@ -73,6 +78,7 @@ def _load_mock_restaurants():
     return places
 
 
+@lru_cache(maxsize=None)
 def _load_geo_user_config():
     config = {}
     csv_path = DATA_DIR / "geo_user_config.csv"
@@ -90,6 +96,7 @@ def _load_geo_user_config():
     return config
 
 
+@lru_cache(maxsize=None)
 def _load_notification_templates():
     templates = {}
     csv_path = DATA_DIR / "notification_templates.csv"
@@ -107,12 +114,9 @@ def _load_notification_templates():
     return templates
 
 
-HARDCODED_PLACES = _load_mock_restaurants()
-GEO_USER_CONFIG = _load_geo_user_config()
-NOTIFICATION_TEMPLATES = _load_notification_templates()
-
-USER_STATE = {}
-RESTAURANT_PINGS = {}
+# Per-user state lives in the shared state backend so all workers agree
+USER_STATE_NS = "geo_user_state"
+RESTAURANT_PINGS_NS = "geo_restaurant_pings"
 
 
 def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -128,6 +132,7 @@ def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 
 async def get_nearby_places(lat: float, lon: float, radius_m: int = 50) -> List[dict]:
     if USE_GOOGLE_PLACES and GOOGLE_API_KEY:
+        import httpx
         url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
         params = {
             "location": f"{lat},{lon}",
@@ -163,7 +168,7 @@ async def get_nearby_places(lat: float, lon: float, radius_m: int = 50) -> List[
     )
     
     nearby = []
-    for p in HARDCODED_PLACES:
+    for p in _load_mock_restaurants():
         d = haversine_m(lat, lon, p["lat"], p["lon"])
         if d <= radius_m:
             nearby.append(p)
@@ -192,7 +197,7 @@ def get_nearest_restaurant(places: List[dict], lat: float, lon: float,
 
 
 def get_geo_user_config(user_id: str) -> dict:
-    cfg = GEO_USER_CONFIG.get(user_id, {})
+    cfg = _load_geo_user_config().get(user_id, {})
     return {
         "block_ping_threshold": cfg.get("block_ping_threshold", DEFAULT_BLOCK_PING_THRESHOLD),
         "dwell_window_minutes": cfg.get("dwell_window_minutes", DEFAULT_DWELL_WINDOW_MINUTES),
@@ -201,13 +206,17 @@ def get_geo_user_config(user_id: str) -> dict:
 
 def update_user_state_and_stationary(user_id: str, lat: float, lon: float, 
                                     now: datetime) -> Tuple[bool, Optional[float]]:
-    last = USER_STATE.get(user_id)
-    USER_STATE[user_id] = {"last_lat": lat, "last_lon": lon, "last_ts": now}
+    backend = get_state_backend()
+    new_state = {"last_lat": lat, "last_lon": lon, "last_ts": now.isoformat()}
+    while True:
+        last = backend.get(USER_STATE_NS, user_id)
+        if backend.compare_and_set(USER_STATE_NS, user_id, last, new_state):
+            break
 
     if not last:
         return False, None
 
-    dt = (now - last["last_ts"]).total_seconds()
+    dt = (now - datetime.fromisoformat(last["last_ts"])).total_seconds()
     if dt <= 0:
         return False, dt
 
@@ -219,16 +228,19 @@ def update_user_state_and_stationary(user_id: str, lat: float, lon: float,
 
 
 def record_restaurant_ping(user_id: str, now: datetime, window_minutes: int) -> List[datetime]:
-    lst = RESTAURANT_PINGS.get(user_id, [])
+    backend = get_state_backend()
     cutoff = now - timedelta(minutes=window_minutes)
-    lst = [t for t in lst if t >= cutoff]
-    lst.append(now)
-    RESTAURANT_PINGS[user_id] = lst
-    return lst
+    while True:
+        stored = backend.get(RESTAURANT_PINGS_NS, user_id)
+        lst = [datetime.fromisoformat(t) for t in (stored or [])]
+        lst = [t for t in lst if t >= cutoff]
+        lst.append(now)
+        if backend.compare_and_set(RESTAURANT_PINGS_NS, user_id, stored, [t.isoformat() for t in lst]):
+            return lst
 
 
 def build_notification(code: str) -> Dict:
-    tmpl = NOTIFICATION_TEMPLATES.get(code, {})
+    tmpl = _load_notification_templates().get(code, {})
     return {
         "type": tmpl.get("type", "generic"),
         "severity": tmpl.get("severity", "info"),
@@ -3,6 +3,7 @@ from datetime import datetime
 from models import db, GuardianRule, PendingOverride
 from models import db, GeoFenceRule, UserLocationPing
 from services.geo import haversine_m
+from services.category_resolver import resolve_category
 
 def is_risky(user_id: int, amount_cents: int, merchant: str, category: Optional[str]) -> bool:
     # Very simple v1 rule:
@@ -37,7 +38,12 @@ def create_pending_override(user_id: int, merchant: str, amount_cents: int, ttl_
     db.session.add(ov)
     db.session.commit()
 
-def apply_guardian_logic(user_id: int, amount_cents: int, merchant: str, category: str | None):
+def apply_guardian_logic(user_id: int, amount_cents: int, merchant: str, category: str | None,
+                         mcc: int = 0):
+    # Rules and geofences use lowercase categories, e.g. "groceries"
+    if not category:
+        category = resolve_category(merchant or "", mcc).lower()
+
     gf = geofence_effect(user_id, category)
     if gf:
         policy, gf_name = gf
@@ -0,0 +1,186 @@
+import json
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .state_backend import InProcessBackend, StateBackend
+
+NAMESPACE = "idempotency"
+
+
+class IdempotencyConflict(ValueError):
+    pass
+
+
+class _InFlight:
+    __slots__ = ("fingerprint", "event")
+
+    def __init__(self, fingerprint: Hashable):
+        self.fingerprint = fingerprint
+        self.event = threading.Event()
+
+
+def _storage_key(key: Hashable) -> str:
+    # Tuples become JSON lists, so (user, key) pairs cannot collide however
+    # either part is spelled
+    return json.dumps(key, separators=(",", ":"))
+
+
+def _normalized(fingerprint: Hashable) -> Any:
+    # Compared after the same JSON round trip the backend applies
+    return json.loads(json.dumps(fingerprint))
+
+
+class IdempotencyCache:
+    """
+    Remembers results by idempotency key for ttl_seconds (at most max_entries).
+
+    run() computes a key's result once: a retry within the window gets the
+    stored result back, and a concurrent duplicate waits for the first
+    computation instead of starting its own. Reusing a key with a different
+    request fingerprint raises IdempotencyConflict.
+
+    Keys live in the state backend (backend() is called on each use, default:
+    a private in-process one), so on a shared backend a retry that lands on
+    another worker is deduplicated too. A key is claimed with
+    compare_and_set before computing; the claim lapses after lease_seconds
+    if its worker dies. Results must be JSON-serializable.
+    """
+
+    def __init__(self, ttl_seconds: float = 86400.0, max_entries: int = 100000,
+                 backend: Optional[Callable[[], StateBackend]] = None,
+                 lease_seconds: float = 30.0, poll_seconds: float = 0.01):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        if backend is None:
+            own = InProcessBackend()
+            backend = lambda: own
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _InFlight] = {}
+        # Expired and surplus keys are pruned every prune_every stores
+        self._prune_every = max(1, min(1000, max_entries // 10))
+        self._stores = 0
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+
+    def _prune(self, backend: StateBackend, now: float) -> None:
+        entries = backend.scan_prefix(NAMESPACE, "")
+        stale = [skey for skey, entry in entries.items() if entry["expires_at"] <= now]
+        # Results share one TTL, so the earliest to expire is the oldest
+        done = sorted(
+            (entry["expires_at"], skey) for skey, entry in entries.items()
+            if entry["state"] == "done" and entry["expires_at"] > now
+        )
+        stale += [skey for _, skey in done[:max(0, len(done) - self.max_entries)]]
+        for skey in stale:
+            # Skipped if another worker has claimed the key again meanwhile
+            if backend.get(NAMESPACE, skey) == entries[skey]:
+                backend.delete(NAMESPACE, skey)
+
+    def _claim(self, backend: StateBackend, skey: str, fingerprint: Any) -> Tuple[bool, Any]:
+        """
+        Returns (True, marker) once this worker owns the key, or
+        (False, result) when another computation already stored one.
+        """
+        while True:
+            now = time.time()
+            current = backend.get(NAMESPACE, skey)
+            if current is None or current["expires_at"] <= now:
+                marker = {"state": "pending", "fingerprint": fingerprint,
+                          "owner": uuid.uuid4().hex, "expires_at": now + self.lease_seconds}
+                if backend.compare_and_set(NAMESPACE, skey, current, marker):
+                    return True, marker
+                continue
+            if current["fingerprint"] != fingerprint:
+                raise IdempotencyConflict("Idempotency key reused with different request parameters")
+            if current["state"] == "done":
+                return False, current["result"]
+            # Another worker is computing it: wait for its result or lease
+            time.sleep(self.poll_seconds)
+
+    def run(self, key: Hashable, fingerprint: Hashable,
+            compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Returns (result, replayed); replayed is True when the result came
+        from an earlier computation for the same key.
+        """
+        while True:
+            with self._lock:
+                inflight = self._inflight.get(key)
+                leader = inflight is None
+                if leader:
+                    inflight = _InFlight(fingerprint)
+                    self._inflight[key] = inflight
+                elif inflight.fingerprint != fingerprint:
+                    raise IdempotencyConflict("Idempotency key reused with different request parameters")
+                else:
+                    self.waits += 1
+
+            if not leader:
+                # Threads of this worker wait here rather than polling the
+                # backend; the next pass picks up the stored result, or
+                # becomes the leader if the first computation failed
+                inflight.event.wait()
+                continue
+
+            try:
+                return self._run_leader(key, fingerprint, compute)
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                inflight.event.set()
+
+    def _run_leader(self, key: Hashable, fingerprint: Hashable,
+                    compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        backend = self._backend()
+        skey = _storage_key(key)
+        claimed, value = self._claim(backend, skey, _normalized(fingerprint))
+        if not claimed:
+            with self._lock:
+                self.hits += 1
+            return value, True
+
+        marker = value
+        with self._lock:
+            self.misses += 1
+        try:
+            result = compute()
+        except BaseException:
+            # Released so a retry can compute it again
+            if backend.get(NAMESPACE, skey) == marker:
+                backend.delete(NAMESPACE, skey)
+            raise
+
+        now = time.time()
+        backend.compare_and_set(NAMESPACE, skey, marker, {
+            "state": "done",
+            "fingerprint": marker["fingerprint"],
+            "result": result,
+            "expires_at": now + self.ttl_seconds,
+        })
+        with self._lock:
+            self._stores += 1
+            prune = self._stores % self._prune_every == 0
+        if prune:
+            self._prune(backend, now)
+        return result, False
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        entries = [e for e in self._backend().scan_prefix(NAMESPACE, "").values()
+                   if e["expires_at"] > now]
+        with self._lock:
+            return {
+                "entries": sum(1 for e in entries if e["state"] == "done"),
+                "in_flight": sum(1 for e in entries if e["state"] == "pending"),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "ttl_seconds": self.ttl_seconds,
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+
+class _Pending:
+    __slots__ = ("item", "enqueued_at", "event", "result", "error")
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.enqueued_at = time.monotonic()
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class InferenceBatcher:
+    """
+    Coalesces concurrent submit() calls into one batch_fn call.
+
+    A single worker thread collects items until window_ms has passed since the
+    oldest queued item or max_batch_size items are waiting, then runs
+    batch_fn(items) and hands each caller its own result. Items are passed to
+    batch_fn in arrival order, and batches run one after another.
+
+    batch_fn returns one result per item. An Exception in an item's slot is
+    raised to that caller only, so a batch_fn that handles items one by one
+    can fail a single item without failing the rest; if batch_fn itself
+    raises, every caller in the batch gets the exception.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 window_ms: float = 2.0, max_batch_size: int = 64):
+        self.batch_fn = batch_fn
+        self.window_s = max(0.0, window_ms) / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_batch_seen = 0
+        self._queue_wait_total_s = 0.0
+        self._queue_wait_max_s = 0.0
+        self._batch_time_total_s = 0.0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="inference-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, item: Any) -> Any:
+        self._ensure_started()
+        pending = _Pending(item)
+        self._queue.put(pending)
+        pending.event.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self) -> List[_Pending]:
+        first = self._queue.get()
+        batch = [first]
+        deadline = first.enqueued_at + self.window_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            try:
+                results = list(self.batch_fn([p.item for p in batch]))
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"batch_fn returned {len(results)} results for {len(batch)} items"
+                    )
+                for p, result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        p.error = result
+                    else:
+                        p.result = result
+            except Exception as e:
+                for p in batch:
+                    p.error = e
+            finished = time.monotonic()
+
+            self._record(batch, started, finished)
+            for p in batch:
+                p.event.set()
+
+    def _record(self, batch: List[_Pending], started: float, finished: float) -> None:
+        waits = [started - p.enqueued_at for p in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            self._queue_wait_total_s += sum(waits)
+            self._queue_wait_max_s = max(self._queue_wait_max_s, max(waits))
+            self._batch_time_total_s += finished - started
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            batches = self._batches
+            items = self._items
+            return {
+                "window_ms": self.window_s * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "batches": batches,
+                "items": items,
+                "avg_batch_size": (items / batches) if batches else 0.0,
+                "max_batch_size_seen": self._max_batch_seen,
+                "avg_queue_wait_ms": (self._queue_wait_total_s / items * 1000.0) if items else 0.0,
+                "max_queue_wait_ms": self._queue_wait_max_s * 1000.0,
+                "avg_batch_time_ms": (self._batch_time_total_s / batches * 1000.0) if batches else 0.0,
+                "queue_depth": self._queue.qsize(),
+            }
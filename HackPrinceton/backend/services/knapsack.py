@@ -0,0 +1,185 @@
+import argparse
+import random
+import time
+from typing import Dict, List, NamedTuple, Sequence
+
+import numpy as np
+
+from config import KNAPSACK_MAX_DP_CELLS
+
+
+class KnapsackResult(NamedTuple):
+    chosen: List[int]     # indices into the input, ascending
+    value: float          # total importance of the chosen items
+    method: str           # "weight_dp", "value_dp" or "value_dp_scaled"
+    error_bound: float    # chosen value >= optimum - error_bound
+
+
+def to_cents(amount: float) -> int:
+    return int(round(float(amount) * 100))
+
+
+def _reconstruct(keep: np.ndarray, weights: Sequence[int], col: int, items: Sequence[int]) -> List[int]:
+    chosen = []
+    for row in range(len(items) - 1, -1, -1):
+        if keep[row, col]:
+            chosen.append(items[row])
+            col -= weights[row]
+    chosen.reverse()
+    return chosen
+
+
+def _weight_dp(weights: List[int], values: List[float], capacity: int) -> List[int]:
+    # best[c] = max value using at most c cents; one vectorized pass per item
+    best = np.zeros(capacity + 1)
+    keep = np.zeros((len(weights), capacity + 1), dtype=bool)
+    for row, (w, v) in enumerate(zip(weights, values)):
+        cand = best[:capacity + 1 - w] + v
+        improve = cand > best[w:]
+        keep[row, w:] = improve
+        best[w:] = np.where(improve, cand, best[w:])
+    return _reconstruct(keep, weights, capacity, range(len(weights)))
+
+
+def _value_dp(weights: List[int], units: List[int], capacity: int) -> List[int]:
+    # min_cost[u] = fewest cents reaching exactly u value units
+    total = sum(units)
+    inf = np.iinfo(np.int64).max // 2
+    min_cost = np.full(total + 1, inf, dtype=np.int64)
+    min_cost[0] = 0
+    keep = np.zeros((len(weights), total + 1), dtype=bool)
+    for row, (w, u) in enumerate(zip(weights, units)):
+        cand = min_cost[:total + 1 - u] + w
+        improve = cand < min_cost[u:]
+        keep[row, u:] = improve
+        min_cost[u:] = np.where(improve, cand, min_cost[u:])
+    best_units = int(np.flatnonzero(min_cost <= capacity)[-1])
+    return _reconstruct(keep, units, best_units, range(len(weights)))
+
+
+def solve_knapsack(amounts_cents: Sequence[int], values: Sequence[float], budget_cents: int,
+                   max_cells: int = KNAPSACK_MAX_DP_CELLS) -> KnapsackResult:
+    """
+    0/1 knapsack over integer cents: maximize total value with total
+    amount <= budget_cents.
+
+    Exact DP over total value when values are integers (importance 1-5)
+    and that table is the smaller one, else exact DP over the budget when
+    items x budget fits in max_cells. Otherwise values are scaled down to
+    fit, and the answer is within error_bound of the optimum.
+    """
+    budget_cents = max(0, int(budget_cents))
+    # Items that can never be useful are not part of the DP
+    items = [
+        i for i, (w, v) in enumerate(zip(amounts_cents, values))
+        if v > 0 and 0 <= w <= budget_cents
+    ]
+    if not items:
+        return KnapsackResult([], 0.0, "weight_dp", 0.0)
+
+    weights = [int(amounts_cents[i]) for i in items]
+    vals = [float(values[i]) for i in items]
+    n = len(items)
+
+    weight_cells = n * (budget_cents + 1)
+    value_cells = n * (int(sum(vals)) + 1)
+    integral = all(v.is_integer() for v in vals)
+
+    if integral and value_cells <= min(weight_cells, max_cells):
+        picked = _value_dp(weights, [int(v) for v in vals], budget_cents)
+        method, bound = "value_dp", 0.0
+    elif weight_cells <= max_cells:
+        picked = _weight_dp(weights, vals, budget_cents)
+        method, bound = "weight_dp", 0.0
+    else:
+        # Flooring each value to a multiple of scale loses < scale per
+        # chosen item, so the result is within n * scale of optimal
+        scale = max(sum(vals) * n / max_cells, 1e-9)
+        picked = _value_dp(weights, [int(v // scale) for v in vals], budget_cents)
+        method, bound = "value_dp_scaled", n * scale
+
+    chosen = [items[i] for i in picked]
+    return KnapsackResult(chosen, float(sum(values[i] for i in chosen)), method, bound)
+
+
+def solve_events_exact(events: List[Dict], budget: float) -> List[Dict]:
+    """
+    Exact selection of optional events ({"amount", "importance", ...}) that
+    fit in budget dollars, maximizing total importance.
+    """
+    if not events or budget <= 0:
+        return []
+    result = solve_knapsack(
+        [to_cents(ev["amount"]) for ev in events],
+        [float(ev["importance"]) for ev in events],
+        # Round down so the chosen events never exceed the real budget
+        int(float(budget) * 100),
+    )
+    return [events[i] for i in result.chosen]
+
+
+def _random_events(n: int, rng: random.Random) -> List[Dict]:
+    return [
+        {
+            "event_id": f"e{i}",
+            "amount": round(rng.uniform(20, 1500), 2),
+            "importance": float(rng.randint(1, 5)),
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    # python -m services.knapsack [--sizes 10,50,100,250,500] [--trials 5]
+    from .obligations_quantum import _classical_greedy_knapsack, _qiskit_available, solve_knapsack_qaoa
+
+    parser = argparse.ArgumentParser(description="Benchmark optional-obligation knapsack solvers")
+    parser.add_argument("--sizes", default="10,50,100,250,500")
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--qaoa-max-events", type=int, default=12,
+                        help="QAOA simulates 2^n states; larger problems are skipped")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # exact first: the other solvers are scored against its values
+    solvers = {"exact": solve_events_exact, "greedy": _classical_greedy_knapsack}
+    if _qiskit_available():
+        solvers["qaoa"] = solve_knapsack_qaoa
+
+    print(f"{'events':>6}  {'solver':<7} {'mean ms':>9} {'max ms':>9} {'value vs exact':>15}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        problems = []
+        for _ in range(args.trials):
+            events = _random_events(n, rng)
+            # Room for roughly a third of the events
+            budget = sum(ev["amount"] for ev in events) / 3
+            problems.append((events, budget))
+
+        exact_values = None
+        for name, solve in solvers.items():
+            if name == "qaoa" and n > args.qaoa_max_events:
+                print(f"{n:>6}  {name:<7} {'skipped':>9}")
+                continue
+            latencies = []
+            values = []
+            for events, budget in problems:
+                started = time.perf_counter()
+                chosen = solve(events, budget)
+                latencies.append((time.perf_counter() - started) * 1000)
+                assert sum(ev["amount"] for ev in chosen) <= budget + 1e-9
+                values.append(sum(ev["importance"] for ev in chosen))
+            if name == "exact":
+                exact_values = values
+            ratio = (
+                sum(values) / sum(exact_values)
+                if exact_values and sum(exact_values) else float("nan")
+            )
+            print(
+                f"{n:>6}  {name:<7} {sum(latencies) / len(latencies):>9.2f} "
+                f"{max(latencies):>9.2f} {ratio:>15.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import threading
+from typing import Hashable
+
+
+class StripedLock:
+    """
+    A fixed pool of locks indexed by key hash. Work for the same key is
+    serialized while different keys almost always land on different
+    stripes, without keeping one lock object per key alive forever.
+    """
+
+    def __init__(self, stripes: int = 1024):
+        self._locks = [threading.Lock() for _ in range(max(1, stripes))]
+
+    def for_key(self, key: Hashable) -> threading.Lock:
+        return self._locks[hash(key) % len(self._locks)]
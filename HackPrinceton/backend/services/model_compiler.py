@@ -0,0 +1,138 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+
+base_dir = Path(__file__).parent.parent
+PIPELINE_PATH = base_dir / "models" / "guardian_pipeline.pkl"
+COMPILED_PATH = base_dir / "models" / "guardian_pipeline.compiled.json"
+
+ARTIFACT_FORMAT = "guardian-logreg-v1"
+
+
+def compile_pipeline(pipe) -> Dict:
+    """
+    Flatten a fitted StandardScaler + OneHotEncoder + LogisticRegression
+    pipeline (as built by model_training) into plain lists and dicts.
+    """
+    preprocess = pipe.named_steps["preprocess"]
+    model = pipe.named_steps["model"]
+
+    if getattr(preprocess, "remainder", "drop") != "drop":
+        raise ValueError("Only ColumnTransformer(remainder='drop') can be compiled")
+    if model.coef_.shape[0] != 1:
+        raise ValueError("Only binary LogisticRegression can be compiled")
+
+    coef = model.coef_[0]
+    transformers = {name: (trans, cols) for name, trans, cols in preprocess.transformers_}
+    num_scaler, num_cols = transformers["num"]
+    cat_encoder, cat_cols = transformers["cat"]
+    num_slice = preprocess.output_indices_["num"]
+    cat_slice = preprocess.output_indices_["cat"]
+
+    if getattr(cat_encoder, "drop_idx_", None) is not None:
+        raise ValueError("OneHotEncoder with drop= is not supported")
+    if getattr(cat_encoder, "handle_unknown", "error") != "ignore":
+        raise ValueError("OneHotEncoder must use handle_unknown='ignore'")
+
+    n_num = len(num_cols)
+    mean = num_scaler.mean_ if num_scaler.with_mean else np.zeros(n_num)
+    scale = num_scaler.scale_ if num_scaler.with_std else np.ones(n_num)
+
+    # Category -> column index into the coefficient vector
+    category_index = {}
+    offset = cat_slice.start
+    for col, cats in zip(cat_cols, cat_encoder.categories_):
+        category_index[col] = {str(c): offset + i for i, c in enumerate(cats)}
+        offset += len(cats)
+    if offset != cat_slice.stop:
+        raise ValueError("Unexpected one-hot layout in fitted pipeline")
+
+    return {
+        "format": ARTIFACT_FORMAT,
+        "numeric_features": list(num_cols),
+        "numeric_mean": [float(v) for v in mean],
+        "numeric_scale": [float(v) for v in scale],
+        "numeric_coef_start": int(num_slice.start),
+        "categorical_features": list(cat_cols),
+        "category_index": category_index,
+        "coef": [float(v) for v in coef],
+        "intercept": float(model.intercept_[0]),
+    }
+
+
+def save_compiled(artifact: Dict, path: Union[str, Path] = COMPILED_PATH) -> Path:
+    path = Path(path)
+    with open(path, "w") as f:
+        json.dump(artifact, f)
+    return path
+
+
+def load_compiled(path: Union[str, Path] = COMPILED_PATH) -> "CompiledScorer":
+    with open(path, "r") as f:
+        return CompiledScorer(json.load(f))
+
+
+class CompiledScorer:
+    """
+    Pure-NumPy replacement for pipeline.predict_proba(X)[:, 1].
+    Takes feature rows as dicts, no DataFrame needed.
+    """
+
+    def __init__(self, artifact: Dict):
+        if artifact.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"Unknown compiled model format: {artifact.get('format')}")
+
+        coef = np.asarray(artifact["coef"], dtype=np.float64)
+        start = artifact["numeric_coef_start"]
+        self.numeric_features = artifact["numeric_features"]
+        self.categorical_features = artifact["categorical_features"]
+        self.mean = np.asarray(artifact["numeric_mean"], dtype=np.float64)
+        self.scale = np.asarray(artifact["numeric_scale"], dtype=np.float64)
+        self.numeric_coef = coef[start:start + len(self.numeric_features)]
+        self.intercept = float(artifact["intercept"])
+
+        # Per-feature {category: coefficient}; unknown categories contribute 0,
+        # same as OneHotEncoder(handle_unknown="ignore")
+        self.category_weights = {
+            col: {cat: float(coef[idx]) for cat, idx in index.items()}
+            for col, index in artifact["category_index"].items()
+        }
+
+    def predict_proba_rows(self, rows: List[Dict]) -> np.ndarray:
+        if not rows:
+            return np.zeros(0)
+
+        X_num = np.array(
+            [[row[col] for col in self.numeric_features] for row in rows],
+            dtype=np.float64,
+        )
+        logits = ((X_num - self.mean) / self.scale) @ self.numeric_coef + self.intercept
+
+        for col in self.categorical_features:
+            weights = self.category_weights[col]
+            logits += np.fromiter(
+                (weights.get(str(row[col]), 0.0) for row in rows),
+                dtype=np.float64,
+                count=len(rows),
+            )
+
+        return 1.0 / (1.0 + np.exp(-logits))
+
+
+def main():
+    import joblib
+
+    if not PIPELINE_PATH.exists():
+        raise FileNotFoundError(
+            f"guardian_pipeline.pkl not found at {PIPELINE_PATH}. "
+            f"Run model_training.py first."
+        )
+    pipe = joblib.load(PIPELINE_PATH)
+    path = save_compiled(compile_pipeline(pipe))
+    print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import SCORER_BACKEND, MODEL_MANIFEST_POLL_SECONDS
+
+base_dir = Path(__file__).parent.parent
+MODELS_DIR = base_dir / "models"
+VERSIONS_DIR = MODELS_DIR / "versions"
+MANIFEST_PATH = MODELS_DIR / "manifest.json"
+
+# Flat files directly under models/, used until a manifest exists
+LEGACY_VERSION = "legacy"
+
+ARTIFACT_FILES = (
+    "guardian_pipeline.pkl",
+    "kmeans_groceries.pkl",
+    "guardian_pipeline.compiled.json",
+)
+
+
+class ModelBundle:
+    """
+    Everything the scorer needs from one model version. Never mutated after
+    construction; a new version is swapped in by replacing the whole bundle.
+    """
+    __slots__ = ("version", "pipeline", "kmeans_groc", "compiled_scorer", "loaded_at")
+
+    def __init__(self, version: str, pipeline, kmeans_groc, compiled_scorer):
+        self.version = version
+        self.pipeline = pipeline
+        self.kmeans_groc = kmeans_groc
+        self.compiled_scorer = compiled_scorer
+        self.loaded_at = datetime.utcnow()
+
+
+def _version_dir(version: str) -> Path:
+    """
+    Directory for a version name. Only plain names are accepted, so admin
+    input never reaches outside VERSIONS_DIR or into a .<name>.tmp copy
+    that register_version() has not finished.
+    """
+    if version == LEGACY_VERSION:
+        return MODELS_DIR
+    if (not isinstance(version, str) or not version or version.startswith(".")
+            or "/" in version or "\\" in version or "\0" in version):
+        raise ValueError(f"Invalid model version: {version!r}")
+    return VERSIONS_DIR / version
+
+
+def _registered_dir(version: str) -> Path:
+    # Every registered version has a pipeline; without one the scorer
+    # would quietly fall back to p_ml=0.5 for every transaction
+    version_dir = _version_dir(version)
+    if version != LEGACY_VERSION:
+        if not version_dir.is_dir():
+            raise ValueError(f"Unknown model version: {version}")
+        if not (version_dir / "guardian_pipeline.pkl").is_file():
+            raise ValueError(f"Model version {version} has no guardian_pipeline.pkl")
+    return version_dir
+
+
+def _load_optional(path: Path):
+    # joblib (and sklearn, through unpickling) load with the first model
+    import joblib
+    try:
+        return joblib.load(path)
+    except FileNotFoundError:
+        return None
+
+
+def load_bundle(version: str) -> ModelBundle:
+    version_dir = _registered_dir(version)
+
+    pipeline = _load_optional(version_dir / "guardian_pipeline.pkl")
+    if pipeline is None and version != LEGACY_VERSION:
+        raise ValueError(f"Model version {version} has no guardian_pipeline.pkl")
+    kmeans_groc = _load_optional(version_dir / "kmeans_groceries.pkl")
+
+    compiled_scorer = None
+    if SCORER_BACKEND == "compiled":
+        from .model_compiler import CompiledScorer, compile_pipeline, load_compiled
+        try:
+            compiled_scorer = load_compiled(version_dir / "guardian_pipeline.compiled.json")
+        except FileNotFoundError:
+            if pipeline is not None:
+                compiled_scorer = CompiledScorer(compile_pipeline(pipeline))
+
+    return ModelBundle(version, pipeline, kmeans_groc, compiled_scorer)
+
+
+def read_manifest() -> Dict[str, Any]:
+    if not MANIFEST_PATH.exists():
+        return {"active": None, "history": []}
+    with open(MANIFEST_PATH, "r") as f:
+        manifest = json.load(f)
+    manifest.setdefault("active", None)
+    manifest.setdefault("history", [])
+    return manifest
+
+
+def _write_manifest(manifest: Dict[str, Any]) -> None:
+    tmp_path = MANIFEST_PATH.with_suffix(".json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def list_versions() -> List[Dict[str, Any]]:
+    versions = []
+    if VERSIONS_DIR.is_dir():
+        for d in sorted(VERSIONS_DIR.iterdir()):
+            # .<name>.tmp directories are registrations still being copied
+            if not d.is_dir() or d.name.startswith("."):
+                continue
+            versions.append({
+                "version": d.name,
+                "files": sorted(p.name for p in d.iterdir() if p.name in ARTIFACT_FILES),
+                "created_at": datetime.utcfromtimestamp(d.stat().st_mtime).isoformat(),
+            })
+    return versions
+
+
+def register_version(source_dir: Path = MODELS_DIR, version: Optional[str] = None) -> str:
+    """
+    Copy the model artifacts in source_dir into models/versions/<version>/.
+    The new version is not activated.
+    """
+    version = version or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    if version == LEGACY_VERSION:
+        raise ValueError(f"Invalid model version: {version!r}")
+    target = _version_dir(version)
+    if target.exists():
+        raise ValueError(f"Model version already exists: {version}")
+
+    files = [Path(source_dir) / name for name in ARTIFACT_FILES if (Path(source_dir) / name).exists()]
+    if not any(p.name == "guardian_pipeline.pkl" for p in files):
+        raise FileNotFoundError(f"guardian_pipeline.pkl not found in {source_dir}")
+
+    tmp_target = VERSIONS_DIR / f".{version}.tmp"
+    tmp_target.mkdir(parents=True, exist_ok=True)
+    for p in files:
+        shutil.copy2(p, tmp_target / p.name)
+    os.replace(tmp_target, target)
+    return version
+
+
+class LoadInProgress(Exception):
+    """
+    Raised when a model version is requested while another is still loading.
+    """
+
+
+_active: Optional[ModelBundle] = None
+_swap_lock = threading.Lock()
+# Guards _status: request threads, the manifest poll and loader threads all
+# start loads and report on them
+_status_lock = threading.Lock()
+_status: Dict[str, Any] = {"loading": None, "last_error": None}
+_last_poll = 0.0
+
+
+def _swap(bundle: ModelBundle) -> None:
+    global _active
+    _active = bundle
+
+
+def _initial_version() -> str:
+    return read_manifest()["active"] or LEGACY_VERSION
+
+
+def get_active_bundle() -> ModelBundle:
+    bundle = _active
+    if bundle is None:
+        with _swap_lock:
+            if _active is None:
+                _swap(load_bundle(_initial_version()))
+        bundle = _active
+    _maybe_follow_manifest(bundle)
+    return bundle
+
+
+def _maybe_follow_manifest(bundle: ModelBundle) -> None:
+    """
+    Other workers change the manifest through the admin API; pick that up
+    here at most every MODEL_MANIFEST_POLL_SECONDS.
+    """
+    global _last_poll
+    if MODEL_MANIFEST_POLL_SECONDS <= 0:
+        return
+    now = time.monotonic()
+    if now - _last_poll < MODEL_MANIFEST_POLL_SECONDS:
+        return
+    _last_poll = now
+
+    try:
+        wanted = read_manifest()["active"]
+    except (OSError, ValueError):
+        return
+    if wanted and wanted != bundle.version:
+        try:
+            _start_load(wanted, _swap)
+        except LoadInProgress:
+            pass
+
+
+def _start_load(version: str, on_loaded, background: bool = True) -> None:
+    """
+    Load version and hand it to on_loaded under the swap lock. Only one load
+    runs at a time; raises LoadInProgress if another has not finished.
+    """
+    with _status_lock:
+        if _status["loading"] is not None:
+            raise LoadInProgress(f"Model version {_status['loading']} is still loading")
+        _status["loading"] = version
+
+    def work():
+        error = None
+        try:
+            bundle = load_bundle(version)
+            with _swap_lock:
+                on_loaded(bundle)
+        except Exception as e:
+            error = {"version": version, "error": str(e)}
+        finally:
+            with _status_lock:
+                _status["last_error"] = error
+                _status["loading"] = None
+
+    if background:
+        threading.Thread(target=work, name=f"model-load-{version}", daemon=True).start()
+    else:
+        work()
+
+
+def activate(version: str, background: bool = True) -> Dict[str, Any]:
+    """
+    Load a version off the request path and swap it in once fully loaded.
+    The previously active version is pushed onto the rollback history.
+    """
+    _registered_dir(version)
+
+    def on_loaded(bundle: ModelBundle):
+        manifest = read_manifest()
+        previous = manifest["active"] or (_active.version if _active else None)
+        if previous and previous != version:
+            manifest["history"].append(previous)
+        manifest["active"] = version
+        _write_manifest(manifest)
+        _swap(bundle)
+
+    _start_load(version, on_loaded, background=background)
+    return get_status()
+
+
+def rollback(background: bool = True) -> Dict[str, Any]:
+    manifest = read_manifest()
+    if not manifest["history"]:
+        raise ValueError("No previous model version to roll back to")
+    previous = manifest["history"][-1]
+    _registered_dir(previous)
+
+    def on_loaded(bundle: ModelBundle):
+        manifest = read_manifest()
+        if manifest["history"] and manifest["history"][-1] == previous:
+            manifest["history"].pop()
+        manifest["active"] = previous
+        _write_manifest(manifest)
+        _swap(bundle)
+
+    _start_load(previous, on_loaded, background=background)
+    return get_status()
+
+
+def get_status() -> Dict[str, Any]:
+    bundle = _active
+    manifest = read_manifest()
+    with _status_lock:
+        status = dict(_status)
+    return {
+        "active": bundle.version if bundle else None,
+        "loaded_at": bundle.loaded_at.isoformat() if bundle else None,
+        "manifest_active": manifest["active"],
+        "history": manifest["history"],
+        "loading": status["loading"],
+        "last_error": status["last_error"],
+    }
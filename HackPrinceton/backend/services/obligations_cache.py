@@ -0,0 +1,278 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+from .state_backend import StateBackend
+
+SUMMARY_NAMESPACE = "obligations_summary"
+# Bumped per user by invalidate(), and the "generation" key by clear()
+VERSION_NAMESPACE = "obligations_summary_version"
+META_NAMESPACE = "obligations_summary_meta"
+
+
+def freeze_summary(summary: Dict[str, Any]) -> Mapping[str, Any]:
+    """
+    Read-only copy of a planner summary: lists become tuples and each
+    obligation entry a read-only mapping, so a cached summary handed to
+    many callers cannot be changed by any of them.
+    """
+    frozen = {}
+    for key, value in summary.items():
+        if isinstance(value, list):
+            value = tuple(
+                MappingProxyType(dict(item)) if isinstance(item, dict) else item
+                for item in value
+            )
+        frozen[key] = value
+    return MappingProxyType(frozen)
+
+
+def _versions(backend: StateBackend, user_id: Hashable) -> Tuple[Any, Any]:
+    # (generation, user version), bumped by PrecomputedSummaryStore.clear()
+    # and invalidate() in whichever process changed the obligations
+    return (
+        backend.get(META_NAMESPACE, "generation", 0),
+        backend.get(VERSION_NAMESPACE, str(user_id), 0),
+    )
+
+
+class ObligationsSummaryCache:
+    """
+    Per-user planner summaries, at most max_entries of them (least recently
+    used evicted first), each valid for ttl_seconds and only for the day
+    and monthly income it was computed with.
+
+    Lookups return the frozen summary; callers layer per-call values such
+    as safe_left on top of it. A result computed while any invalidation
+    ran is not stored, so a write is never masked by a computation that
+    started before it.
+
+    invalidate() and clear() only reach this process. With backend (a
+    function returning the state backend other workers invalidate through),
+    each entry also keeps the user's version and generation from before it
+    was computed, and is checked against the backend again whenever
+    another process has written to it.
+    """
+
+    def __init__(self, max_entries: int = 100000, ttl_seconds: float = 3600.0,
+                 backend: Optional[Callable[[], StateBackend]] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._lock = threading.Lock()
+        # user_id -> (expires_at, day, monthly_income, versions, revision checked at, frozen summary)
+        self._entries: "OrderedDict[Hashable, Tuple[float, date, float, Any, int, Mapping]]" = OrderedDict()
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # Entries dropped because the day or monthly income changed
+        self.mismatches = 0
+        # Entries invalidated by another process
+        self.stale = 0
+        self.invalidations = 0
+
+    def epoch(self, user_id: Optional[Hashable] = None) -> Tuple[int, int, Any]:
+        """
+        Token to pass to put() for user_id's summary computed after this call.
+        """
+        if self.backend is None or user_id is None:
+            return self._epoch, 0, None
+        backend = self.backend()
+        # Revision first: a write after it makes the entry checked again
+        revision = backend.revision()
+        return self._epoch, revision, _versions(backend, user_id)
+
+    def _drop(self, user_id: Hashable) -> None:
+        # Caller holds _lock
+        del self._entries[user_id]
+        self.misses += 1
+
+    def get(self, user_id: Hashable, day: date, monthly_income: float) -> Optional[Mapping[str, Any]]:
+        backend = self.backend() if self.backend is not None else None
+        revision = backend.revision() if backend is not None else 0
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, cached_day, cached_income, _, checked, summary = entry
+            if expires_at <= time.monotonic():
+                self.expirations += 1
+                self._drop(user_id)
+                return None
+            if cached_day != day or cached_income != monthly_income:
+                self.mismatches += 1
+                self._drop(user_id)
+                return None
+            if backend is None or checked == revision:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return summary
+
+        # Another process wrote since this entry was checked: read the
+        # counters outside the lock, then keep or drop the entry
+        current = _versions(backend, user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[3] != current:
+                self.stale += 1
+                self._drop(user_id)
+                return None
+            self._entries[user_id] = entry[:4] + (revision, entry[5])
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[5]
+
+    def put(self, user_id: Hashable, day: date, monthly_income: float,
+            summary: Dict[str, Any], epoch: Tuple[int, int, Any]) -> Mapping[str, Any]:
+        """
+        Freeze and store summary; returns the frozen copy.
+        """
+        frozen = freeze_summary(summary)
+        if self.max_entries <= 0:
+            return frozen
+        local_epoch, revision, versions = epoch
+        with self._lock:
+            if local_epoch != self._epoch:
+                return frozen
+            self._entries[user_id] = (
+                time.monotonic() + self.ttl_seconds, day, monthly_income, versions, revision, frozen,
+            )
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return frozen
+
+    def invalidate(self, user_id: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._epoch += 1
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "mismatches": self.mismatches,
+                "stale": self.stale,
+                "invalidations": self.invalidations,
+            }
+
+
+def summary_to_json(summary: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value.isoformat() if isinstance(value, date) else value
+        for key, value in summary.items()
+    }
+
+
+def summary_from_json(data: Dict[str, Any]) -> Dict[str, Any]:
+    summary = dict(data)
+    if summary.get("plan_start"):
+        summary["plan_start"] = date.fromisoformat(summary["plan_start"])
+    return summary
+
+
+class PrecomputedSummaryStore:
+    """
+    Summaries written ahead of time by the batch job
+    (services.obligations_precompute), one state backend key per user, so
+    a lookup is a few primary-key reads.
+
+    Each entry records the user's version and the store generation from
+    before the job started; an invalidate() or clear() since then makes it
+    stale, so a job that overlaps an obligations write never brings an old
+    summary back.
+    """
+
+    def __init__(self, backend: StateBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def snapshot(self) -> Tuple[float, Dict[str, float]]:
+        """
+        (generation, per-user versions) to pass to put(); take it before
+        computing anything.
+        """
+        return (
+            self.backend.get(META_NAMESPACE, "generation", 0),
+            self.backend.scan_prefix(VERSION_NAMESPACE, ""),
+        )
+
+    def put(self, user_id: str, day: date, monthly_income: float,
+            summary: Mapping[str, Any], snapshot: Tuple[float, Dict[str, float]]) -> None:
+        generation, versions = snapshot
+        self.backend.set(SUMMARY_NAMESPACE, user_id, {
+            "day": day.isoformat(),
+            "monthly_income": monthly_income,
+            "generation": generation,
+            "version": versions.get(user_id, 0),
+            "summary": summary_to_json(summary),
+        })
+
+    def get(self, user_id: str, day: date, monthly_income: float) -> Optional[Dict[str, Any]]:
+        entry = self.backend.get(SUMMARY_NAMESPACE, user_id)
+        if entry is None or entry["day"] != day.isoformat() or entry["monthly_income"] != monthly_income:
+            self.misses += 1
+            return None
+        if (entry["generation"] != self.backend.get(META_NAMESPACE, "generation", 0)
+                or entry["version"] != self.backend.get(VERSION_NAMESPACE, user_id, 0)):
+            self.stale += 1
+            return None
+        self.hits += 1
+        return summary_from_json(entry["summary"])
+
+    def invalidate(self, user_id: str) -> None:
+        self.backend.incr(VERSION_NAMESPACE, user_id, 1)
+
+    def clear(self) -> None:
+        self.backend.incr(META_NAMESPACE, "generation", 1)
+
+    def day_done(self, day: date) -> bool:
+        """
+        Whether a scheduled run for day has finished, in any process sharing
+        the backend.
+        """
+        return self.backend.get(META_NAMESPACE, "last_run_day") == day.isoformat()
+
+    def mark_day_done(self, day: date) -> None:
+        """
+        Record a successful scheduled run for day, so other processes skip it.
+        """
+        self.backend.set(META_NAMESPACE, "last_run_day", day.isoformat())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "last_run": self.backend.get(META_NAMESPACE, "last_report"),
+        }
@@ -1,57 +1,126 @@
-from datetime import datetime, timedelta
+import threading
+import warnings
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
 from typing import Dict, Any, List, Optional
-import pandas as pd
 from pathlib import Path
 
 from config import (
     SAFETY_BUFFER_RATIO,
     SAVINGS_GOAL_RATIO,
     BASELINE_ESSENTIALS_RATIO,
+    OBLIGATION_CATEGORIES,
+    OBLIGATIONS_CACHE_MAX_ENTRIES,
+    OBLIGATIONS_CACHE_TTL_SECONDS,
 )
 
-from .obligations_quantum import quantum_select_optional_events
+from .cashflow_planner import CashFlowPlan, day_index
+from .obligations_cache import ObligationsSummaryCache, PrecomputedSummaryStore
+from .obligations_quantum import select_optional_events
+from .obligations_recurring import (
+    expand_rules,
+    get_expansion_cache_stats,
+    get_recurring_rules_index,
+)
+from .obligations_store import (
+    ObligationRecord,
+    RecurringRule,
+    get_obligations_index,
+    is_db_bound,
+    query_db_obligations,
+    query_db_recurring_rules,
+)
+from .stage_timing import clock, record_since
+from .state_backend import get_state_backend
 
 DATA_DIR = Path(__file__).parent.parent / "data"
+DEFAULT_HORIZON_DAYS = 30
 
 
-def load_obligations_for_user(user_id: str, 
+def _load_one_off_obligations(user_id: str,
                               start_date: datetime,
-                              end_date: datetime) -> pd.DataFrame:
-    csv_path = DATA_DIR / "obligations.csv"
+                              end_date: datetime,
+                              data_dir: Optional[Path] = None) -> List[ObligationRecord]:
+    if is_db_bound():
+        from sqlalchemy.exc import SQLAlchemyError
+        
+        try:
+            return query_db_obligations(user_id, start_date, end_date)
+        except SQLAlchemyError as e:
+            # e.g. the obligations migration has not been applied yet
+            warnings.warn(f"Obligations query failed ({e}), using obligations.csv", UserWarning)
     
-    if not csv_path.exists():
-        return pd.DataFrame()
-    
-    df = pd.read_csv(
-        csv_path,
-        parse_dates=["due_date", "min_pay_date", "max_pay_date"]
-    )
-    
-    df = df[df["user_id"] == user_id]
-    df = df[(df["due_date"] >= start_date) & (df["due_date"] <= end_date)]
+    # Offline (replays, CLI): an index built once per file version
+    index = get_obligations_index((data_dir or DATA_DIR) / "obligations.csv")
+    if index is None:
+        return []
+    return index.query(user_id, start_date, end_date)
+
+
+def load_recurring_rules(user_id: str, data_dir: Optional[Path] = None) -> List[RecurringRule]:
+    if is_db_bound():
+        from sqlalchemy.exc import SQLAlchemyError
+        
+        try:
+            return query_db_recurring_rules(user_id)
+        except SQLAlchemyError as e:
+            warnings.warn(
+                f"Recurring obligations query failed ({e}), using recurring_obligations.csv", UserWarning
+            )
     
-    return df
+    index = get_recurring_rules_index((data_dir or DATA_DIR) / "recurring_obligations.csv")
+    if index is None:
+        return []
+    return index.rules_for(user_id)
 
 
-def split_mandatory_optional(obligations_df: pd.DataFrame) -> tuple:
-    mandatory = obligations_df[obligations_df["mandatory"] == 1]
-    optional = obligations_df[obligations_df["mandatory"] == 0]
+def load_obligations_for_user(user_id: str, 
+                              start_date: datetime,
+                              end_date: datetime,
+                              data_dir: Optional[Path] = None) -> List[ObligationRecord]:
+    """
+    One-off obligations plus occurrences of the user's recurring rules in
+    the window, by due_date. Without a database the CSVs are read from
+    data_dir (default: DATA_DIR).
+    """
+    obligations = _load_one_off_obligations(user_id, start_date, end_date, data_dir)
+    rules = load_recurring_rules(user_id, data_dir)
+    if rules:
+        t0 = clock()
+        # Stable: one-off obligations stay ahead of same-day occurrences
+        obligations = sorted(
+            obligations + expand_rules(rules, start_date, end_date),
+            key=lambda ob: ob.due_date,
+        )
+        record_since("obligations.expand_recurring", t0)
+    return obligations
+
+
+def split_mandatory_optional(obligations: List[ObligationRecord]) -> tuple:
+    mandatory = [ob for ob in obligations if ob.mandatory]
+    optional = [ob for ob in obligations if not ob.mandatory]
     return mandatory, optional
 
 
-def compute_obligations_summary(
-    user_id: str,
-    today: datetime,
+_SUMMARY_ROW_KEYS = (
+    "event_id", "name", "category", "amount", "due_date", "mandatory", "importance", "selected",
+)
+
+
+def summarize_obligations(
+    obligations: List[ObligationRecord],
     income_remaining: float,
     baseline_essentials: float,
     savings_goal: float,
     safety_buffer: float,
-    horizon_days: int = 30,
+    solver: Optional[str] = None,
 ) -> Dict[str, Any]:
-    horizon_end = today + timedelta(days=horizon_days)
-    obligations_df = load_obligations_for_user(user_id, today, horizon_end)
-    
-    if obligations_df.empty:
+    """
+    Summary for one user's obligations in the horizon. Works column by
+    column: one transpose, the mandatory flags as a mask for the split and
+    the selected flags, and one bulk conversion to row dicts at the end.
+    """
+    if not obligations:
         return {
             "mandatory_needed": 0.0,
             "optional_chosen_needed": 0.0,
@@ -61,111 +130,293 @@ def compute_obligations_summary(
                 income_remaining - baseline_essentials - savings_goal - safety_buffer
             ),
             "chosen_optional_ids": [],
+            "optional_solver": None,
             "all_obligations": [],
         }
     
-    mandatory_df, optional_df = split_mandatory_optional(obligations_df)
-    mandatory_needed = float(mandatory_df["amount"].sum())
+    (event_ids, names, categories, amounts, due_dates,
+     mandatory, importances, _, _) = zip(*obligations)
     
+    mandatory_needed = float(sum(a for a, m in zip(amounts, mandatory) if m))
     budget_for_optional = max(
         0.0,
         income_remaining - mandatory_needed - baseline_essentials - savings_goal - safety_buffer
     )
     
-    optional_events = []
-    for _, row in optional_df.iterrows():
-        optional_events.append({
-            "event_id": row["event_id"],
-            "name": row["name"],
-            "amount": float(row["amount"]),
-            "importance": float(row["importance"]),
-            "due_date": row["due_date"],
-        })
-    
-    chosen_optional = quantum_select_optional_events(optional_events, budget_for_optional)
+    # "row" maps a chosen event back to its position for the selected mask
+    optional_events = [
+        {
+            "event_id": event_ids[i],
+            "name": names[i],
+            "amount": amounts[i],
+            "importance": importances[i],
+            "due_date": due_dates[i],
+            "row": i,
+        }
+        for i, m in enumerate(mandatory) if not m
+    ]
+    
+    t0 = clock()
+    selection = select_optional_events(optional_events, budget_for_optional, solver)
+    chosen_optional = selection.chosen
+    record_since("obligations.select_optional", t0)
     optional_chosen_needed = sum(ev["amount"] for ev in chosen_optional)
     reserved_obligations = mandatory_needed + optional_chosen_needed
     
-    free_to_spend = max(
-        0.0,
-        income_remaining - reserved_obligations - baseline_essentials - savings_goal - safety_buffer
-    )
+    selected = list(mandatory)
+    for ev in chosen_optional:
+        selected[ev["row"]] = True
     
-    all_obligations = []
-    for _, row in obligations_df.iterrows():
-        all_obligations.append({
-            "event_id": row["event_id"],
-            "name": row["name"],
-            "category": row["category"],
-            "amount": float(row["amount"]),
-            "due_date": row["due_date"].isoformat() if pd.notna(row["due_date"]) else None,
-            "mandatory": bool(row["mandatory"]),
-            "importance": float(row["importance"]),
-            "selected": row["event_id"] in [ev["event_id"] for ev in chosen_optional] or bool(row["mandatory"]),
-        })
+    # Due dates repeat heavily; format each distinct one once
+    iso = {d: d.isoformat() for d in set(due_dates)}
+    all_obligations = [
+        dict(zip(_SUMMARY_ROW_KEYS, row))
+        for row in zip(event_ids, names, categories, amounts,
+                       map(iso.__getitem__, due_dates), mandatory, importances, selected)
+    ]
     
     return {
         "mandatory_needed": mandatory_needed,
         "optional_chosen_needed": optional_chosen_needed,
         "reserved_obligations": reserved_obligations,
-        "free_to_spend": free_to_spend,
+        "free_to_spend": max(
+            0.0,
+            income_remaining - reserved_obligations - baseline_essentials - savings_goal - safety_buffer
+        ),
         "chosen_optional_ids": [ev["event_id"] for ev in chosen_optional],
+        "optional_solver": selection.solver,
         "all_obligations": all_obligations,
     }
 
 
+def compute_obligations_summary(
+    user_id: str,
+    today: datetime,
+    income_remaining: float,
+    baseline_essentials: float,
+    savings_goal: float,
+    safety_buffer: float,
+    horizon_days: int = DEFAULT_HORIZON_DAYS,
+    solver: Optional[str] = None,
+    data_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    solver picks the optional-events solver for this call (default:
+    OBLIGATIONS_SOLVER); the one whose answer was used is reported as
+    optional_solver. data_dir is passed to load_obligations_for_user.
+    """
+    horizon_end = today + timedelta(days=horizon_days)
+    obligations = load_obligations_for_user(user_id, today, horizon_end, data_dir)
+    return summarize_obligations(
+        obligations, income_remaining, baseline_essentials, savings_goal, safety_buffer, solver
+    )
+
+
 def compute_obligations_for_transaction_scoring(
     user_id: str,
     monthly_income: float,
     discretionary_spent_so_far: float,
+    now: Optional[datetime] = None,
 ) -> Dict[str, Any]:
-    today = datetime.utcnow()
+    # Summaries are kept per day (cached, or precomputed by the nightly job),
+    # so what is already due is decided as of the start of the day
+    day = (now or datetime.utcnow()).date()
+    today = datetime(day.year, day.month, day.day)
     
     baseline_essentials = monthly_income * BASELINE_ESSENTIALS_RATIO
     savings_goal = monthly_income * SAVINGS_GOAL_RATIO
     safety_buffer = monthly_income * SAFETY_BUFFER_RATIO
     income_remaining = monthly_income
     
-    summary = compute_obligations_summary(
-        user_id=user_id,
-        today=today,
-        income_remaining=income_remaining,
-        baseline_essentials=baseline_essentials,
-        savings_goal=savings_goal,
-        safety_buffer=safety_buffer,
+    # From the 1st: bills paid earlier this month still count against it
+    month_start = datetime(today.year, today.month, 1)
+    loaded = load_obligations_for_user(
+        user_id, month_start, today + timedelta(days=DEFAULT_HORIZON_DAYS)
     )
+    split = bisect_left([ob.due_date for ob in loaded], today)
+    paid, obligations = loaded[:split], loaded[split:]
+    summary = summarize_obligations(
+        obligations, income_remaining, baseline_essentials, savings_goal, safety_buffer
+    )
+    
+    # Paid mandatory bills plus the mandatory and chosen optional obligations
+    # ahead go on the day-by-day plan
+    to_pay = [ob for ob in paid if ob.mandatory] + [
+        ob for ob, row in zip(obligations, summary["all_obligations"]) if row["selected"]
+    ]
+    monthly_free = income_remaining - baseline_essentials - savings_goal - safety_buffer
+    t0 = clock()
+    plan = CashFlowPlan(today.date(), DEFAULT_HORIZON_DAYS, monthly_free)
+    plan.pay(to_pay)
+    summary["plan_start"] = plan.start
+    summary["safe_left_by_day"] = plan.daily_safe_left()
+    summary["plan_shortfall"] = plan.shortfall()
+    record_since("obligations.cashflow_plan", t0)
     
-    safe_left = summary["free_to_spend"] - discretionary_spent_so_far
+    safe_left = summary["safe_left_by_day"][0] - discretionary_spent_so_far
     summary["safe_left"] = max(0.0, safe_left)
     
     return summary
 
 
-_obligations_cache: Dict[str, tuple] = {}
+# Written by the batch job; opened on first use, like the scorer's state
+_precomputed: Optional[PrecomputedSummaryStore] = None
+_precomputed_lock = threading.Lock()
+
+
+def get_precomputed_store() -> PrecomputedSummaryStore:
+    global _precomputed
+    if _precomputed is None:
+        with _precomputed_lock:
+            if _precomputed is None:
+                _precomputed = PrecomputedSummaryStore(get_state_backend())
+    return _precomputed
+
+
+# Checks its entries against the counters the precomputed store bumps on
+# invalidation, so edits made in other workers are seen here too
+_summary_cache = ObligationsSummaryCache(
+    max_entries=OBLIGATIONS_CACHE_MAX_ENTRIES,
+    ttl_seconds=OBLIGATIONS_CACHE_TTL_SECONDS,
+    backend=lambda: get_precomputed_store().backend,
+)
 
 
 def get_cached_obligations_summary(
     user_id: str,
     monthly_income: float,
     discretionary_spent_so_far: float,
+    now: Optional[datetime] = None,
+    on: Optional[date] = None,
 ) -> Dict[str, Any]:
-    today = datetime.utcnow().date()
+    """
+    now overrides the current time, e.g. with a simulated clock in replays.
+    safe_left is for the day on (default: today) from the cash-flow plan;
+    days past the plan's horizon use its last day.
     
-    if user_id in _obligations_cache:
-        cached_date, cached_summary = _obligations_cache[user_id]
-        if cached_date == today:
-            cached_summary["safe_left"] = max(
-                0.0,
-                cached_summary["free_to_spend"] - discretionary_spent_so_far
+    The summary is cached per user for the day; nested values are shared
+    with the cache and read-only, only the top-level dict is the caller's.
+    On a miss the batch job's precomputed summary is used if there is one,
+    and only users it missed are computed here.
+    """
+    today = (now or datetime.utcnow()).date()
+    
+    summary = _summary_cache.get(user_id, today, monthly_income)
+    if summary is None:
+        epoch = _summary_cache.epoch(user_id)
+        t0 = clock()
+        computed = get_precomputed_store().get(user_id, today, monthly_income)
+        record_since("obligations.precomputed_read", t0)
+        if computed is None:
+            t0 = clock()
+            computed = compute_obligations_for_transaction_scoring(
+                user_id, monthly_income, 0.0, now
             )
-            return cached_summary
+            record_since("obligations.compute", t0)
+        summary = _summary_cache.put(user_id, today, monthly_income, computed, epoch)
     
-    summary = compute_obligations_for_transaction_scoring(
-        user_id, monthly_income, discretionary_spent_so_far
-    )
+    day = day_index(summary["plan_start"], DEFAULT_HORIZON_DAYS, on or today)
+    return {
+        **summary,
+        "safe_left": max(0.0, summary["safe_left_by_day"][day] - discretionary_spent_so_far),
+    }
+
+
+def invalidate_obligations_summary(user_id: Optional[str] = None) -> None:
+    """
+    Drop the user's cached summary after their obligations change, or every
+    cached summary when user_id is None.
+    """
+    if user_id is None:
+        _summary_cache.clear()
+        get_precomputed_store().clear()
+    else:
+        _summary_cache.invalidate(user_id)
+        get_precomputed_store().invalidate(user_id)
+
+
+def get_obligations_cache_stats() -> Dict[str, Any]:
+    return {
+        **_summary_cache.stats(),
+        "precomputed": get_precomputed_store().stats(),
+        "recurring_expansions": get_expansion_cache_stats(),
+    }
+
+
+def write_obligations_fixture(csv_path: Path, users: int, per_user: int,
+                              start: datetime, horizon_days: int = 30, seed: int = 42) -> None:
+    """
+    Synthetic obligations.csv for benchmarks: per_user obligations for each
+    of users bench_u0.., due within horizon_days of start, about a third of
+    them mandatory.
+    """
+    import random
+    
+    rng = random.Random(seed)
+    categories = list(OBLIGATION_CATEGORIES)
+    with open(csv_path, "w") as f:
+        f.write("user_id,event_id,name,category,amount,due_date,mandatory,importance,min_pay_date,max_pay_date\n")
+        for u in range(users):
+            for i in range(per_user):
+                due = (start + timedelta(days=rng.randrange(horizon_days))).date()
+                window = timedelta(days=rng.randrange(15))
+                f.write(
+                    f"bench_u{u},bench_u{u}_e{i},Obligation {i},{rng.choice(categories)},"
+                    f"{rng.randrange(5, 400)},{due},{int(rng.random() < 0.33)},"
+                    f"{rng.randint(1, 5)},{due - window},{due}\n"
+                )
+
+
+def benchmark_summaries(data_dir: Path, users: int, today: datetime,
+                        rounds: int = 5) -> tuple:
+    """
+    (cold, warm) ms per compute_obligations_summary for users bench_u0..
+    with obligations read from data_dir.
+    """
+    import time
     
-    _obligations_cache[user_id] = (today, summary)
+    def run_all():
+        started = time.perf_counter()
+        for u in range(users):
+            compute_obligations_summary(f"bench_u{u}", today, 500000.0, 1000.0, 500.0, 300.0,
+                                        data_dir=data_dir)
+        return (time.perf_counter() - started) * 1000 / users
     
-    return summary
+    # First round also builds the index and fills the knapsack memo
+    cold_ms = run_all()
+    warm_ms = min(run_all() for _ in range(rounds))
+    return cold_ms, warm_ms
+
+
+def main():
+    # python -m services.obligations_planner [--users 20] [--per-user 3000] [--data-dir DIR]
+    import argparse
+    import tempfile
+    
+    parser = argparse.ArgumentParser(description="Benchmark compute_obligations_summary")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--per-user", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--data-dir", type=Path, default=None,
+                        help="existing directory with obligations.csv for bench_u* users "
+                             "(default: a generated fixture)")
+    args = parser.parse_args()
+    
+    today = datetime(2025, 11, 1)
+    if args.data_dir:
+        cold_ms, warm_ms = benchmark_summaries(args.data_dir, args.users, today, args.rounds)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp)
+            write_obligations_fixture(data_dir / "obligations.csv", args.users, args.per_user, today)
+            cold_ms, warm_ms = benchmark_summaries(data_dir, args.users, today, args.rounds)
+    
+    source = args.data_dir or f"{args.per_user} obligations each"
+    print(
+        f"{args.users} users ({source}): "
+        f"{cold_ms:.2f} ms/summary cold, {warm_ms:.2f} ms/summary warm"
+    )
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+import warnings
+from datetime import date, datetime, timedelta
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config, OBLIGATIONS_PRECOMPUTE_AT, OBLIGATIONS_PRECOMPUTE_WORKERS
+
+from .obligations_cache import META_NAMESPACE
+
+base_dir = Path(__file__).parent.parent
+DEFAULT_USERS_CSV = base_dir / "data" / "user_profiles.csv"
+
+# Users per task handed to a worker
+CHUNK_SIZE = 256
+# A failed scheduled run is retried this often until its day is over
+RETRY_SECONDS = 600
+
+
+def _db_app(database_uri: str):
+    from flask import Flask
+    from models import db
+
+    app = Flask(__name__, instance_path=str(base_dir / "instance"))
+    app.config.from_object(Config)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+    db.init_app(app)
+    return app
+
+
+def _db_user_ids(database_uri: str) -> List[str]:
+    """
+    Scorer user ids known to the database: every account (str(user.id), as
+    the API scores them) and every user_id with obligations or recurring
+    rules, e.g. imported "u1"-style ids.
+    """
+    from sqlalchemy.exc import SQLAlchemyError
+    from models import db, Obligation, RecurringObligation, User
+
+    with _db_app(database_uri).app_context():
+        user_ids = [str(user_id) for (user_id,) in db.session.query(User.id).order_by(User.id)]
+        for model in (Obligation, RecurringObligation):
+            try:
+                user_ids.extend(
+                    user_id for (user_id,) in
+                    db.session.query(model.user_id).distinct().order_by(model.user_id)
+                )
+            except SQLAlchemyError as e:
+                # e.g. its migration has not been applied yet
+                db.session.rollback()
+                warnings.warn(f"Listing {model.__tablename__} users failed: {e}", UserWarning)
+    return user_ids
+
+
+def active_users(users_csv=DEFAULT_USERS_CSV,
+                 database_uri: Optional[str] = None) -> List[Tuple[str, float]]:
+    """
+    (user_id, monthly_income) for each user in the database at database_uri,
+    or else in users_csv, with the income the scorer will look the summary
+    up with.
+    """
+    from .transaction_scorer import DEFAULT_PROFILE, _get_profiles
+
+    profiles = _get_profiles()
+    if database_uri:
+        user_ids = dict.fromkeys(_db_user_ids(database_uri))
+    else:
+        with open(users_csv, "r", newline="") as f:
+            user_ids = dict.fromkeys(row["user_id"] for row in csv.DictReader(f))
+    return [
+        (user_id, (profiles.get(user_id) or DEFAULT_PROFILE)["monthly_income"])
+        for user_id in user_ids
+    ]
+
+
+def _init_worker(database_uri: Optional[str]):
+    # One process per core already; keep numpy from adding threads
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = "1"
+    if database_uri:
+        # Read obligations from the same database as the web app
+        from .obligations_store import bind_app
+
+        bind_app(_db_app(database_uri))
+
+
+def _compute_chunk(args) -> Tuple[List[tuple], int]:
+    day, users = args
+    from .obligations_planner import compute_obligations_for_transaction_scoring
+
+    # As of the start of the day, so obligations due today are included
+    now = datetime(day.year, day.month, day.day)
+    results = []
+    failed = 0
+    for user_id, monthly_income in users:
+        try:
+            summary = compute_obligations_for_transaction_scoring(user_id, monthly_income, 0.0, now)
+        except Exception as e:
+            # Left to on-demand compute in the scorer
+            warnings.warn(f"Precompute failed for {user_id}: {e}", UserWarning)
+            failed += 1
+            continue
+        results.append((user_id, monthly_income, summary))
+    return results, failed
+
+
+def run_precompute(day: Optional[date] = None, users_csv=DEFAULT_USERS_CSV, workers: int = 0,
+                   database_uri: Optional[str] = None, store=None) -> Dict[str, Any]:
+    """
+    Compute every active user's obligations summary for day (default:
+    today, UTC) in a process pool and write them to the precomputed store
+    (default: the scorer's), where the scorer finds them with a key lookup
+    instead of computing on the user's first transaction of the day.
+
+    database_uri makes workers read users and obligations from that
+    database, as the web app does; without it they use users_csv and
+    data/obligations.csv.
+    """
+    from .obligations_planner import get_precomputed_store
+
+    day = day or datetime.utcnow().date()
+    workers = workers or OBLIGATIONS_PRECOMPUTE_WORKERS or os.cpu_count() or 1
+    store = store or get_precomputed_store()
+
+    started = time.perf_counter()
+    users = active_users(users_csv, database_uri)
+    # Before any compute: later invalidations make these entries stale
+    snapshot = store.snapshot()
+    chunks = [(day, users[i:i + CHUNK_SIZE]) for i in range(0, len(users), CHUNK_SIZE)]
+
+    written = 0
+    failed = 0
+    # spawn, not fork: the scheduled run starts from a multithreaded server
+    ctx = get_context("spawn")
+    with ctx.Pool(min(workers, len(chunks) or 1), initializer=_init_worker,
+                  initargs=(database_uri,)) as pool:
+        for results, chunk_failed in pool.imap_unordered(_compute_chunk, chunks):
+            for user_id, monthly_income, summary in results:
+                store.put(user_id, day, monthly_income, summary, snapshot)
+            written += len(results)
+            failed += chunk_failed
+
+    seconds = time.perf_counter() - started
+    report = {
+        "day": day.isoformat(),
+        "users": len(users),
+        "written": written,
+        "failed": failed,
+        "workers": workers,
+        "seconds": round(seconds, 3),
+        "users_per_second": round(len(users) / seconds, 1) if seconds > 0 else None,
+    }
+    store.backend.set(META_NAMESPACE, "last_report", report)
+    return report
+
+
+def _next_run(at: str, now: datetime) -> datetime:
+    hour, minute = (int(part) for part in at.split(":"))
+    run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return run if run > now else run + timedelta(days=1)
+
+
+_schedule_thread: Optional[threading.Thread] = None
+_schedule_stop = threading.Event()
+
+
+def start_precompute_schedule(at: str = OBLIGATIONS_PRECOMPUTE_AT,
+                              database_uri: Optional[str] = None) -> Optional[threading.Thread]:
+    """
+    Run the job every day at `at` ("HH:MM", UTC) on a daemon thread. A
+    day is only recorded as done once its run succeeds; a failed run is
+    retried every RETRY_SECONDS until the day is over. With several server
+    processes on a shared state backend, a day another process has already
+    finished is skipped. No-op when `at` is empty.
+    """
+    global _schedule_thread
+    if not at:
+        return None
+    _next_run(at, datetime.utcnow())  # fail at startup on a bad value
+    if _schedule_thread is not None and _schedule_thread.is_alive():
+        return _schedule_thread
+
+    from .obligations_planner import get_precomputed_store
+
+    def loop():
+        day = None  # set while a failed day is being retried
+        while True:
+            if day is None:
+                run_at = _next_run(at, datetime.utcnow())
+                day = run_at.date()
+            else:
+                run_at = datetime.utcnow() + timedelta(seconds=RETRY_SECONDS)
+            if _schedule_stop.wait(max(0.0, (run_at - datetime.utcnow()).total_seconds())):
+                return
+            store = get_precomputed_store()
+            if store.day_done(day):
+                day = None
+                continue
+            try:
+                run_precompute(day, database_uri=database_uri, store=store)
+            except Exception as e:
+                warnings.warn(f"Obligations precompute for {day} failed: {e}", UserWarning)
+                if datetime.utcnow().date() > day:
+                    day = None
+                continue
+            store.mark_day_done(day)
+            day = None
+
+    _schedule_stop.clear()
+    _schedule_thread = threading.Thread(target=loop, name="obligations-precompute", daemon=True)
+    _schedule_thread.start()
+    return _schedule_thread
+
+
+def stop_precompute_schedule() -> None:
+    _schedule_stop.set()
+
+
+def main():
+    # python -m services.obligations_precompute [--day YYYY-MM-DD] [--workers N] [--csv]
+    from .state_backend import get_state_backend
+
+    parser = argparse.ArgumentParser(description="Precompute obligations summaries for every user")
+    parser.add_argument("--day", type=date.fromisoformat, default=None, help="default: today (UTC)")
+    parser.add_argument("--users", default=str(DEFAULT_USERS_CSV),
+                        help="CSV with a user_id column, read with --csv")
+    parser.add_argument("--workers", type=int, default=0, help="default: one per CPU")
+    parser.add_argument("--database-url", default=Config.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument("--csv", action="store_true",
+                        help="read --users and data/obligations.csv, not the database")
+    args = parser.parse_args()
+
+    if not get_state_backend().shared:
+        print("STATE_BACKEND=memory: summaries are lost when this process exits")
+
+    report = run_precompute(
+        day=args.day,
+        users_csv=args.users,
+        workers=args.workers,
+        database_uri=None if args.csv else args.database_url,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
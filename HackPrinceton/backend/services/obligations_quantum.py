@@ -1,24 +1,46 @@
-from typing import List, Dict
+from collections import OrderedDict
+from typing import Any, Callable, List, Dict, NamedTuple, Optional, Tuple
+import hashlib
+import importlib.util
+import multiprocessing
+import threading
+import time
 import warnings
 
-try:
-    from qiskit import Aer
-    from qiskit.utils import algorithm_globals
-    from qiskit.algorithms import QAOA
-    from qiskit.algorithms.optimizers import COBYLA
-    from qiskit_optimization import QuadraticProgram
-    from qiskit_optimization.algorithms import MinimumEigenOptimizer
-    QISKIT_AVAILABLE = True
-except ImportError:
-    QISKIT_AVAILABLE = False
-    warnings.warn(
-        "Qiskit not installed. Falling back to classical greedy algorithm.",
-        UserWarning
-    )
+from config import (
+    OBLIGATIONS_SOLVER,
+    OBLIGATIONS_SOLVER_TIMEOUT_MS,
+    OBLIGATIONS_SOLVER_POOL_SIZE,
+    KNAPSACK_MEMO_SIZE,
+)
+
+# Probed on the first knapsack solve; importing qiskit takes seconds
+QISKIT_AVAILABLE = None
+
+
+def _qiskit_available() -> bool:
+    global QISKIT_AVAILABLE, Aer, algorithm_globals, QAOA, COBYLA
+    global QuadraticProgram, MinimumEigenOptimizer
+    if QISKIT_AVAILABLE is None:
+        try:
+            from qiskit import Aer
+            from qiskit.utils import algorithm_globals
+            from qiskit.algorithms import QAOA
+            from qiskit.algorithms.optimizers import COBYLA
+            from qiskit_optimization import QuadraticProgram
+            from qiskit_optimization.algorithms import MinimumEigenOptimizer
+            QISKIT_AVAILABLE = True
+        except ImportError:
+            QISKIT_AVAILABLE = False
+            warnings.warn(
+                "Qiskit not installed. Falling back to the classical exact solver.",
+                UserWarning
+            )
+    return QISKIT_AVAILABLE
 
 
 def build_knapsack_qp(optional_events: List[Dict], B_opt: float) -> 'QuadraticProgram':
-    if not QISKIT_AVAILABLE:
+    if not _qiskit_available():
         raise ImportError("Qiskit is not available")
     
     qp = QuadraticProgram()
@@ -41,46 +63,76 @@ def build_knapsack_qp(optional_events: List[Dict], B_opt: float) -> 'QuadraticPr
     return qp
 
 
+def _qaoa_select(optional_events: List[Dict], B_opt: float, reps: int = 1) -> List[Dict]:
+    """
+    QAOA solve with no fallback; raises if qiskit is missing or fails.
+    """
+    if not optional_events or B_opt <= 0:
+        return []
+    
+    qp = build_knapsack_qp(optional_events, B_opt)
+    algorithm_globals.random_seed = 42
+    backend = Aer.get_backend("statevector_simulator")
+    
+    qaoa = QAOA(
+        optimizer=COBYLA(),
+        reps=reps,
+        quantum_instance=backend
+    )
+    
+    optimizer = MinimumEigenOptimizer(qaoa)
+    result = optimizer.solve(qp)
+    
+    chosen_events = []
+    for i, ev in enumerate(optional_events):
+        if result.x[i] > 0.5:
+            chosen_events.append(ev)
+    
+    return chosen_events
+
+
 def solve_knapsack_qaoa(optional_events: List[Dict], B_opt: float, 
                         reps: int = 1) -> List[Dict]:
     if not optional_events or B_opt <= 0:
         return []
     
-    if not QISKIT_AVAILABLE:
-        return _classical_greedy_knapsack(optional_events, B_opt)
+    if not _qiskit_available():
+        return _solve_exact(optional_events, B_opt)
     
     try:
-        qp = build_knapsack_qp(optional_events, B_opt)
-        algorithm_globals.random_seed = 42
-        backend = Aer.get_backend("statevector_simulator")
-        
-        qaoa = QAOA(
-            optimizer=COBYLA(),
-            reps=reps,
-            quantum_instance=backend
-        )
-        
-        optimizer = MinimumEigenOptimizer(qaoa)
-        result = optimizer.solve(qp)
-        
-        chosen_events = []
-        for i, ev in enumerate(optional_events):
-            if result.x[i] > 0.5:
-                chosen_events.append(ev)
-        
-        return chosen_events
+        return _qaoa_select(optional_events, B_opt, reps)
         
     except Exception as e:
         warnings.warn(
             f"Quantum solver failed ({str(e)}), falling back to classical",
             UserWarning
         )
-        return _classical_greedy_knapsack(optional_events, B_opt)
+        return _solve_exact(optional_events, B_opt)
+
+
+def _canonical_order(events: List[Dict]) -> List[int]:
+    """
+    Input indices ordered by (amount, importance), ties in input order.
+    Solvers work in this order, so their answer does not depend on how the
+    events were listed, and the memo can share it across users.
+    """
+    keyed = [(float(ev["amount"]), float(ev["importance"])) for ev in events]
+    return sorted(range(len(keyed)), key=keyed.__getitem__)
+
+
+def _solve_exact(events: List[Dict], budget: float) -> List[Dict]:
+    # numpy comes in with the first solve, not at import
+    from .knapsack import solve_events_exact
+    
+    chosen = {
+        id(ev) for ev in solve_events_exact([events[i] for i in _canonical_order(events)], budget)
+    }
+    return [ev for ev in events if id(ev) in chosen]
 
 
 def _classical_greedy_knapsack(events: List[Dict], budget: float) -> List[Dict]:
     sorted_events = sorted(
-        events,
+        [events[i] for i in _canonical_order(events)],
         key=lambda e: e["importance"] / max(e["amount"], 0.01),
         reverse=True
     )
@@ -96,8 +148,315 @@ def _classical_greedy_knapsack(events: List[Dict], budget: float) -> List[Dict]:
     return chosen
 
 
-def quantum_select_optional_events(optional_events: List[Dict], 
-                                   budget_for_optional: float) -> List[Dict]:
-    return solve_knapsack_qaoa(optional_events, budget_for_optional)
+# Solver name -> fn(events, budget) -> chosen events
+SOLVERS: Dict[str, Callable[[List[Dict], float], List[Dict]]] = {
+    "greedy": _classical_greedy_knapsack,
+    "exact": _solve_exact,
+    "qaoa": _qaoa_select,
+}
+# These run in the solver process pool under OBLIGATIONS_SOLVER_TIMEOUT_MS
+POOLED_SOLVERS = {"qaoa"}
+
+
+class Selection(NamedTuple):
+    chosen: List[Dict]
+    solver: str    # the solver whose answer was used
+
+
+class _PoolStart:
+    """
+    One attempt at starting the solver pool, made on a background thread.
+    """
+    __slots__ = ("generation", "done", "pool", "error")
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = threading.Event()
+        self.pool = None
+        self.error: Optional[BaseException] = None
+
+
+# The current (starting or ready) pool; replaced after a discard
+_pool_start: Optional[_PoolStart] = None
+_pool_generation = 0
+_pool_lock = threading.Lock()
+
+
+def _init_solver_worker() -> None:
+    # Import qiskit once per worker, before any solve is timed
+    _qiskit_available()
+
+
+def _worker_ready() -> bool:
+    return True
+
+
+def _start_pool(start: _PoolStart) -> None:
+    global _pool_start
+    try:
+        # spawn, not fork: the web server forks from a multithreaded process
+        pool = multiprocessing.get_context("spawn").Pool(
+            OBLIGATIONS_SOLVER_POOL_SIZE, initializer=_init_solver_worker
+        )
+        try:
+            pool.apply(_worker_ready)
+        except BaseException:
+            pool.terminate()
+            raise
+    except Exception as e:
+        # e.g. daemonic precompute workers, which may not start processes;
+        # the next solve tries again
+        with _pool_lock:
+            start.error = e
+            if _pool_start is start:
+                _pool_start = None
+        start.done.set()
+        return
+
+    with _pool_lock:
+        current = start.generation == _pool_generation
+        if current:
+            start.pool = pool
+    if not current:
+        # Discarded while starting
+        pool.terminate()
+    start.done.set()
+
+
+def _ensure_pool_start() -> _PoolStart:
+    # Starts the workers on a background thread unless they are already
+    # started or starting
+    global _pool_start
+    with _pool_lock:
+        start = _pool_start
+        if start is None:
+            start = _pool_start = _PoolStart(_pool_generation)
+            threading.Thread(
+                target=_start_pool, args=(start,), name="solver-pool-start", daemon=True
+            ).start()
+    return start
+
 
+def _get_pool(timeout: float):
+    """
+    (pool, generation) once a worker has run its initializer, or None if
+    the pool is not ready within timeout seconds; starting it never blocks
+    a caller for longer than that. Raises if the workers failed to start.
+    """
+    start = _ensure_pool_start()
+    if not start.done.wait(max(0.0, timeout)):
+        return None
+    if start.error is not None:
+        raise start.error
+    return start.pool, start.generation
 
+
+def _discard_pool(generation: int, restart: bool = False) -> None:
+    # A solve that missed its deadline is still running; kill the workers
+    # so it cannot hold up later solves. With restart, replacements start
+    # in the background so later solves do not wait for them.
+    global _pool_start, _pool_generation
+    with _pool_lock:
+        start = _pool_start
+        if start is None or generation != start.generation:
+            return
+        _pool_start = None
+        _pool_generation += 1
+    if start.pool is not None:
+        start.pool.terminate()
+    if restart:
+        _ensure_pool_start()
+
+
+def shutdown_solver_pool() -> None:
+    with _pool_lock:
+        generation = _pool_generation
+    _discard_pool(generation)
+
+
+def _run_solver(solve, events: List[Dict], budget: float) -> List[Dict]:
+    return solve(events, budget)
+
+
+def _importance(events: List[Dict]) -> float:
+    return sum(float(ev["importance"]) for ev in events)
+
+
+def _solve_pooled(name: str, events: List[Dict], budget: float) -> Selection:
+    # One deadline for waiting on the workers and for the solve
+    deadline = time.monotonic() + OBLIGATIONS_SOLVER_TIMEOUT_MS / 1000.0
+    try:
+        ready = _get_pool(deadline - time.monotonic())
+        if ready is None:
+            # Still starting: answer exactly now, the pool serves later solves
+            return Selection(_solve_exact(events, budget), "exact")
+        pool, generation = ready
+        pending = pool.apply_async(_run_solver, (SOLVERS[name], events, budget))
+    except Exception as e:
+        warnings.warn(f"{name} solver pool unavailable ({e}), using the exact solver", UserWarning)
+        return Selection(_solve_exact(events, budget), "exact")
+    # Solved while the pool works; used if the pooled solver is late,
+    # fails, or finds a worse answer
+    fallback = _solve_exact(events, budget)
+    
+    try:
+        chosen = pending.get(timeout=max(0.0, deadline - time.monotonic()))
+    except multiprocessing.TimeoutError:
+        _discard_pool(generation, restart=True)
+        return Selection(fallback, "exact")
+    except Exception as e:
+        warnings.warn(f"{name} solver failed ({e}), using the exact solver", UserWarning)
+        return Selection(fallback, "exact")
+    
+    fits = sum(float(ev["amount"]) for ev in chosen) <= budget + 1e-9
+    if fits and _importance(chosen) >= _importance(fallback):
+        return Selection(chosen, name)
+    return Selection(fallback, "exact")
+
+
+def _qiskit_installed() -> bool:
+    # Checked without importing qiskit into the web process
+    return importlib.util.find_spec("qiskit") is not None
+
+
+class _SelectionMemo:
+    """
+    Bounded LRU of solved problems: (solver, problem digest, budget key)
+    -> (positions chosen in the canonical order, solver used). See
+    _budget_key for how budgets are keyed.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Tuple[Tuple[int, ...], str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> Optional[Tuple[Tuple[int, ...], str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, entry: Tuple[Tuple[int, ...], str]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+            }
+
+
+_memo = _SelectionMemo(KNAPSACK_MEMO_SIZE)
+
+
+def warm_solver_pool(solver: Optional[str] = None) -> None:
+    """
+    Start the pool's workers in the background now if the solver (default:
+    OBLIGATIONS_SOLVER) runs in it, rather than on its first solve.
+    Returns immediately.
+    """
+    name = solver or OBLIGATIONS_SOLVER
+    if name not in POOLED_SOLVERS or (name == "qaoa" and not _qiskit_installed()):
+        return
+    _ensure_pool_start()
+
+
+def _select_uncached(optional_events: List[Dict], budget: float, name: str) -> Selection:
+    if name not in POOLED_SOLVERS:
+        return Selection(SOLVERS[name](optional_events, budget), name)
+    if name == "qaoa" and not _qiskit_installed():
+        _qiskit_available()  # warns once
+        return Selection(_solve_exact(optional_events, budget), "exact")
+    return _solve_pooled(name, optional_events, budget)
+
+
+def _budget_key(name: str, budget: float):
+    # The exact solver only sees whole cents (rounded down, see
+    # knapsack.solve_events_exact), so budgets within the same cent share an
+    # entry; the other solvers compare amounts against the float budget
+    if name == "exact":
+        return int(budget * 100)
+    return budget
+
+
+def select_optional_events(optional_events: List[Dict], budget_for_optional: float,
+                           solver: Optional[str] = None) -> Selection:
+    """
+    Choose optional events with the named solver (default:
+    OBLIGATIONS_SOLVER). Pooled solvers run in a separate process and fall
+    back to the exact solver's answer when they miss the deadline, or while
+    the pool's workers are still starting.
+    
+    Solvers only see the events in canonical order (see _canonical_order),
+    so users with the same (amount, importance) multiset and budget share
+    one memoized solve; for the exact solver, budgets in the same whole
+    cent do too. A memo hit returns the events the solver would pick if
+    called directly. Chosen events come back in input order.
+    """
+    name = solver or OBLIGATIONS_SOLVER
+    if name not in SOLVERS:
+        raise ValueError(f"Unknown obligations solver: {name}")
+    if not optional_events or budget_for_optional <= 0:
+        return Selection([], name)
+    
+    order = _canonical_order(optional_events)
+    pairs = tuple(
+        (float(optional_events[i]["amount"]), float(optional_events[i]["importance"]))
+        for i in order
+    )
+    budget = float(budget_for_optional)
+    digest = hashlib.blake2b(repr(pairs).encode("ascii"), digest_size=16).digest()
+    key = (name, digest, _budget_key(name, budget))
+    entry = _memo.get(key)
+    if entry is None:
+        problem = [
+            {"amount": amount, "importance": importance, "position": position}
+            for position, (amount, importance) in enumerate(pairs)
+        ]
+        selection = _select_uncached(problem, budget, name)
+        entry = (tuple(sorted(ev["position"] for ev in selection.chosen)), selection.solver)
+        # A pooled solve that fell back (late or failed) is retried next time
+        if selection.solver == name:
+            _memo.put(key, entry)
+    
+    positions, used = entry
+    return Selection([optional_events[i] for i in sorted(order[p] for p in positions)], used)
+
+
+def get_knapsack_memo_stats() -> Dict[str, Any]:
+    return _memo.stats()
+
+
+def clear_knapsack_memo() -> None:
+    _memo.clear()
+
+
+def quantum_select_optional_events(optional_events: List[Dict], 
+                                   budget_for_optional: float,
+                                   solver: Optional[str] = None) -> List[Dict]:
+    return select_optional_events(optional_events, budget_for_optional, solver).chosen
@@ -0,0 +1,152 @@
+import csv
+from calendar import monthrange
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from config import RECURRING_EXPANSION_CACHE_SIZE
+
+from .obligations_store import ObligationRecord, RecurringRule, load_by_mtime
+
+base_dir = Path(__file__).parent.parent
+DEFAULT_RULES_CSV_PATH = base_dir / "data" / "recurring_obligations.csv"
+
+FREQUENCY_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+
+
+def validate_rule(rule) -> None:
+    """
+    Check a RecurringRule, or a recurring_obligations row. Raises
+    ValueError with a message for the client.
+    """
+    if rule.frequency not in FREQUENCY_MONTHS:
+        raise ValueError(f"frequency must be one of {', '.join(FREQUENCY_MONTHS)}")
+    if not 1 <= rule.day_of_month <= 31:
+        raise ValueError("day_of_month must be between 1 and 31")
+    if rule.end_date is not None and rule.end_date < rule.start_date:
+        raise ValueError("end_date must not be before start_date")
+    if rule.pay_window_days < 0:
+        raise ValueError("pay_window_days must be >= 0")
+
+
+@lru_cache(maxsize=RECURRING_EXPANSION_CACHE_SIZE)
+def expand_month(rule: RecurringRule, year: int, month: int) -> Tuple[ObligationRecord, ...]:
+    """
+    The rule's occurrences in one calendar month (none or one). Cached per
+    (rule, month); an edited rule is a different key, so stale expansions
+    are never returned, only aged out.
+    """
+    start = rule.start_date
+    months_since_start = (year - start.year) * 12 + month - start.month
+    if months_since_start < 0 or months_since_start % FREQUENCY_MONTHS[rule.frequency]:
+        return ()
+
+    due = datetime(year, month, min(rule.day_of_month, monthrange(year, month)[1]))
+    if due < datetime(start.year, start.month, start.day):
+        return ()
+    if rule.end_date is not None and due > rule.end_date:
+        return ()
+
+    return (ObligationRecord(
+        f"{rule.rule_id}:{year:04d}-{month:02d}",
+        rule.name,
+        rule.category,
+        rule.amount,
+        due,
+        rule.mandatory,
+        rule.importance,
+        due - timedelta(days=rule.pay_window_days),
+        due,
+    ),)
+
+
+def _months(start: datetime, end: datetime) -> Iterable[Tuple[int, int]]:
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def expand_rules(rules: Iterable[RecurringRule], start: datetime,
+                 end: datetime) -> List[ObligationRecord]:
+    """
+    Occurrences of rules with start <= due_date <= end, by due_date. Only
+    the months the window touches are expanded.
+    """
+    months = list(_months(start, end))
+    obligations = [
+        ob
+        for rule in rules
+        if rule.start_date <= end and (rule.end_date is None or rule.end_date >= start)
+        for year, month in months
+        for ob in expand_month(rule, year, month)
+        if start <= ob.due_date <= end
+    ]
+    obligations.sort(key=lambda ob: ob.due_date)
+    return obligations
+
+
+class RecurringRulesIndex:
+    """
+    Recurring obligation rules grouped by user, from
+    data/recurring_obligations.csv (columns: user_id, rule_id, name,
+    category, amount, frequency, day_of_month, start_date, end_date,
+    mandatory, importance, pay_window_days).
+    """
+
+    def __init__(self, by_user: Dict[str, List[RecurringRule]]):
+        self._by_user = by_user
+
+    @classmethod
+    def from_csv(cls, csv_path: Union[str, Path]) -> "RecurringRulesIndex":
+        by_user: Dict[str, List[RecurringRule]] = {}
+        with open(csv_path, "r", newline="") as f:
+            for row in csv.DictReader(f):
+                end_date = row.get("end_date")
+                rule = RecurringRule(
+                    row["rule_id"],
+                    row["name"],
+                    row["category"],
+                    float(row["amount"] or 0.0),
+                    (row.get("frequency") or "monthly").lower(),
+                    int(row["day_of_month"]),
+                    datetime.fromisoformat(row["start_date"]),
+                    datetime.fromisoformat(end_date) if end_date else None,
+                    bool(int(row.get("mandatory") or 0)),
+                    float(row.get("importance") or 0.0),
+                    int(row.get("pay_window_days") or 0),
+                )
+                validate_rule(rule)
+                by_user.setdefault(row["user_id"], []).append(rule)
+        return cls(by_user)
+
+    def rules_for(self, user_id: str) -> List[RecurringRule]:
+        return self._by_user.get(user_id, [])
+
+    def records(self) -> Iterable[tuple]:
+        """
+        (user_id, RecurringRule) pairs.
+        """
+        for user_id, rules in self._by_user.items():
+            for rule in rules:
+                yield user_id, rule
+
+    def __len__(self) -> int:
+        return sum(len(rules) for rules in self._by_user.values())
+
+
+def get_recurring_rules_index(
+    csv_path: Union[str, Path] = DEFAULT_RULES_CSV_PATH,
+) -> Optional[RecurringRulesIndex]:
+    return load_by_mtime(csv_path, RecurringRulesIndex.from_csv, "obligations.load_recurring_rules")
+
+
+def get_expansion_cache_stats() -> Dict[str, int]:
+    info = expand_month.cache_info()
+    return {
+        "entries": info.currsize,
+        "max_entries": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+    }
@@ -0,0 +1,273 @@
+import csv
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Union
+
+from .stage_timing import clock, record_since
+
+base_dir = Path(__file__).parent.parent
+DEFAULT_CSV_PATH = base_dir / "data" / "obligations.csv"
+
+
+class ObligationRecord(NamedTuple):
+    event_id: str
+    name: str
+    category: str
+    amount: float
+    due_date: datetime
+    mandatory: bool
+    importance: float
+    min_pay_date: Optional[datetime]
+    max_pay_date: Optional[datetime]
+
+
+class RecurringRule(NamedTuple):
+    """
+    A rule for obligations that repeat every month, quarter or year on
+    day_of_month (clamped to the month's length), from start_date until
+    end_date. Each occurrence may be paid up to pay_window_days early.
+    """
+    rule_id: str
+    name: str
+    category: str
+    amount: float
+    frequency: str             # "monthly", "quarterly" or "yearly"
+    day_of_month: int
+    start_date: datetime
+    end_date: Optional[datetime]
+    mandatory: bool
+    importance: float
+    pay_window_days: int
+
+
+class ObligationsIndex:
+    """
+    Obligations grouped by user, each user's list sorted by due_date, so a
+    horizon query is two bisects plus a slice.
+    """
+
+    def __init__(self, by_user: Dict[str, List[ObligationRecord]]):
+        self._by_user = by_user
+        self._due_dates = {
+            user_id: [ob.due_date for ob in obligations]
+            for user_id, obligations in by_user.items()
+        }
+
+    @classmethod
+    def from_records(cls, records: Iterable[tuple]) -> "ObligationsIndex":
+        """
+        Build from (user_id, ObligationRecord) pairs. Obligations without a
+        due_date never fall inside a horizon and are left out.
+        """
+        by_user: Dict[str, List[ObligationRecord]] = {}
+        for user_id, obligation in records:
+            if obligation.due_date is None:
+                continue
+            by_user.setdefault(user_id, []).append(obligation)
+        for obligations in by_user.values():
+            # Stable, so same-day obligations keep their input order
+            obligations.sort(key=lambda ob: ob.due_date)
+        return cls(by_user)
+
+    @classmethod
+    def from_csv(cls, csv_path: Union[str, Path]) -> "ObligationsIndex":
+        # Dates and category/name strings repeat across rows; parse and
+        # store each distinct value once
+        dates: Dict[str, Optional[datetime]] = {"": None}
+        strings: Dict[str, str] = {}
+
+        def parse_date(value: str) -> Optional[datetime]:
+            parsed = dates.get(value)
+            if parsed is None and value not in dates:
+                parsed = dates[value] = datetime.fromisoformat(value)
+            return parsed
+
+        def records(reader):
+            header = next(reader, None)
+            if header is None:
+                return
+            col = {name: i for i, name in enumerate(header)}
+            (user_i, event_i, name_i, category_i, amount_i, due_i,
+             mandatory_i, importance_i) = (
+                col["user_id"], col["event_id"], col["name"], col["category"],
+                col["amount"], col["due_date"], col["mandatory"], col["importance"],
+            )
+            min_i = col.get("min_pay_date")
+            max_i = col.get("max_pay_date")
+            for row in reader:
+                if not row:
+                    continue
+                name = row[name_i]
+                category = row[category_i]
+                yield row[user_i], ObligationRecord(
+                    row[event_i],
+                    strings.setdefault(name, name),
+                    strings.setdefault(category, category),
+                    float(row[amount_i] or 0.0),
+                    parse_date(row[due_i]),
+                    bool(int(row[mandatory_i] or 0)),
+                    float(row[importance_i] or 0.0),
+                    parse_date(row[min_i]) if min_i is not None else None,
+                    parse_date(row[max_i]) if max_i is not None else None,
+                )
+
+        with open(csv_path, "r", newline="") as f:
+            return cls.from_records(records(csv.reader(f)))
+
+    def query(self, user_id: str, start: datetime, end: datetime) -> List[ObligationRecord]:
+        """
+        Obligations for user_id with start <= due_date <= end, by due_date.
+        """
+        due_dates = self._due_dates.get(user_id)
+        if not due_dates:
+            return []
+        lo = bisect_left(due_dates, start)
+        hi = bisect_right(due_dates, end, lo)
+        return self._by_user[user_id][lo:hi]
+
+    def records(self) -> Iterable[tuple]:
+        """
+        (user_id, ObligationRecord) pairs, the input format of from_records().
+        """
+        for user_id, obligations in self._by_user.items():
+            for obligation in obligations:
+                yield user_id, obligation
+
+    def user_count(self) -> int:
+        return len(self._by_user)
+
+    def __len__(self) -> int:
+        return sum(len(obligations) for obligations in self._by_user.values())
+
+
+_index_cache: Dict[str, tuple] = {}
+_index_lock = threading.Lock()
+
+
+def load_by_mtime(csv_path: Union[str, Path], build: Callable, stage: str):
+    """
+    build(csv_path), rebuilt only when the file's mtime changes. None if
+    the file does not exist.
+    """
+    key = str(csv_path)
+    try:
+        mtime = Path(csv_path).stat().st_mtime_ns
+    except FileNotFoundError:
+        _index_cache.pop(key, None)
+        return None
+
+    cached = _index_cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _index_lock:
+        cached = _index_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        t0 = clock()
+        index = build(csv_path)
+        record_since(stage, t0)
+        _index_cache[key] = (mtime, index)
+        return index
+
+
+def get_obligations_index(csv_path: Union[str, Path] = DEFAULT_CSV_PATH) -> Optional[ObligationsIndex]:
+    return load_by_mtime(csv_path, ObligationsIndex.from_csv, "obligations.load_index")
+
+
+# Set by bind_app(); once bound, obligations are read from the database
+_app = None
+
+
+def bind_app(app) -> None:
+    global _app
+    _app = app
+
+
+def is_db_bound() -> bool:
+    return _app is not None
+
+
+def _from_row(row) -> ObligationRecord:
+    return ObligationRecord(
+        row.event_id or str(row.id),
+        row.name,
+        row.category,
+        row.amount_cents / 100.0,
+        row.due_date,
+        bool(row.mandatory),
+        float(row.importance),
+        row.min_pay_date,
+        row.max_pay_date,
+    )
+
+
+def query_db_obligations(user_id: str, start: datetime, end: datetime) -> List[ObligationRecord]:
+    """
+    Range query on ix_obligations_user_due for one user's horizon window.
+    Runs in its own app context, so it also works from the scoring batcher
+    thread.
+    """
+    from models import Obligation as ObligationRow
+
+    with _app.app_context():
+        rows = (
+            ObligationRow.query
+            .filter(
+                ObligationRow.user_id == user_id,
+                ObligationRow.due_date >= start,
+                ObligationRow.due_date <= end,
+            )
+            .order_by(ObligationRow.due_date, ObligationRow.id)
+            .all()
+        )
+        return [_from_row(row) for row in rows]
+
+
+def _rule_from_row(row) -> RecurringRule:
+    return RecurringRule(
+        row.rule_id or f"r{row.id}",
+        row.name,
+        row.category,
+        row.amount_cents / 100.0,
+        row.frequency,
+        row.day_of_month,
+        row.start_date,
+        row.end_date,
+        bool(row.mandatory),
+        float(row.importance),
+        row.pay_window_days or 0,
+    )
+
+
+def query_db_recurring_rules(user_id: str) -> List[RecurringRule]:
+    from models import RecurringObligation as RecurringRow
+
+    with _app.app_context():
+        rows = (
+            RecurringRow.query
+            .filter(RecurringRow.user_id == user_id)
+            .order_by(RecurringRow.id)
+            .all()
+        )
+        return [_rule_from_row(row) for row in rows]
+
+
+def main():
+    # python -m services.obligations_store [obligations.csv]
+    import time
+
+    csv_path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CSV_PATH
+    started = time.perf_counter()
+    index = ObligationsIndex.from_csv(csv_path)
+    print(
+        f"Indexed {len(index)} obligations for {index.user_count()} users "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import csv
+import hashlib
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+from config import SAVER_SCORE_MAP
+
+base_dir = Path(__file__).parent.parent
+
+# profile_type is stored as its index in this tuple
+PROFILE_TYPES = tuple(SAVER_SCORE_MAP.keys())
+_PROFILE_CODES = {name: code for code, name in enumerate(PROFILE_TYPES)}
+
+_EMPTY = -1
+_ARRAY_NAMES = ("hash_keys", "hash_slots", "profile_type", "monthly_income", "id_offsets", "id_bytes")
+
+
+def _hash_user_id(user_id: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(user_id.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+class ProfileStore:
+    """
+    User profiles in flat NumPy arrays instead of a dict of dicts.
+
+    User ids map to dense row numbers through an open-addressing table of
+    64-bit id hashes; rows hold profile_type as a uint8 code and
+    monthly_income as float32. Each row also keeps its user id (UTF-8 in
+    id_bytes, bounded by id_offsets), and a lookup only matches when the id
+    itself is equal, so two ids with the same hash never share a profile.
+    That is about 38 bytes per user plus the ids, and the arrays can be
+    saved once and memory-mapped by every worker.
+    """
+
+    def __init__(self, hash_keys: np.ndarray, hash_slots: np.ndarray,
+                 profile_type: np.ndarray, monthly_income: np.ndarray,
+                 id_offsets: np.ndarray, id_bytes: np.ndarray):
+        self.hash_keys = hash_keys
+        self.hash_slots = hash_slots
+        self.profile_type = profile_type
+        self.monthly_income = monthly_income
+        self.id_offsets = id_offsets
+        self.id_bytes = id_bytes
+        self._mask = len(hash_keys) - 1
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str, float]]) -> "ProfileStore":
+        """
+        Bulk-build from (user_id, profile_type, monthly_income) rows, e.g. a
+        CSV reader or a DB cursor. A later row for the same user replaces
+        the earlier one, so every user has exactly one row.
+        """
+        rows_by_id: Dict[str, int] = {}
+        ids = []
+        types = []
+        incomes = []
+        for user_id, profile_type, monthly_income in rows:
+            user_id = str(user_id)
+            code = _PROFILE_CODES.get(profile_type, _PROFILE_CODES["Average"])
+            row = rows_by_id.get(user_id)
+            if row is None:
+                rows_by_id[user_id] = len(ids)
+                ids.append(user_id)
+                types.append(code)
+                incomes.append(float(monthly_income))
+            else:
+                types[row] = code
+                incomes[row] = float(monthly_income)
+
+        n = len(ids)
+        capacity = 8
+        while capacity < 2 * n:
+            capacity *= 2
+        mask = capacity - 1
+
+        hash_keys = np.zeros(capacity, dtype=np.uint64)
+        hash_slots = np.full(capacity, _EMPTY, dtype=np.int32)
+        for row, user_id in enumerate(ids):
+            h = _hash_user_id(user_id)
+            i = h & mask
+            # Ids are unique here, so a taken slot is always another user's
+            while hash_slots[i] != _EMPTY:
+                i = (i + 1) & mask
+            hash_keys[i] = h
+            hash_slots[i] = row
+
+        encoded = [user_id.encode("utf-8") for user_id in ids]
+        id_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=id_offsets[1:])
+
+        return cls(
+            hash_keys,
+            hash_slots,
+            np.asarray(types, dtype=np.uint8),
+            np.asarray(incomes, dtype=np.float32),
+            id_offsets,
+            np.frombuffer(b"".join(encoded), dtype=np.uint8).copy(),
+        )
+
+    @classmethod
+    def from_csv(cls, csv_path: Union[str, Path]) -> "ProfileStore":
+        with open(csv_path, "r") as f:
+            reader = csv.DictReader(f)
+            return cls.from_rows(
+                (row["user_id"], row["profile_type"], row["monthly_income"])
+                for row in reader
+            )
+
+    def save(self, directory: Union[str, Path]) -> Path:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAY_NAMES:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        return directory
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap: bool = True) -> "ProfileStore":
+        directory = Path(directory)
+        mode = "r" if mmap else None
+        return cls(*(np.load(directory / f"{name}.npy", mmap_mode=mode) for name in _ARRAY_NAMES))
+
+    def _user_id_bytes(self, row: int) -> bytes:
+        return self.id_bytes[self.id_offsets[row]:self.id_offsets[row + 1]].tobytes()
+
+    def _row(self, user_id: str) -> int:
+        h = _hash_user_id(user_id)
+        key = None
+        i = h & self._mask
+        while True:
+            row = int(self.hash_slots[i])
+            if row == _EMPTY:
+                return _EMPTY
+            if int(self.hash_keys[i]) == h:
+                if key is None:
+                    key = user_id.encode("utf-8")
+                if self._user_id_bytes(row) == key:
+                    return row
+            i = (i + 1) & self._mask
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        row = self._row(user_id)
+        if row == _EMPTY:
+            return None
+        return {
+            "profile_type": PROFILE_TYPES[self.profile_type[row]],
+            "monthly_income": float(self.monthly_income[row]),
+        }
+
+    def __contains__(self, user_id: str) -> bool:
+        return self._row(user_id) != _EMPTY
+
+    def __len__(self) -> int:
+        return len(self.profile_type)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in _ARRAY_NAMES)
+
+
+def main():
+    # python -m services.profile_store [profiles.csv] [output_dir]
+    csv_path = Path(sys.argv[1]) if len(sys.argv) > 1 else base_dir / "data" / "user_profiles.csv"
+    out_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else base_dir / "data" / "profile_store"
+    store = ProfileStore.from_csv(csv_path)
+    store.save(out_dir)
+    print(f"Saved {len(store)} profiles ({store.nbytes} bytes) to {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
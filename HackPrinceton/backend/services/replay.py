@@ -0,0 +1,270 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+base_dir = Path(__file__).parent.parent
+DEFAULT_INPUT = base_dir / "data" / "transactions.csv"
+DEFAULT_OUTPUT = base_dir / "logs" / "replay.csv"
+
+# Rows scored per model call inside a worker
+CHUNK_SIZE = 4096
+
+OUTPUT_FIELDS = (
+    "user_id", "timestamp", "amount", "base_category", "profile_type",
+    "p_ml", "p_avoid", "decision", "label",
+)
+
+
+def shard_of(user_id: str, shards: int) -> int:
+    return zlib.crc32(user_id.encode("utf-8")) % shards
+
+
+def _split_input(input_path: str, shards: int, tmp: str) -> List[str]:
+    """
+    Copy each row to its user's shard file in one pass, so every worker
+    parses only its own rows. Returns one input path per shard.
+    """
+    if shards == 1:
+        return [str(input_path)]
+    paths = [os.path.join(tmp, f"input-{shard}.csv") for shard in range(shards)]
+    files = [open(path, "w", newline="") for path in paths]
+    try:
+        writers = [csv.writer(f) for f in files]
+        with open(input_path, "r", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return paths
+            for writer in writers:
+                writer.writerow(header)
+            user_column = header.index("user_id")
+            shard_by_user: Dict[str, int] = {}
+            for row in reader:
+                user_id = row[user_column]
+                shard = shard_by_user.get(user_id)
+                if shard is None:
+                    shard = shard_by_user[user_id] = shard_of(user_id, shards)
+                writers[shard].writerow(row)
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def _read_shard(input_path: str):
+    rows = []
+    with open(input_path, "r", newline="") as f:
+        for row in csv.DictReader(f):
+            user_id = row["user_id"]
+            label = row.get("label_avoidable")
+            rows.append((
+                datetime.fromisoformat(row["timestamp"]),
+                user_id,
+                float(row["amount"]),
+                row["merchant_name"],
+                int(row.get("mcc") or 0),
+                row.get("channel") or "offline",
+                int(label) if label not in (None, "") else None,
+            ))
+    # Already-sorted exports cost a single pass
+    rows.sort(key=lambda r: r[0])
+    return rows
+
+
+class _LocalSpendStore:
+    """
+    SpendCounterStore stand-in for one replay worker: plain dicts, no
+    backend, nothing shared.
+    """
+
+    def __init__(self):
+        self._totals: Dict[tuple, Dict[str, float]] = {}
+
+    def get_month(self, user_id: str, month: str) -> Dict[str, float]:
+        return self._totals.get((user_id, month), {})
+
+    def add(self, user_id: str, month: str, category: str, amount: float) -> float:
+        totals = self._totals.setdefault((user_id, month), {})
+        totals[category] = totals.get(category, 0.0) + float(amount)
+        return totals[category]
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {"rows": 0, "tp": 0, "fp": 0, "tn": 0, "fn": 0, "unlabeled": 0, "by_profile": {}}
+
+
+def _init_worker():
+    # One process per core already; native thread pools in numpy/sklearn
+    # would only oversubscribe it. Set before those libraries load.
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = "1"
+
+
+def _replay_shard(args) -> Dict[str, Any]:
+    (input_path, out_path, model_version, thresholds, budget_ratios) = args
+
+    # Runs in a pool worker, so these overrides stay inside this process
+    from services.state_backend import InProcessBackend, set_state_backend
+    import services.transaction_scorer as ts
+    from services.model_registry import get_active_bundle, load_bundle
+
+    set_state_backend(InProcessBackend())
+    ts.SPEND_STORE = _LocalSpendStore()
+    if thresholds:
+        ts.THRESHOLDS.update(thresholds)
+    if budget_ratios:
+        ts.CATEGORY_BUDGET_RATIOS.update(budget_ratios)
+    bundle = load_bundle(model_version) if model_version else get_active_bundle()
+
+    started = time.perf_counter()
+    rows = _read_shard(input_path)
+    stats = _empty_stats()
+
+    with open(out_path, "w", newline="") as out:
+        writer = csv.writer(out)
+        for start in range(0, len(rows), CHUNK_SIZE):
+            chunk = rows[start:start + CHUNK_SIZE]
+            prepared = []
+            for dt, user_id, amount, merchant_name, mcc, channel, _ in chunk:
+                p = ts._prepare_transaction(user_id, amount, merchant_name, mcc, dt.isoformat(), channel)
+                p["as_of"] = dt
+                prepared.append(p)
+
+            p_mls = ts._predict_p_ml([p["row"] for p in prepared], bundle)
+
+            for row, p, p_ml in zip(chunk, prepared, p_mls):
+                result = ts._decide(p, p_ml, bundle.version, commit_if_unchanged=False)
+                label = row[6]
+                blocked = result["decision"] == "BLOCK"
+
+                profile = stats["by_profile"].setdefault(p["profile_type"], {"rows": 0, "blocked": 0})
+                profile["rows"] += 1
+                profile["blocked"] += blocked
+                stats["rows"] += 1
+                if label is None:
+                    stats["unlabeled"] += 1
+                elif blocked:
+                    stats["tp" if label else "fp"] += 1
+                else:
+                    stats["fn" if label else "tn"] += 1
+
+                writer.writerow((
+                    p["user_id"],
+                    row[0].isoformat(),
+                    p["amount"],
+                    p["base_category"],
+                    p["profile_type"],
+                    f"{p_ml:.4f}",
+                    f"{result['p_avoid']:.4f}",
+                    result["decision"][0],
+                    "" if label is None else label,
+                ))
+
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def _merge(results) -> Dict[str, Any]:
+    total = _empty_stats()
+    for stats in results:
+        for key in ("rows", "tp", "fp", "tn", "fn", "unlabeled"):
+            total[key] += stats[key]
+        for profile, counts in stats["by_profile"].items():
+            merged = total["by_profile"].setdefault(profile, {"rows": 0, "blocked": 0})
+            merged["rows"] += counts["rows"]
+            merged["blocked"] += counts["blocked"]
+    return total
+
+
+def build_report(total: Dict[str, Any], seconds: float) -> Dict[str, Any]:
+    tp, fp, fn, tn = total["tp"], total["fp"], total["fn"], total["tn"]
+    return {
+        "rows": total["rows"],
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(total["rows"] / seconds, 1) if seconds > 0 else None,
+        "precision": round(tp / (tp + fp), 4) if tp + fp else None,
+        "recall": round(tp / (tp + fn), 4) if tp + fn else None,
+        "confusion": {"tp": tp, "fp": fp, "tn": tn, "fn": fn, "unlabeled": total["unlabeled"]},
+        "block_rate_by_profile": {
+            profile: round(c["blocked"] / c["rows"], 4)
+            for profile, c in sorted(total["by_profile"].items()) if c["rows"]
+        },
+        "block_rate": round(sum(c["blocked"] for c in total["by_profile"].values()) / total["rows"], 4)
+        if total["rows"] else None,
+    }
+
+
+def run_replay(input_path=DEFAULT_INPUT, output_path=DEFAULT_OUTPUT, workers: int = 0,
+               model_version: Optional[str] = None, thresholds: Optional[Dict] = None,
+               budget_ratios: Optional[Dict] = None) -> Dict[str, Any]:
+    """
+    Replay transactions from a CSV (data/transactions.csv or a DB export with
+    the same columns) and report throughput, precision/recall against
+    label_avoidable and block rates per profile type.
+
+    Users are sharded across worker processes: the parent splits the input
+    into one file per worker in a single pass. Each worker replays its users
+    in timestamp order on a simulated clock with its own in-memory spend
+    state, so the live state backend is never touched.
+    """
+    workers = workers or os.cpu_count() or 1
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=output_path.parent) as tmp:
+        jobs = [
+            (shard_input, os.path.join(tmp, f"shard-{shard}.csv"),
+             model_version, thresholds, budget_ratios)
+            for shard, shard_input in enumerate(_split_input(input_path, workers, tmp))
+        ]
+        with Pool(workers, initializer=_init_worker) as pool:
+            results = pool.map(_replay_shard, jobs)
+
+        with open(output_path, "w", newline="") as out:
+            csv.writer(out).writerow(OUTPUT_FIELDS)
+            for job in jobs:
+                with open(job[1], "r", newline="") as shard_file:
+                    shutil.copyfileobj(shard_file, out)
+
+    report = build_report(_merge(results), time.perf_counter() - started)
+    report["workers"] = workers
+    report["output"] = str(output_path)
+    return report
+
+
+def main():
+    # python -m services.replay [--workers N] [--model-version V] [--thresholds JSON]
+    parser = argparse.ArgumentParser(description="Replay transactions through the scorer")
+    parser.add_argument("--input", default=str(DEFAULT_INPUT))
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT))
+    parser.add_argument("--workers", type=int, default=0, help="default: one per CPU")
+    parser.add_argument("--model-version", default=None, help="registered model version (default: active)")
+    parser.add_argument("--thresholds", type=json.loads, default=None,
+                        help='JSON overrides for THRESHOLDS, e.g. \'{"Saver": 0.5}\'')
+    parser.add_argument("--budget-ratios", type=json.loads, default=None,
+                        help="JSON overrides for CATEGORY_BUDGET_RATIOS")
+    args = parser.parse_args()
+
+    report = run_replay(
+        input_path=args.input,
+        output_path=args.output,
+        workers=args.workers,
+        model_version=args.model_version,
+        thresholds=args.thresholds,
+        budget_ratios=args.budget_ratios,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import csv
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from .model_registry import ModelBundle, load_bundle
+
+base_dir = Path(__file__).parent.parent
+DEFAULT_LOG_PATH = base_dir / "logs" / "shadow_eval.csv"
+
+LOG_FIELDS = (
+    "ts", "user_id", "primary_version", "shadow_version",
+    "primary_p_avoid", "shadow_p_avoid", "primary_decision", "shadow_decision",
+    "shadow_ms",
+)
+
+# Latency samples kept per shadow version for percentiles
+LATENCY_SAMPLES = 10000
+
+
+class _VersionStats:
+    __slots__ = ("n", "agree", "primary_only_block", "shadow_only_block",
+                 "abs_diff_sum", "latencies_ms", "errors")
+
+    def __init__(self, max_samples: Optional[int] = LATENCY_SAMPLES):
+        self.n = 0
+        self.agree = 0
+        self.primary_only_block = 0
+        self.shadow_only_block = 0
+        self.abs_diff_sum = 0.0
+        self.latencies_ms = deque(maxlen=max_samples)
+        self.errors = 0
+
+    def add(self, primary_p: float, shadow_p: float, primary_decision: str,
+            shadow_decision: str, shadow_ms: float) -> None:
+        self.n += 1
+        if primary_decision == shadow_decision:
+            self.agree += 1
+        elif primary_decision == "BLOCK":
+            self.primary_only_block += 1
+        else:
+            self.shadow_only_block += 1
+        self.abs_diff_sum += abs(primary_p - shadow_p)
+        self.latencies_ms.append(shadow_ms)
+
+    def report(self) -> Dict:
+        latencies = sorted(self.latencies_ms)
+
+        def pct(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3)
+
+        return {
+            "scored": self.n,
+            "errors": self.errors,
+            "agreement_rate": round(self.agree / self.n, 4) if self.n else None,
+            "primary_only_block": self.primary_only_block,
+            "shadow_only_block": self.shadow_only_block,
+            "mean_abs_p_avoid_diff": round(self.abs_diff_sum / self.n, 4) if self.n else None,
+            "latency_ms": {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99)},
+        }
+
+
+class ShadowEvaluator:
+    """
+    Runs shadow model versions on transactions the primary model already
+    decided, on a small thread pool off the request path.
+
+    score_fn(prepared, primary_debug, bundle) returns the shadow
+    (p_avoid, decision). At most max_pending transactions wait or run at
+    once; anything beyond that is dropped, never queued.
+    """
+
+    def __init__(self, versions: List[str],
+                 score_fn: Callable[[Dict, Dict, ModelBundle], Tuple[float, str]],
+                 max_workers: int = 2, max_pending: int = 1000,
+                 log_path: Union[str, Path, None] = DEFAULT_LOG_PATH):
+        self.versions = list(versions)
+        self.score_fn = score_fn
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shadow-eval")
+        self._bundles: Dict[str, ModelBundle] = {}
+        self._bundle_lock = threading.Lock()
+        self._stats = {v: _VersionStats() for v in self.versions}
+        # Also guards submitted/dropped, which request threads update
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+
+        self._log_file = None
+        self._log_writer = None
+        if log_path:
+            log_path = Path(log_path)
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            is_new = not log_path.exists() or log_path.stat().st_size == 0
+            self._log_file = open(log_path, "a", newline="", buffering=1)
+            self._log_writer = csv.writer(self._log_file)
+            if is_new:
+                self._log_writer.writerow(LOG_FIELDS)
+
+    def _bundle(self, version: str) -> ModelBundle:
+        bundle = self._bundles.get(version)
+        if bundle is None:
+            with self._bundle_lock:
+                bundle = self._bundles.get(version)
+                if bundle is None:
+                    bundle = load_bundle(version)
+                    self._bundles[version] = bundle
+        return bundle
+
+    def submit(self, prepared: Dict, primary_result: Dict) -> bool:
+        """
+        Hand one decided transaction to the shadow pool. Returns False when
+        it was dropped because the pool is saturated.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        with self._stats_lock:
+            self.submitted += 1
+        debug = primary_result["debug"]
+        primary = (
+            primary_result["p_avoid"],
+            primary_result["decision"],
+            debug.get("model_version"),
+            dict(debug),
+        )
+        try:
+            self._pool.submit(self._run, prepared, primary)
+        except RuntimeError:
+            # Pool shut down
+            self._slots.release()
+            with self._stats_lock:
+                self.submitted -= 1
+                self.dropped += 1
+            return False
+        return True
+
+    def _run(self, prepared: Dict, primary: Tuple) -> None:
+        primary_p, primary_decision, primary_version, primary_debug = primary
+        try:
+            for version in self.versions:
+                stats = self._stats[version]
+                start = time.perf_counter()
+                try:
+                    shadow_p, shadow_decision = self.score_fn(prepared, primary_debug, self._bundle(version))
+                except Exception:
+                    with self._stats_lock:
+                        stats.errors += 1
+                    continue
+                shadow_ms = (time.perf_counter() - start) * 1000.0
+
+                with self._stats_lock:
+                    stats.add(primary_p, shadow_p, primary_decision, shadow_decision, shadow_ms)
+                    if self._log_writer is not None:
+                        self._log_writer.writerow((
+                            int(time.time()),
+                            prepared["user_id"],
+                            primary_version,
+                            version,
+                            f"{primary_p:.4f}",
+                            f"{shadow_p:.4f}",
+                            primary_decision[0],
+                            shadow_decision[0],
+                            f"{shadow_ms:.3f}",
+                        ))
+        finally:
+            self._slots.release()
+
+    def report(self) -> Dict:
+        with self._stats_lock:
+            versions = {v: s.report() for v, s in self._stats.items()}
+            submitted = self.submitted
+            dropped = self.dropped
+        return {
+            "enabled": True,
+            "shadow_versions": self.versions,
+            "submitted": submitted,
+            "dropped": dropped,
+            "max_pending": self.max_pending,
+            "versions": versions,
+        }
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        if self._log_file is not None:
+            self._log_file.close()
+
+
+def report_from_log(log_path: Union[str, Path] = DEFAULT_LOG_PATH) -> Dict:
+    """
+    Agreement and latency report over everything in a shadow log file,
+    grouped by shadow version.
+    """
+    stats: Dict[str, _VersionStats] = {}
+    with open(log_path, "r", newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            # Keep every latency sample for offline reports
+            s = stats.setdefault(row["shadow_version"], _VersionStats(max_samples=None))
+            s.add(
+                float(row["primary_p_avoid"]),
+                float(row["shadow_p_avoid"]),
+                "BLOCK" if row["primary_decision"] == "B" else "ALLOW",
+                "BLOCK" if row["shadow_decision"] == "B" else "ALLOW",
+                float(row["shadow_ms"]),
+            )
+    return {version: s.report() for version, s in stats.items()}
+
+
+def main():
+    # python -m services.shadow_eval [shadow_eval.csv]
+    import json
+    log_path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_LOG_PATH
+    print(json.dumps(report_from_log(log_path), indent=2))
+
+
+if __name__ == "__main__":
+    main()
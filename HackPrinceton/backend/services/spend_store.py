@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Tuple
+
+from .state_backend import StateBackend
+
+NAMESPACE = "spend"
+
+
+def month_key(dt: datetime) -> str:
+    return dt.strftime("%Y-%m")
+
+
+def _counter_key(user_id: str, month: str, category: str) -> str:
+    return f"{user_id}|{month}|{category}"
+
+
+class SpendCounterStore:
+    """
+    Durable per-user monthly spend totals keyed by (user, month, base_category).
+
+    Every scored transaction adds to one running counter in the state
+    backend, so reads never re-sum history. Totals for a new month start
+    from zero on their own because the month is part of the key. A bounded
+    LRU of (user, month) -> {category: total} sits in front of the backend
+    and is dropped whenever another worker writes to a shared backend.
+    """
+
+    def __init__(self, backend: StateBackend, cache_size: int = 10000):
+        self.backend = backend
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], Dict[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._revision = backend.revision()
+
+    def _load(self, user_id: str, month: str) -> Dict[str, float]:
+        prefix = f"{user_id}|{month}|"
+        return {
+            key[len(prefix):]: float(amount)
+            for key, amount in self.backend.scan_prefix(NAMESPACE, prefix).items()
+        }
+
+    def _cached(self, user_id: str, month: str) -> Dict[str, float]:
+        revision = self.backend.revision()
+        if revision != self._revision:
+            self._cache.clear()
+            self._revision = revision
+
+        key = (user_id, month)
+        totals = self._cache.get(key)
+        if totals is None:
+            totals = self._load(user_id, month)
+            if self.cache_size > 0:
+                self._cache[key] = totals
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return totals
+
+    def get_month(self, user_id: str, month: str) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._cached(user_id, month))
+
+    def add(self, user_id: str, month: str, category: str, amount: float) -> float:
+        with self._lock:
+            totals = self._cached(user_id, month)
+            total = self.backend.incr(NAMESPACE, _counter_key(user_id, month, category), float(amount))
+            totals[category] = total
+            return total
+
+    def add_if_unchanged(self, user_id: str, month: str, category: str,
+                         expected_before: float, amount: float) -> bool:
+        """
+        Add amount only if the counter still holds expected_before, i.e. no
+        other worker recorded spend in this category since it was read.
+        """
+        with self._lock:
+            totals = self._cached(user_id, month)
+            key = _counter_key(user_id, month, category)
+            expected = float(expected_before) if category in totals or expected_before else None
+            new_total = float(expected_before) + float(amount)
+            if not self.backend.compare_and_set(NAMESPACE, key, expected, new_total):
+                self._cache.pop((user_id, month), None)
+                return False
+            totals[category] = new_total
+            return True
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
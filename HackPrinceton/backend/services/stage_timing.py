@@ -0,0 +1,185 @@
+import threading
+from bisect import bisect_left
+from time import perf_counter_ns
+from typing import Dict, Optional
+
+from config import STAGE_TIMING_ENABLED
+
+# Histogram bucket upper bounds: 1us, 2us, 4us, ... ~8.4s
+BUCKET_BOUNDS_NS = [1000 << i for i in range(24)]
+
+_enabled = STAGE_TIMING_ENABLED
+
+
+class StageHistogram:
+    """
+    Log2-bucketed latency histogram for one stage.
+    """
+    __slots__ = ("counts", "count", "total_ns", "max_ns", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self._lock = threading.Lock()
+
+    def record(self, ns: int) -> None:
+        bucket = bisect_left(BUCKET_BOUNDS_NS, ns)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total_ns += ns
+            if ns > self.max_ns:
+                self.max_ns = ns
+
+    def _percentile_us(self, counts, count: int, q: float) -> Optional[float]:
+        if not count:
+            return None
+        target = q * count
+        seen = 0
+        for bucket, c in enumerate(counts):
+            seen += c
+            if seen >= target:
+                if bucket < len(BUCKET_BOUNDS_NS):
+                    return BUCKET_BOUNDS_NS[bucket] / 1000.0
+                break
+        return self.max_ns / 1000.0
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+            total_ns = self.total_ns
+            max_ns = self.max_ns
+        return {
+            "count": count,
+            "mean_us": round(total_ns / count / 1000.0, 3) if count else None,
+            "p50_us": self._percentile_us(counts, count, 0.5),
+            "p95_us": self._percentile_us(counts, count, 0.95),
+            "p99_us": self._percentile_us(counts, count, 0.99),
+            "max_us": round(max_ns / 1000.0, 3),
+            # upper bound in us -> count, empty buckets left out
+            "buckets": {
+                (str(BUCKET_BOUNDS_NS[i] // 1000) if i < len(BUCKET_BOUNDS_NS) else "inf"): c
+                for i, c in enumerate(counts) if c
+            },
+        }
+
+
+_histograms: Dict[str, StageHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def record(stage: str, ns: int) -> None:
+    hist = _histograms.get(stage)
+    if hist is None:
+        with _histograms_lock:
+            hist = _histograms.setdefault(stage, StageHistogram())
+    hist.record(ns)
+
+
+def clock() -> int:
+    """
+    Start time for record_since(), or 0 when timing is off.
+    """
+    return perf_counter_ns() if _enabled else 0
+
+
+def record_since(stage: str, start_ns: int) -> None:
+    if start_ns:
+        record(stage, perf_counter_ns() - start_ns)
+
+
+class StageTimer:
+    """
+    Lap timer for one request or batch: each lap(stage) charges the time
+    since the previous lap (or reset) to stage. Laps go to the shared
+    histograms when timing is enabled, and to .breakdown (ms per stage)
+    when a per-request breakdown was asked for.
+    """
+    __slots__ = ("_start", "_last", "_histograms", "breakdown")
+
+    def __init__(self, histograms: bool, breakdown: bool):
+        self._start = self._last = perf_counter_ns()
+        self._histograms = histograms
+        self.breakdown: Optional[Dict[str, float]] = {} if breakdown else None
+
+    def reset(self) -> None:
+        self._last = perf_counter_ns()
+
+    def lap(self, stage: str) -> None:
+        now = perf_counter_ns()
+        self.add(stage, now - self._last)
+        self._last = now
+
+    def add(self, stage: str, ns: int) -> None:
+        if self._histograms:
+            record(stage, ns)
+        if self.breakdown is not None:
+            self.breakdown[stage] = self.breakdown.get(stage, 0.0) + ns / 1e6
+
+    def finish(self, stage: str = "total") -> None:
+        """
+        Charge the time since the timer was created to stage.
+        """
+        self.add(stage, perf_counter_ns() - self._start)
+
+    def report(self) -> Dict[str, float]:
+        return {stage: round(ms, 4) for stage, ms in (self.breakdown or {}).items()}
+
+
+class _NullTimer:
+    """
+    Stand-in when timing is off and no breakdown was asked for; every
+    method is a no-op.
+    """
+    __slots__ = ()
+    breakdown = None
+
+    def reset(self) -> None:
+        pass
+
+    def lap(self, stage: str) -> None:
+        pass
+
+    def add(self, stage: str, ns: int) -> None:
+        pass
+
+    def finish(self, stage: str = "total") -> None:
+        pass
+
+    def report(self) -> Dict[str, float]:
+        return {}
+
+
+NULL_TIMER = _NullTimer()
+
+
+def start_timer(breakdown: bool = False):
+    if not (_enabled or breakdown):
+        return NULL_TIMER
+    return StageTimer(_enabled, breakdown)
+
+
+def set_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def get_stage_timings() -> Dict:
+    with _histograms_lock:
+        items = list(_histograms.items())
+    return {
+        "enabled": _enabled,
+        "stages": {stage: hist.snapshot() for stage, hist in sorted(items)},
+    }
+
+
+def reset_stage_timings() -> None:
+    with _histograms_lock:
+        _histograms.clear()
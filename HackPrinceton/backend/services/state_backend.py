@@ -0,0 +1,231 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from config import STATE_BACKEND, STATE_DB_PATH
+
+base_dir = Path(__file__).parent.parent
+DEFAULT_STATE_DB_PATH = base_dir / "state.db"
+
+_MISSING = object()
+
+
+class StateBackend:
+    """
+    Namespaced key/value state shared by the scorer and the geo-guardian.
+    Values must be JSON-serializable.
+
+    incr and compare_and_set are atomic, so read-modify-write state stays
+    consistent even when several worker processes share the backend.
+    """
+
+    # True when other processes can see and change the same state
+    shared = False
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str) -> None:
+        raise NotImplementedError
+
+    def incr(self, namespace: str, key: str, delta: float) -> float:
+        raise NotImplementedError
+
+    def compare_and_set(self, namespace: str, key: str, expected: Any, new: Any) -> bool:
+        """
+        Store new only if the current value equals expected; expected=None
+        means the key must not exist yet. Returns whether the write happened.
+        """
+        raise NotImplementedError
+
+    def scan_prefix(self, namespace: str, prefix: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def revision(self) -> int:
+        """
+        Changes whenever another process has written to the backend, so
+        in-process caches know when to drop their entries.
+        """
+        return 0
+
+
+class InProcessBackend(StateBackend):
+    shared = False
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        return self._data.get(namespace, {}).get(key, default)
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = value
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._data.get(namespace, {}).pop(key, None)
+
+    def incr(self, namespace: str, key: str, delta: float) -> float:
+        with self._lock:
+            ns = self._data.setdefault(namespace, {})
+            ns[key] = ns.get(key, 0.0) + delta
+            return ns[key]
+
+    def compare_and_set(self, namespace: str, key: str, expected: Any, new: Any) -> bool:
+        with self._lock:
+            ns = self._data.setdefault(namespace, {})
+            current = ns.get(key, _MISSING)
+            if expected is None:
+                if current is not _MISSING:
+                    return False
+            elif current is _MISSING or current != expected:
+                return False
+            ns[key] = new
+            return True
+
+    def scan_prefix(self, namespace: str, prefix: str) -> Dict[str, Any]:
+        with self._lock:
+            return {k: v for k, v in self._data.get(namespace, {}).items() if k.startswith(prefix)}
+
+
+class SQLiteBackend(StateBackend):
+    """
+    One SQLite file in WAL mode shared by every local worker. Writes that
+    depend on the current value run inside BEGIN IMMEDIATE, which holds the
+    database write lock across processes for the read and the write.
+    """
+    shared = True
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_STATE_DB_PATH, busy_timeout_ms: int = 5000):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS kv_state (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+
+    def _read(self, namespace: str, key: str) -> Any:
+        row = self._conn.execute(
+            "SELECT value FROM kv_state WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        return _MISSING if row is None else json.loads(row[0])
+
+    def _write(self, namespace: str, key: str, value: Any) -> None:
+        self._conn.execute(
+            """
+            INSERT INTO kv_state (namespace, key, value) VALUES (?, ?, ?)
+            ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value
+            """,
+            (namespace, key, json.dumps(value)),
+        )
+
+    def _atomic(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            value = self._read(namespace, key)
+        return default if value is _MISSING else value
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._write(namespace, key, value)
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM kv_state WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+
+    def incr(self, namespace: str, key: str, delta: float) -> float:
+        def fn():
+            current = self._read(namespace, key)
+            value = (0.0 if current is _MISSING else current) + delta
+            self._write(namespace, key, value)
+            return value
+        return self._atomic(fn)
+
+    def compare_and_set(self, namespace: str, key: str, expected: Any, new: Any) -> bool:
+        def fn():
+            current = self._read(namespace, key)
+            if expected is None:
+                if current is not _MISSING:
+                    return False
+            elif current is _MISSING or current != expected:
+                return False
+            self._write(namespace, key, new)
+            return True
+        return self._atomic(fn)
+
+    def scan_prefix(self, namespace: str, prefix: str) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM kv_state WHERE namespace = ? AND key >= ? AND key < ?",
+                (namespace, prefix, prefix + "\uffff"),
+            ).fetchall()
+        return {k: json.loads(v) for k, v in rows}
+
+    def revision(self) -> int:
+        # data_version only moves when *another* connection commits
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+_backend: Optional[StateBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_state_backend(kind: str = STATE_BACKEND, path: str = STATE_DB_PATH) -> StateBackend:
+    if kind == "memory":
+        return InProcessBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(path or DEFAULT_STATE_DB_PATH)
+    raise ValueError(f"Unknown STATE_BACKEND: {kind}")
+
+
+def get_state_backend() -> StateBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_state_backend()
+    return _backend
+
+
+def set_state_backend(backend: Optional[StateBackend]) -> Optional[StateBackend]:
+    """
+    Replace this process's backend, e.g. with an InProcessBackend for a
+    replay worker or a test; None goes back to the configured one on next
+    use. Returns the previous backend.
+    """
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    return previous
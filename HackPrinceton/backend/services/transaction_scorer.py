@@ -1,101 +1,109 @@
 from datetime import datetime
-from typing import Dict
-import csv
-import joblib
-import pandas as pd
+from typing import Dict, List, Optional, Tuple
+import threading
 from pathlib import Path
 
 from config import (
-    MERCHANTS,
-    CATEGORY_MCC,
     CATEGORY_BUDGET_RATIOS,
     WANTS_CATEGORIES,
     ESSENTIAL_CATEGORIES,
     SAVER_SCORE_MAP,
     THRESHOLDS,
+    SCORING_BATCH_WINDOW_MS,
+    SCORING_BATCH_MAX_SIZE,
+    SPEND_CACHE_SIZE,
+    IDEMPOTENCY_TTL_SECONDS,
+    IDEMPOTENCY_MAX_ENTRIES,
+    SCORER_LOCK_STRIPES,
+    PROFILE_STORE_DIR,
+    SHADOW_MODEL_VERSIONS,
+    SHADOW_MAX_WORKERS,
+    SHADOW_MAX_PENDING,
+    SHADOW_LOG_PATH,
 )
 from .obligations_planner import get_cached_obligations_summary
+from .obligations_quantum import warm_solver_pool
+from .inference_batcher import InferenceBatcher
+from .spend_store import SpendCounterStore, month_key
+from .state_backend import get_state_backend
+from .model_registry import ModelBundle, get_active_bundle
+from .category_resolver import resolve_category
+from .idempotency import IdempotencyCache
+from .locks import StripedLock
+from .shadow_eval import ShadowEvaluator, DEFAULT_LOG_PATH as DEFAULT_SHADOW_LOG_PATH
+from .stage_timing import NULL_TIMER, start_timer
 
 base_dir = Path(__file__).parent.parent
-pipeline = None
-kmeans_groc = None
-
-def _load_models():
-    global pipeline, kmeans_groc
-    try:
-        pipeline = joblib.load(base_dir / "models" / "guardian_pipeline.pkl")
-    except FileNotFoundError:
-        pipeline = None
-    
-    try:
-        kmeans_groc = joblib.load(base_dir / "models" / "kmeans_groceries.pkl")
-    except FileNotFoundError:
-        kmeans_groc = None
 
 
 def _load_user_profiles():
-    profiles = {}
-    csv_path = base_dir / "data" / "user_profiles.csv"
-    
-    if not csv_path.exists():
-        return {
-            "u1": {"profile_type": "Saver", "monthly_income": 2000},
-            "u2": {"profile_type": "Average", "monthly_income": 3000},
-            "u3": {"profile_type": "Spender", "monthly_income": 4500},
-        }
+    # numpy comes in with the profile store; keep it off the import path
+    from .profile_store import ProfileStore
     
-    with open(csv_path, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            profiles[row['user_id']] = {
-                "profile_type": row['profile_type'],
-                "monthly_income": float(row['monthly_income']),
-            }
-    return profiles
+    if PROFILE_STORE_DIR:
+        return ProfileStore.load(PROFILE_STORE_DIR)
 
+    csv_path = base_dir / "data" / "user_profiles.csv"
+    if not csv_path.exists():
+        return ProfileStore.from_rows([
+            ("u1", "Saver", 2000),
+            ("u2", "Average", 3000),
+            ("u3", "Spender", 4500),
+        ])
+    return ProfileStore.from_csv(csv_path)
 
-MERCHANT_CATEGORY_MAP: Dict[str, str] = {}
-for cat, merchants in MERCHANTS.items():
-    for m in merchants:
-        MERCHANT_CATEGORY_MAP[m] = cat
 
-USER_PROFILES: Dict[str, Dict[str, float]] = {}
-USER_MONTHLY_SPEND: Dict[str, Dict[str, float]] = {}
+# Both load on first use (or in warmup()), not at import
+USER_PROFILES = None
+SPEND_STORE: SpendCounterStore = None
+_init_lock = threading.Lock()
 
-def _initialize():
-    global USER_PROFILES, USER_MONTHLY_SPEND
-    _load_models()
-    USER_PROFILES = _load_user_profiles()
-    USER_MONTHLY_SPEND = {uid: {} for uid in USER_PROFILES.keys()}
 
-# Initialize on module load
-_initialize()
+def _get_profiles():
+    global USER_PROFILES
+    if USER_PROFILES is None:
+        with _init_lock:
+            if USER_PROFILES is None:
+                USER_PROFILES = _load_user_profiles()
+    return USER_PROFILES
 
 
-def get_base_category(merchant_name: str, mcc: int) -> str:
-    if merchant_name in MERCHANT_CATEGORY_MAP:
-        return MERCHANT_CATEGORY_MAP[merchant_name]
-    for cat, cmcc in CATEGORY_MCC.items():
-        if cmcc == mcc:
-            return cat
-    return "MISC_ONLINE"
+def _get_spend_store() -> SpendCounterStore:
+    global SPEND_STORE
+    if SPEND_STORE is None:
+        with _init_lock:
+            if SPEND_STORE is None:
+                SPEND_STORE = SpendCounterStore(get_state_backend(), cache_size=SPEND_CACHE_SIZE)
+    return SPEND_STORE
 
 
-def score_transaction(user_id: str, amount: float, merchant_name: str, 
-                     mcc: int = 0, timestamp: str = "", channel: str = "offline") -> Dict:
+def warmup() -> None:
     """
-    Score a transaction and return decision, probability, reason, and debug info.
-    
-    Returns:
-        dict with keys: decision, p_avoid, reason, debug
+    Load profiles, spend state and the active model (pandas/sklearn) now
+    rather than on the first scored transaction, and start the obligations
+    solver pool if the configured solver uses one.
     """
-    if user_id not in USER_PROFILES:
-        USER_PROFILES[user_id] = {"profile_type": "Average", "monthly_income": 3000}
-        USER_MONTHLY_SPEND[user_id] = {}
+    _get_profiles()
+    _get_spend_store()
+    get_active_bundle()
+    warm_solver_pool()
+
+
+def get_base_category(merchant_name: str, mcc: int) -> str:
+    return resolve_category(merchant_name, mcc)
+
+
+# Used for users missing from USER_PROFILES; they are not added to it
+DEFAULT_PROFILE = {"profile_type": "Average", "monthly_income": 3000}
+
+
+def _prepare_transaction(user_id: str, amount: float, merchant_name: str,
+                         mcc: int = 0, timestamp: str = "", channel: str = "offline",
+                         timer=NULL_TIMER) -> Dict:
+    profile = _get_profiles().get(user_id) or DEFAULT_PROFILE
+    timer.lap("profile_lookup")
     
-    profile = USER_PROFILES[user_id]
     profile_type = profile["profile_type"]
-    income = profile["monthly_income"]
     saver_score = SAVER_SCORE_MAP.get(profile_type, 1)
     
     if timestamp:
@@ -103,58 +111,98 @@ def score_transaction(user_id: str, amount: float, merchant_name: str,
     else:
         dt = datetime.utcnow()
     
-    hour = dt.hour
-    day_of_week = dt.weekday()
-    
     base_category = get_base_category(merchant_name, mcc or 0)
-    micro_category = "NONE"
-    
-    if base_category == "GROCERIES" and kmeans_groc is not None:
-        Xg = [[amount, hour, day_of_week]]
-        cluster = kmeans_groc.predict(Xg)[0]
-        micro_category = str(cluster)
-    
-    ratio = CATEGORY_BUDGET_RATIOS.get(base_category, 0.1)
-    budget_cat = income * ratio
-    user_spend = USER_MONTHLY_SPEND.setdefault(user_id, {})
-    spend_before = user_spend.get(base_category, 0.0)
-    spend_after = spend_before + amount
-    over_budget_ratio = (spend_after / budget_cat) if budget_cat > 0 else 0.0
+    timer.lap("category")
     
     row = {
         "amount": amount,
-        "hour_of_day": hour,
-        "day_of_week": day_of_week,
+        "hour_of_day": dt.hour,
+        "day_of_week": dt.weekday(),
         "saver_score": saver_score,
         "base_category": base_category,
-        "micro_category": micro_category,
+        "micro_category": "NONE",
         "channel": channel,
     }
-    X = pd.DataFrame([row])
+    return {
+        "user_id": user_id,
+        "amount": amount,
+        "profile_type": profile_type,
+        "income": profile["monthly_income"],
+        "base_category": base_category,
+        "month": month_key(dt),
+        "date": dt.date(),
+        "row": row,
+        "timer": timer,
+    }
+
+
+def _predict_p_ml(rows: List[Dict], bundle: ModelBundle, timer=NULL_TIMER) -> List[float]:
+    """
+    Fill in grocery micro-categories and run the model over all rows at once.
+    """
+    timer.reset()
+    groc_idx = [i for i, r in enumerate(rows) if r["base_category"] == "GROCERIES"]
+    if groc_idx and bundle.kmeans_groc is not None:
+        Xg = [[rows[i]["amount"], rows[i]["hour_of_day"], rows[i]["day_of_week"]] for i in groc_idx]
+        clusters = bundle.kmeans_groc.predict(Xg)
+        for i, cluster in zip(groc_idx, clusters):
+            rows[i]["micro_category"] = str(cluster)
+    timer.lap("kmeans")
     
-    if pipeline is not None:
-        p_ml = float(pipeline.predict_proba(X)[0, 1])
-    else:
+    if bundle.compiled_scorer is not None:
+        p_mls = [float(p) for p in bundle.compiled_scorer.predict_proba_rows(rows)]
+        timer.lap("predict_compiled")
+        return p_mls
+    
+    if bundle.pipeline is None:
         # Fallback if model not trained
-        p_ml = 0.5
+        return [0.5] * len(rows)
     
+    import pandas as pd
+    X = pd.DataFrame(rows)
+    timer.lap("dataframe")
+    p_mls = [float(p) for p in bundle.pipeline.predict_proba(X)[:, 1]]
+    timer.lap("predict_proba")
+    return p_mls
+
+
+USER_LOCKS = StripedLock(SCORER_LOCK_STRIPES)
+
+
+def _apply_decision(prepared: Dict, p_ml: float, model_version: str) -> Dict:
+    # Reading spend, deciding and recording the new spend must not interleave
+    # with another transaction of the same user
+    timer = prepared.get("timer", NULL_TIMER)
+    timer.reset()
+    with USER_LOCKS.for_key(prepared["user_id"]):
+        timer.lap("lock_wait")
+        return _apply_decision_locked(prepared, p_ml, model_version)
+
+
+MAX_SPEND_CAS_RETRIES = 20
+
+
+def _apply_decision_locked(prepared: Dict, p_ml: float, model_version: str) -> Dict:
+    # The per-user lock covers this process; other workers sharing the state
+    # backend are caught by the compare-and-set in _decide, which re-decides
+    # on fresh spend if someone else recorded spend in the meantime
+    for _ in range(MAX_SPEND_CAS_RETRIES):
+        result = _decide(prepared, p_ml, model_version, commit_if_unchanged=True)
+        if result is not None:
+            return result
+    return _decide(prepared, p_ml, model_version, commit_if_unchanged=False)
+
+
+def _apply_rules(p_ml: float, amount: float, base_category: str, spend_before: float,
+                 over_budget_ratio: float, safe_left: float,
+                 reserved_obligations: float) -> Tuple[float, str, bool]:
+    """
+    Budget and obligations adjustments on top of the model probability.
+    Returns (p_avoid, reason, obligations_triggered).
+    """
     p_avoid = p_ml
     reason = "Model thinks this might be avoidable."
     
-    discretionary_spent_so_far = sum(
-        user_spend.get(cat, 0.0) for cat in WANTS_CATEGORIES
-    )
-    
-    obligations_summary = get_cached_obligations_summary(
-        user_id=user_id,
-        monthly_income=income,
-        discretionary_spent_so_far=discretionary_spent_so_far,
-    )
-    
-    free_to_spend = obligations_summary["free_to_spend"]
-    safe_left = obligations_summary["safe_left"]
-    reserved_obligations = obligations_summary["reserved_obligations"]
-    
     obligations_triggered = False
     if base_category in WANTS_CATEGORIES:
         if safe_left <= 0:
@@ -187,10 +235,64 @@ def score_transaction(user_id: str, amount: float, merchant_name: str,
             p_avoid *= 0.5
             reason = "This looks like an essential recurring expense."
     
+    return p_avoid, reason, obligations_triggered
+
+
+def _decide(prepared: Dict, p_ml: float, model_version: str,
+            commit_if_unchanged: bool) -> Optional[Dict]:
+    user_id = prepared["user_id"]
+    amount = prepared["amount"]
+    profile_type = prepared["profile_type"]
+    income = prepared["income"]
+    base_category = prepared["base_category"]
+    timer = prepared.get("timer", NULL_TIMER)
+    
+    ratio = CATEGORY_BUDGET_RATIOS.get(base_category, 0.1)
+    budget_cat = income * ratio
+    month = prepared["month"]
+    spend_store = _get_spend_store()
+    user_spend = spend_store.get_month(user_id, month)
+    spend_before = user_spend.get(base_category, 0.0)
+    spend_after = spend_before + amount
+    over_budget_ratio = (spend_after / budget_cat) if budget_cat > 0 else 0.0
+    timer.lap("spend_read")
+    
+    discretionary_spent_so_far = sum(
+        user_spend.get(cat, 0.0) for cat in WANTS_CATEGORIES
+    )
+    
+    obligations_summary = get_cached_obligations_summary(
+        user_id=user_id,
+        monthly_income=income,
+        discretionary_spent_so_far=discretionary_spent_so_far,
+        # Set by replays running on a simulated clock
+        now=prepared.get("as_of"),
+        on=prepared.get("date"),
+    )
+    timer.lap("obligations")
+    
+    free_to_spend = obligations_summary["free_to_spend"]
+    safe_left = obligations_summary["safe_left"]
+    reserved_obligations = obligations_summary["reserved_obligations"]
+    
+    p_avoid, reason, obligations_triggered = _apply_rules(
+        p_ml, amount, base_category, spend_before, over_budget_ratio,
+        safe_left, reserved_obligations,
+    )
+    
     threshold = THRESHOLDS.get(profile_type, 0.6)
     decision = "BLOCK" if p_avoid >= threshold else "ALLOW"
     
-    user_spend[base_category] = spend_after
+    timer.lap("decision")
+    
+    if commit_if_unchanged:
+        committed = spend_store.add_if_unchanged(user_id, month, base_category, spend_before, amount)
+        timer.lap("spend_write")
+        if not committed:
+            return None
+    else:
+        spend_store.add(user_id, month, base_category, amount)
+        timer.lap("spend_write")
     
     debug = {
         "p_ml": p_ml,
@@ -202,6 +304,8 @@ def score_transaction(user_id: str, amount: float, merchant_name: str,
         "obligations_free_to_spend": free_to_spend,
         "obligations_safe_left": safe_left,
         "obligations_triggered": obligations_triggered,
+        "obligations_solver": obligations_summary.get("optional_solver"),
+        "model_version": model_version,
     }
     
     return {
@@ -212,3 +316,209 @@ def score_transaction(user_id: str, amount: float, merchant_name: str,
     }
 
 
+# Shared with the other workers through the state backend, so a retry
+# that lands on another worker is still replayed
+IDEMPOTENCY_CACHE = IdempotencyCache(
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+    max_entries=IDEMPOTENCY_MAX_ENTRIES,
+    backend=get_state_backend,
+)
+
+
+def score_transaction(user_id: str, amount: float, merchant_name: str, 
+                     mcc: int = 0, timestamp: str = "", channel: str = "offline",
+                     idempotency_key: str = "", debug_timing: bool = False) -> Dict:
+    """
+    Score a transaction and return decision, probability, reason, and debug info.
+    
+    With an idempotency_key (e.g. the upstream transaction id), a retry of the
+    same transaction returns the original decision without touching spend
+    state again; debug.idempotent_replay marks such replays.
+    
+    With debug_timing, debug.timing_ms holds the time spent in each stage.
+    
+    Returns:
+        dict with keys: decision, p_avoid, reason, debug
+    """
+    timer = start_timer(breakdown=debug_timing)
+    if not idempotency_key:
+        result = _score_one(user_id, amount, merchant_name, mcc, timestamp, channel, timer)
+    else:
+        fingerprint = (amount, merchant_name, mcc, timestamp, channel)
+        result, replayed = IDEMPOTENCY_CACHE.run(
+            (user_id, idempotency_key),
+            fingerprint,
+            lambda: _score_one(user_id, amount, merchant_name, mcc, timestamp, channel, timer),
+        )
+        if replayed:
+            result = {**result, "debug": {**result["debug"], "idempotent_replay": True}}
+    
+    timer.finish()
+    if timer.breakdown is not None:
+        # Added to a copy: the timing belongs to this call, not to the
+        # result the idempotency cache keeps for retries
+        result = {**result, "debug": {**result["debug"], "timing_ms": timer.report()}}
+    return result
+
+
+def _score_one(user_id: str, amount: float, merchant_name: str,
+               mcc: int, timestamp: str, channel: str, timer) -> Dict:
+    prepared = _prepare_transaction(user_id, amount, merchant_name, mcc, timestamp, channel, timer)
+    
+    batcher = _get_batcher()
+    if batcher is not None:
+        return batcher.submit(prepared)
+    result = _score_prepared([prepared])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def score_transactions(transactions: List[Dict]) -> List:
+    """
+    Score many transactions with a single model call.
+    
+    Each item takes the same keys as score_transaction's arguments. Budget and
+    obligations adjustments are applied in input order, so earlier rows count
+    towards the monthly spend seen by later rows of the same user.
+    
+    A row that cannot be scored does not fail the others, whose spend is
+    already recorded by then: its slot holds the exception instead.
+    
+    Returns:
+        list of result dicts (or exceptions), in input order
+    """
+    results: List = [None] * len(transactions)
+    prepared = []
+    positions = []
+    for i, tx in enumerate(transactions):
+        try:
+            prepared.append(_prepare_transaction(
+                user_id=tx["user_id"],
+                amount=float(tx["amount"]),
+                merchant_name=tx["merchant_name"],
+                mcc=int(tx.get("mcc") or 0),
+                timestamp=tx.get("timestamp") or "",
+                channel=tx.get("channel") or "offline",
+                timer=start_timer(),
+            ))
+            positions.append(i)
+        except Exception as e:
+            results[i] = e
+    
+    if prepared:
+        for i, result in zip(positions, _score_prepared(prepared)):
+            results[i] = result
+    return results
+
+
+def _score_prepared(prepared: List[Dict]) -> List:
+    """
+    Result dicts in input order. A row whose decision fails holds the
+    exception instead: rows before it have already recorded their spend,
+    so their results must still reach their callers.
+    """
+    # One bundle per batch, so a hot swap never mixes model versions mid-batch
+    bundle = get_active_bundle()
+    
+    # Model stages run once per batch; requests that asked for a breakdown
+    # are charged the whole batch's time for them
+    batch_timer = start_timer(breakdown=any(p["timer"].breakdown is not None for p in prepared))
+    p_mls = _predict_p_ml([p["row"] for p in prepared], bundle, batch_timer)
+    if batch_timer.breakdown is not None:
+        for p in prepared:
+            if p["timer"].breakdown is not None:
+                p["timer"].breakdown.update(batch_timer.breakdown)
+    
+    results = []
+    for p, p_ml in zip(prepared, p_mls):
+        try:
+            results.append(_apply_decision(p, p_ml, bundle.version))
+        except Exception as e:
+            results.append(e)
+    
+    shadow = _get_shadow()
+    if shadow is not None:
+        for p, result in zip(prepared, results):
+            if not isinstance(result, Exception):
+                shadow.submit(p, result)
+    return results
+
+
+def _shadow_score(prepared: Dict, primary_debug: Dict, bundle: ModelBundle) -> Tuple[float, str]:
+    # Same features and the same spend/obligations context the primary
+    # decision saw; only the model differs. Nothing is written to spend state.
+    row = dict(prepared["row"], micro_category="NONE")
+    p_ml = _predict_p_ml([row], bundle)[0]
+    p_avoid, _, _ = _apply_rules(
+        p_ml,
+        prepared["amount"],
+        prepared["base_category"],
+        primary_debug["spend_before"],
+        primary_debug["over_budget_ratio"],
+        primary_debug["obligations_safe_left"],
+        primary_debug["obligations_reserved"],
+    )
+    decision = "BLOCK" if p_avoid >= primary_debug["threshold"] else "ALLOW"
+    return p_avoid, decision
+
+
+_shadow = None
+_shadow_lock = threading.Lock()
+
+
+def _get_shadow():
+    """
+    Shadow evaluator for SHADOW_MODEL_VERSIONS, or None when none are set.
+    """
+    global _shadow
+    if not SHADOW_MODEL_VERSIONS:
+        return None
+    if _shadow is None:
+        with _shadow_lock:
+            if _shadow is None:
+                _shadow = ShadowEvaluator(
+                    SHADOW_MODEL_VERSIONS,
+                    _shadow_score,
+                    max_workers=SHADOW_MAX_WORKERS,
+                    max_pending=SHADOW_MAX_PENDING,
+                    log_path=SHADOW_LOG_PATH or DEFAULT_SHADOW_LOG_PATH,
+                )
+    return _shadow
+
+
+def get_shadow_report() -> Dict:
+    shadow = _get_shadow()
+    if shadow is None:
+        return {"enabled": False}
+    return shadow.report()
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def _get_batcher():
+    """
+    Shared micro-batcher for single-transaction scoring, or None when
+    SCORING_BATCH_WINDOW_MS is 0. Decisions are applied on the batcher thread
+    in arrival order, so per-user spend updates stay ordered.
+    """
+    global _batcher
+    if SCORING_BATCH_WINDOW_MS <= 0:
+        return None
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = InferenceBatcher(
+                    _score_prepared,
+                    window_ms=SCORING_BATCH_WINDOW_MS,
+                    max_batch_size=SCORING_BATCH_MAX_SIZE,
+                )
+    return _batcher
+
+
+def get_batcher_stats() -> Dict:
+    if SCORING_BATCH_WINDOW_MS <= 0:
+        return {"enabled": False}
+    return {"enabled": True, **_get_batcher().stats()}
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests that bulk scoring (score_transactions and /score-transactions/batch)
+gives the same results as scoring each row with score_transaction.
+
+Usage:
+    python test_batch_scoring.py
+"""
+
+import math
+
+from flask import Flask
+
+import services.transaction_scorer as ts
+from config import Config
+from models import db
+from routes.transaction_scoring import transaction_scoring_bp
+from services.spend_store import SpendCounterStore
+from services.state_backend import InProcessBackend, set_state_backend
+
+TIMESTAMP = "2025-11-09T10:00:00"
+MONTH = "2025-11"
+USERS = ("parity_a", "parity_b", "parity_c")
+
+
+def _tx(user_id, amount, merchant_name="Zara", **extra):
+    return {"user_id": user_id, "amount": amount, "merchant_name": merchant_name,
+            "timestamp": TIMESTAMP, **extra}
+
+
+# Interleaved users, repeated categories and a spend that crosses the budget
+ROWS = [
+    _tx("parity_a", 40.0),
+    _tx("parity_b", 12.5, merchant_name="STARBUCKS #1234 NYC", mcc=5814),
+    _tx("parity_a", 250.0),
+    _tx("parity_a", 9.99, merchant_name="Uber Eats", channel="online"),
+    _tx("parity_b", 3.0, merchant_name="STARBUCKS #1234 NYC", mcc=5814),
+    _tx("parity_a", 400.0),
+    _tx("parity_c", 1200.0, merchant_name="Best Buy"),
+    _tx("parity_a", 15.0),
+]
+
+
+def _fresh_spend_store():
+    backend = InProcessBackend()
+    set_state_backend(backend)
+    ts.SPEND_STORE = SpendCounterStore(backend)
+
+
+def _spend(user_id):
+    return ts.SPEND_STORE.get_month(user_id, MONTH)
+
+
+def _client():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    app.register_blueprint(transaction_scoring_bp)
+    return app.test_client()
+
+
+def _score_one_by_one(rows):
+    return [
+        ts.score_transaction(row["user_id"], row["amount"], row["merchant_name"],
+                             mcc=row.get("mcc", 0), timestamp=row["timestamp"],
+                             channel=row.get("channel", "offline"))
+        for row in rows
+    ]
+
+
+def _assert_close(got, want):
+    # One model call over the whole batch may differ from per-row calls in
+    # the last bits of a float; everything else must match exactly
+    if isinstance(want, dict):
+        assert set(got) == set(want), (sorted(got), sorted(want))
+        for key in want:
+            _assert_close(got[key], want[key])
+    elif isinstance(want, float):
+        assert math.isclose(got, want, rel_tol=1e-9), (got, want)
+    else:
+        assert got == want, (got, want)
+
+
+def _expected():
+    _fresh_spend_store()
+    expected = _score_one_by_one(ROWS)
+    # Later rows of a user see the spend of the earlier ones
+    assert [r["debug"]["spend_before"] for r in expected[:3]] == [0.0, 0.0, 40.0]
+    return expected, {user_id: _spend(user_id) for user_id in USERS}
+
+
+def test_score_transactions_matches_one_by_one():
+    expected, expected_spend = _expected()
+    _fresh_spend_store()
+    results = ts.score_transactions(ROWS)
+    assert len(results) == len(expected)
+    for got, want in zip(results, expected):
+        _assert_close(got, want)
+    assert {user_id: _spend(user_id) for user_id in USERS} == expected_spend
+
+
+def test_batch_endpoint_matches_one_by_one():
+    expected, expected_spend = _expected()
+    _fresh_spend_store()
+    response = _client().post("/score-transactions/batch", json={"transactions": ROWS})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert len(results) == len(expected)
+    for got, want in zip(results, expected):
+        _assert_close(got, want)
+    assert {user_id: _spend(user_id) for user_id in USERS} == expected_spend
+
+
+if __name__ == "__main__":
+    for test in (
+        test_score_transactions_matches_one_by_one,
+        test_batch_endpoint_matches_one_by_one,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
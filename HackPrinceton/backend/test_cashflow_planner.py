@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for the rolling-horizon cash-flow planner (services/cashflow_planner.py).
+
+Usage:
+    python test_cashflow_planner.py
+"""
+
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+
+import services.obligations_planner as planner
+from services.cashflow_planner import CashFlowPlan, day_index
+from services.obligations_store import ObligationRecord
+
+
+def _obligation(event_id, amount, due, min_pay=None):
+    return ObligationRecord(event_id, event_id, "RENT_BILLS", amount, due, True, 5.0, min_pay, due)
+
+
+def _safe_left_on(plan, day):
+    return plan.daily_safe_left()[day_index(plan.start, plan.horizon_days, day)]
+
+
+def test_pays_late_in_window_and_uses_next_months_income():
+    plan = CashFlowPlan(date(2025, 11, 20), 30, 1000.0)
+    # Due after the 1st: paid from December's money, not November's
+    plan.pay([_obligation("rent", 1500.0, datetime(2025, 12, 5), datetime(2025, 11, 25))])
+
+    safe = plan.daily_safe_left()
+    assert safe[0] == 500.0
+    assert _safe_left_on(plan, date(2025, 12, 10)) == 500.0
+    assert plan.shortfall() == 0.0
+
+    plan.pay([_obligation("car", 700.0, datetime(2025, 11, 28))])
+    assert _safe_left_on(plan, date(2025, 11, 20)) == 0.0
+    assert plan.shortfall() == 200.0
+
+
+def test_bills_stay_paid_after_their_due_date():
+    rent = _obligation("rent", 800.0, datetime(2025, 11, 22))
+    before = CashFlowPlan(date(2025, 11, 20), 30, 1000.0)
+    before.pay([rent])
+    after = CashFlowPlan(date(2025, 11, 23), 30, 1000.0)
+    after.pay([rent])
+
+    assert _safe_left_on(before, date(2025, 11, 20)) == 200.0
+    # The rent left with November's money; it does not come back
+    assert _safe_left_on(after, date(2025, 11, 23)) == 200.0
+    assert _safe_left_on(after, date(2025, 12, 1)) == 1200.0
+
+
+def test_obligations_sharing_an_event_id_are_all_paid():
+    plan = CashFlowPlan(date(2025, 11, 20), 5, 1000.0)
+    bills = [_obligation("rent", 400.0, datetime(2025, 11, 22)),
+             _obligation("rent", 400.0, datetime(2025, 11, 23))]
+    assert plan.pay(bills) == 2 and len(plan) == 2
+    assert plan.daily_safe_left()[0] == 200.0
+
+
+def test_planner_counts_bills_paid_earlier_in_the_month():
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "obligations.csv").write_text(
+            "user_id,event_id,name,category,amount,due_date,mandatory,importance,min_pay_date,max_pay_date\n"
+            "cf_user,rent,Rent,RENT_BILLS,800,2025-11-22,1,5,2025-11-15,2025-11-22\n"
+        )
+        original = planner.DATA_DIR
+        planner.DATA_DIR = Path(tmp)
+        try:
+            safe_left = [
+                planner.compute_obligations_for_transaction_scoring(
+                    "cf_user", 2000.0, 0.0, datetime(2025, 11, day, 9)
+                )["safe_left"]
+                for day in (20, 23, 30)
+            ]
+        finally:
+            planner.DATA_DIR = original
+
+    # 2000 income leaves 900 free a month, and rent takes 800 of it
+    assert [round(v, 2) for v in safe_left] == [100.0, 100.0, 100.0]
+
+
+def test_planner_pays_bills_that_reuse_an_event_id():
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "obligations.csv").write_text(
+            "user_id,event_id,name,category,amount,due_date,mandatory,importance,min_pay_date,max_pay_date\n"
+            "dup_user,rent,Rent,RENT_BILLS,400,2025-11-22,1,5,,\n"
+            "dup_user,rent,Rent again,RENT_BILLS,400,2025-11-25,1,5,,\n"
+        )
+        original = planner.DATA_DIR
+        planner.DATA_DIR = Path(tmp)
+        try:
+            summary = planner.compute_obligations_for_transaction_scoring(
+                "dup_user", 2000.0, 0.0, datetime(2025, 11, 20, 9)
+            )
+        finally:
+            planner.DATA_DIR = original
+
+    assert round(summary["safe_left"], 2) == 100.0
+
+
+if __name__ == "__main__":
+    for test in (
+        test_pays_late_in_window_and_uses_next_months_income,
+        test_bills_stay_paid_after_their_due_date,
+        test_obligations_sharing_an_event_id_are_all_paid,
+        test_planner_counts_bills_paid_earlier_in_the_month,
+        test_planner_pays_bills_that_reuse_an_event_id,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for merchant string normalization and category resolution
+(services/category_resolver.py).
+
+Usage:
+    python test_category_resolver.py
+"""
+
+from services.category_resolver import (
+    DEFAULT_CATEGORY,
+    category_for_mcc,
+    normalize_merchant,
+    resolve_category,
+)
+
+# raw merchant string -> normalized form
+NORMALIZE_CASES = [
+    ("STARBUCKS #1234 NYC", "starbucks nyc"),
+    ("SQ *STARBUCKS #1234 NYC", "starbucks nyc"),
+    ("TST* Chipotle 0456", "chipotle"),
+    ("PAYPAL *EBAY", "ebay"),
+    ("APPLE PAY * Netflix.com", "netflix com"),
+    ("Trader Joe's #552", "trader joes"),
+    ("TRADER JOE’S", "trader joes"),
+    ("McDonald's F12345", "mcdonalds"),
+    ("Store 12 Target", "target"),
+    ("B&H PHOTO 420 NINTH AVE", "b&h photo ninth ave"),
+    ("  uber   trip  ", "uber trip"),
+    (" #99 ", ""),
+    ("", ""),
+]
+
+# (raw merchant string, mcc) -> category
+RESOLVE_CASES = [
+    # Known names, exact or after normalization; trailing locations ignored
+    ("Starbucks", 0, "FAST_FOOD"),
+    ("STARBUCKS #1234 NYC", 0, "FAST_FOOD"),
+    ("SQ *STARBUCKS #1234 NYC", 0, "FAST_FOOD"),
+    ("WHOLE FOODS MKT 10234", 0, "GROCERIES"),
+    ("Shell Oil 57442", 0, "TRANSPORT"),
+    ("PAYPAL *EBAY", 0, "MISC_ONLINE"),
+    # Longest known name wins
+    ("Amazon.com", 0, "MISC_ONLINE"),
+    ("AMAZON PRIME*2X4", 0, "SUBSCRIPTION"),
+    ("Amazon Prime Video", 0, "SUBSCRIPTION"),
+    # A known name beats the MCC
+    ("Zara", 5411, "CLOTHING"),
+    ("Netflix", 5999, "SUBSCRIPTION"),
+    # Unknown names fall back to the MCC, then the default
+    ("Local Corner Cafe", 5814, "FAST_FOOD"),
+    ("Local Corner Cafe", 0, DEFAULT_CATEGORY),
+    ("", 5411, "GROCERIES"),
+    (None, 0, DEFAULT_CATEGORY),
+]
+
+# mcc -> category (None when unmapped)
+MCC_CASES = [
+    (4110, None),
+    (4111, "TRANSPORT"),
+    (4131, "TRANSPORT"),
+    (4132, None),
+    (5541, "TRANSPORT"),
+    (5812, "FAST_FOOD"),
+    (5813, "ALCOHOL"),
+    (5814, "FAST_FOOD"),
+    (5699, "CLOTHING"),
+    (5700, None),
+    (8050, "PHARMACY_HEALTH"),
+    (0, None),
+    (9999, None),
+    (10000, None),
+    (-1, None),
+]
+
+
+def test_normalize_merchant():
+    for raw, expected in NORMALIZE_CASES:
+        assert normalize_merchant(raw) == expected, (raw, normalize_merchant(raw))
+
+
+def test_resolve_category():
+    for merchant_name, mcc, expected in RESOLVE_CASES:
+        got = resolve_category(merchant_name, mcc)
+        assert got == expected, (merchant_name, mcc, got)
+
+
+def test_mcc_ranges_and_bounds():
+    for mcc, expected in MCC_CASES:
+        assert category_for_mcc(mcc) == expected, (mcc, category_for_mcc(mcc))
+        assert resolve_category("Unknown Merchant", mcc) == (expected or DEFAULT_CATEGORY)
+
+
+if __name__ == "__main__":
+    for test in (
+        test_normalize_merchant,
+        test_resolve_category,
+        test_mcc_ranges_and_bounds,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Tests for idempotent scoring retries (services/idempotency.py) and the
+409 response /score-transaction gives for a reused key.
+
+Usage:
+    python test_idempotency.py
+"""
+
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from flask import Flask
+
+import services.transaction_scorer as ts
+from config import Config
+from models import db
+from routes.transaction_scoring import transaction_scoring_bp
+from services.idempotency import IdempotencyCache, IdempotencyConflict
+from services.spend_store import SpendCounterStore
+from services.state_backend import InProcessBackend, SQLiteBackend, set_state_backend
+
+
+class _Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"call": self.calls}
+
+
+def test_replay_returns_the_cached_result():
+    cache = IdempotencyCache(ttl_seconds=60.0)
+    compute = _Counter()
+    assert cache.run("tx-1", ("a", 1), compute) == ({"call": 1}, False)
+    assert cache.run("tx-1", ("a", 1), compute) == ({"call": 1}, True)
+    assert cache.run("tx-2", ("a", 1), compute) == ({"call": 2}, False)
+    assert compute.calls == 2
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["in_flight"]) == (2, 1, 2, 0)
+
+
+def test_fingerprint_mismatch_raises_conflict():
+    cache = IdempotencyCache(ttl_seconds=60.0)
+    compute = _Counter()
+    cache.run("tx-1", ("a", 1), compute)
+    try:
+        cache.run("tx-1", ("a", 2), compute)
+    except IdempotencyConflict:
+        pass
+    else:
+        raise AssertionError("a reused key with other parameters should conflict")
+    assert compute.calls == 1
+    assert cache.run("tx-1", ("a", 1), compute) == ({"call": 1}, True)
+
+
+def test_failed_computation_is_not_cached():
+    cache = IdempotencyCache(ttl_seconds=60.0)
+
+    def fail():
+        raise RuntimeError("scoring failed")
+
+    try:
+        cache.run("tx-1", ("a", 1), fail)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("the computation's error should propagate")
+    assert cache.run("tx-1", ("a", 1), _Counter()) == ({"call": 1}, False)
+
+
+def test_entries_expire_after_the_ttl():
+    cache = IdempotencyCache(ttl_seconds=0.05)
+    compute = _Counter()
+    assert cache.run("tx-1", ("a", 1), compute)[1] is False
+    assert cache.run("tx-1", ("a", 1), compute)[1] is True
+    time.sleep(0.1)
+    # Expired: recomputed, and a different fingerprint no longer conflicts
+    assert cache.run("tx-1", ("a", 2), compute) == ({"call": 2}, False)
+    assert cache.stats()["entries"] == 1
+
+    bounded = IdempotencyCache(ttl_seconds=60.0, max_entries=2)
+    for key in ("tx-1", "tx-2", "tx-3"):
+        bounded.run(key, ("a", 1), compute)
+    assert bounded.stats()["entries"] == 2
+    assert bounded.run("tx-1", ("a", 1), compute)[1] is False
+
+
+
+def test_two_workers_share_keys_through_the_backend():
+    # Two SQLite connections on one file stand in for two worker processes
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "state.db"
+        worker_a = IdempotencyCache(ttl_seconds=60.0, backend=lambda b=SQLiteBackend(path): b)
+        worker_b = IdempotencyCache(ttl_seconds=60.0, backend=lambda b=SQLiteBackend(path): b)
+        compute = _Counter()
+        assert worker_a.run(("u", "tx-1"), ("a", 1), compute) == ({"call": 1}, False)
+        assert worker_b.run(("u", "tx-1"), ("a", 1), compute) == ({"call": 1}, True)
+        try:
+            worker_b.run(("u", "tx-1"), ("a", 2), compute)
+        except IdempotencyConflict:
+            pass
+        else:
+            raise AssertionError("a reused key with other parameters should conflict")
+
+        # A duplicate arriving while the other worker is still computing
+        # waits for that result instead of computing its own
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return compute()
+
+        results = {}
+        leader = threading.Thread(target=lambda: results.setdefault(
+            "a", worker_a.run(("u", "tx-2"), ("a", 1), slow)))
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=lambda: results.setdefault(
+            "b", worker_b.run(("u", "tx-2"), ("a", 1), compute)))
+        follower.start()
+        time.sleep(0.05)
+        assert worker_b.stats()["in_flight"] == 1 and "b" not in results
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        assert results == {"a": ({"call": 2}, False), "b": ({"call": 2}, True)}
+        assert compute.calls == 2
+
+
+def _client():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    app.register_blueprint(transaction_scoring_bp)
+    return app.test_client()
+
+
+def test_route_replays_and_rejects_reused_keys():
+    backend = InProcessBackend()
+    set_state_backend(backend)
+    ts.SPEND_STORE = SpendCounterStore(backend)
+    client = _client()
+    body = {"user_id": "idem_u", "amount": 20.0, "merchant_name": "Zara",
+            "timestamp": "2025-11-09T10:00:00", "transaction_id": "idem-tx-1"}
+
+    first = client.post("/score-transaction", json=body)
+    retry = client.post("/score-transaction", json=body)
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json()["debug"]["idempotent_replay"] is True
+    assert retry.get_json()["decision"] == first.get_json()["decision"]
+
+    conflict = client.post("/score-transaction", json={**body, "amount": 25.0})
+    assert conflict.status_code == 409
+    assert conflict.get_json()["error"] == "Idempotency conflict"
+    # The Idempotency-Key header is the same key as transaction_id
+    header = client.post("/score-transaction", headers={"Idempotency-Key": "idem-tx-1"},
+                         json={**body, "transaction_id": None, "merchant_name": "Nike"})
+    assert header.status_code == 409
+
+    # Only the first request was recorded
+    assert ts.SPEND_STORE.get_month("idem_u", "2025-11") == {"CLOTHING": 20.0}
+
+
+if __name__ == "__main__":
+    for test in (
+        test_replay_returns_the_cached_result,
+        test_fingerprint_mismatch_raises_conflict,
+        test_failed_computation_is_not_cached,
+        test_entries_expire_after_the_ttl,
+        test_two_workers_share_keys_through_the_backend,
+        test_route_replays_and_rejects_reused_keys,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for the app factory.
+
+Runs `python -X importtime` in a fresh interpreter and checks that importing
+the app stays under IMPORT_TIME_BUDGET_MS and does not pull in pandas,
+sklearn, joblib or qiskit (those load on first use or in warmup()).
+
+Usage:
+    python test_import_time.py
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).parent
+BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", "2000"))
+HEAVY_MODULES = ("pandas", "sklearn", "scipy", "joblib", "qiskit")
+
+
+def _importtime(statement):
+    """
+    Returns (total_ms, imported module names), or None when the statement
+    cannot run here because a third-party dependency is not installed.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "WARMUP_ON_START": "false"},
+    )
+    if proc.returncode != 0:
+        if "ModuleNotFoundError" in proc.stderr:
+            return None
+        raise AssertionError(proc.stderr)
+
+    total_us = 0
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        # Only top-level entries, so nested imports are not counted twice
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us / 1000.0, modules
+
+
+def _check(statement):
+    measured = _importtime(statement)
+    if measured is None:
+        pytest.skip(f"`{statement}`: a dependency is not installed")
+    total_ms, modules = measured
+    heavy = sorted(m for m in modules if m.split(".")[0] in HEAVY_MODULES)
+    assert not heavy, f"`{statement}` imports {heavy[:5]}"
+    assert total_ms < BUDGET_MS, f"`{statement}` took {total_ms:.0f} ms (budget {BUDGET_MS:.0f} ms)"
+    print(f"   `{statement}`: {total_ms:.0f} ms")
+
+
+def test_app_factory_import_budget():
+    _check("from app import create_app")
+
+
+def test_scoring_routes_import_budget():
+    _check("import routes.transaction_scoring")
+
+
+if __name__ == "__main__":
+    for test in (
+        test_app_factory_import_budget,
+        test_scoring_routes_import_budget,
+    ):
+        try:
+            test()
+        except pytest.skip.Exception as skipped:
+            print(f"⏭️  SKIP - {test.__name__}: {skipped}")
+            continue
+        print(f"✅ PASS - {test.__name__}")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the micro-batcher behind /score-transaction (services/inference_batcher.py).
+
+Usage:
+    python test_inference_batcher.py
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from services.inference_batcher import InferenceBatcher
+
+
+def _submit_all(batcher, items):
+    # Hold every caller until all are running, so they land in one window
+    barrier = threading.Barrier(len(items))
+
+    def submit(item):
+        barrier.wait()
+        try:
+            return batcher.submit(item)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=len(items)) as pool:
+        return list(pool.map(submit, items))
+
+
+def test_coalesces_and_returns_each_callers_result():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+
+    batcher = InferenceBatcher(batch_fn, window_ms=200.0, max_batch_size=8)
+    results = _submit_all(batcher, list(range(8)))
+
+    assert results == [item * 10 for item in range(8)]
+    assert sorted(item for call in calls for item in call) == list(range(8))
+    assert len(calls) < 8
+    stats = batcher.stats()
+    assert stats["items"] == 8 and stats["batches"] == len(calls)
+    assert stats["max_batch_size_seen"] <= 8
+
+
+def test_failed_item_only_fails_its_own_caller():
+    applied = []
+
+    def batch_fn(items):
+        results = []
+        for item in items:
+            if item == 3:
+                results.append(ValueError("bad item 3"))
+            else:
+                applied.append(item)
+                results.append(item)
+        return results
+
+    batcher = InferenceBatcher(batch_fn, window_ms=200.0, max_batch_size=8)
+    results = _submit_all(batcher, list(range(6)))
+
+    assert isinstance(results[3], ValueError) and str(results[3]) == "bad item 3"
+    assert [r for i, r in enumerate(results) if i != 3] == [0, 1, 2, 4, 5]
+    assert sorted(applied) == [0, 1, 2, 4, 5]
+
+
+def test_batch_fn_raising_fails_every_caller():
+    def batch_fn(items):
+        raise RuntimeError("model unavailable")
+
+    batcher = InferenceBatcher(batch_fn, window_ms=50.0, max_batch_size=4)
+    results = _submit_all(batcher, list(range(4)))
+
+    assert all(isinstance(r, RuntimeError) and str(r) == "model unavailable" for r in results)
+
+    # The worker survives and serves the next batch
+    batcher.batch_fn = lambda items: list(items)
+    assert batcher.submit("next") == "next"
+
+
+def test_wrong_result_count_is_an_error_not_a_none():
+    batcher = InferenceBatcher(lambda items: items[:-1], window_ms=0.0, max_batch_size=1)
+    try:
+        batcher.submit("x")
+    except RuntimeError as e:
+        assert "0 results for 1 items" in str(e)
+    else:
+        raise AssertionError("expected RuntimeError")
+
+
+if __name__ == "__main__":
+    for test in (
+        test_coalesces_and_returns_each_callers_result,
+        test_failed_item_only_fails_its_own_caller,
+        test_batch_fn_raising_fails_every_caller,
+        test_wrong_result_count_is_an_error_not_a_none,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
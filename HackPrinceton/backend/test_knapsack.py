@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the exact optional-obligations knapsack (services/knapsack.py).
+
+Compares every DP path against brute force on small random problems.
+
+Usage:
+    python test_knapsack.py
+"""
+
+import random
+
+from services import obligations_quantum
+from services.knapsack import solve_events_exact, solve_knapsack
+
+
+def _brute_force(weights, values, budget):
+    best = 0.0
+    for mask in range(1 << len(weights)):
+        picked = [i for i in range(len(weights)) if mask >> i & 1]
+        if sum(weights[i] for i in picked) <= budget:
+            best = max(best, sum(values[i] for i in picked))
+    return best
+
+
+def test_matches_brute_force_on_every_path():
+    rng = random.Random(7)
+    methods = set()
+    for trial in range(300):
+        n = rng.randint(0, 10)
+        weights = [rng.randint(0, 5000) for _ in range(n)]
+        if trial % 2:
+            values = [float(rng.randint(1, 5)) for _ in range(n)]
+        else:
+            values = [round(rng.uniform(0.1, 5), 3) for _ in range(n)]
+        budget = rng.randint(0, 20000)
+        # Small cell limits force the value DP and the scaled fallback
+        result = solve_knapsack(weights, values, budget, max_cells=[10**9, 3000, 200][trial % 3])
+        methods.add(result.method)
+
+        assert sum(weights[i] for i in result.chosen) <= budget
+        optimum = _brute_force(weights, values, budget)
+        assert result.value >= optimum - result.error_bound - 1e-9
+        if result.error_bound == 0:
+            assert abs(result.value - optimum) < 1e-9
+    assert methods == {"weight_dp", "value_dp", "value_dp_scaled"}
+
+
+def test_beats_greedy_where_ratio_order_fails():
+    # Greedy by importance/amount takes the $60 event first and then fits
+    # nothing else; the two $50 events are worth more together
+    events = [
+        {"event_id": "a", "amount": 60.0, "importance": 4.0},
+        {"event_id": "b", "amount": 50.0, "importance": 3.0},
+        {"event_id": "c", "amount": 50.0, "importance": 3.0},
+    ]
+    chosen = solve_events_exact(events, 100.0)
+    assert [ev["event_id"] for ev in chosen] == ["b", "c"]
+
+
+
+def _ids(events):
+    return sorted(ev["event_id"] for ev in events)
+
+
+def _pairs(events):
+    return sorted((ev["amount"], ev["importance"]) for ev in events)
+
+
+def test_memoized_selection_matches_direct_solves():
+    rng = random.Random(11)
+    direct = {
+        "exact": obligations_quantum._solve_exact,
+        "greedy": obligations_quantum._classical_greedy_knapsack,
+    }
+    memo = obligations_quantum._memo
+    hits = memo.hits
+    for trial in range(200):
+        # Few distinct amounts, so tied events are common
+        events = [
+            {"event_id": f"t{trial}e{i}", "amount": rng.choice([25.0, 50.0, 80.5, 100.5, 120.0]),
+             "importance": float(rng.randint(1, 5))}
+            for i in range(rng.randint(1, 12))
+        ]
+        budget = rng.choice([rng.uniform(0, 400), 100.99, 201.0])
+        shuffled = events[:]
+        rng.shuffle(shuffled)
+        for solver, solve in direct.items():
+            chosen = solve(events, budget)
+            for _ in range(2):
+                selection = obligations_quantum.select_optional_events(events, budget, solver)
+                assert _ids(selection.chosen) == _ids(chosen)
+                assert sum(ev["amount"] for ev in selection.chosen) <= budget
+            # Listing order does not change the answer, only which of two
+            # identical events is picked
+            assert _pairs(solve(shuffled, budget)) == _pairs(chosen)
+            selection = obligations_quantum.select_optional_events(shuffled, budget, solver)
+            assert _ids(selection.chosen) == _ids(solve(shuffled, budget))
+    assert memo.hits - hits >= 400
+
+    # The budget is not rounded: $100.99 still fits a $100.50 event
+    event = [{"event_id": "x", "amount": 100.5, "importance": 5.0}]
+    for solver in direct:
+        assert _ids(obligations_quantum.select_optional_events(event, 100.99, solver).chosen) == ["x"]
+
+
+
+def test_exact_budgets_in_the_same_cent_share_an_entry():
+    obligations_quantum.clear_knapsack_memo()
+    memo = obligations_quantum._memo
+    events = [{"event_id": "a", "amount": 60.0, "importance": 3.0},
+              {"event_id": "b", "amount": 40.25, "importance": 2.0}]
+    hits = memo.hits
+    for budget in (100.25, 100.251, 100.259):
+        chosen = obligations_quantum.select_optional_events(events, budget, "exact").chosen
+        assert _ids(chosen) == _ids(obligations_quantum._solve_exact(events, budget)) == ["a", "b"]
+    assert memo.hits - hits == 2 and memo.stats()["entries"] == 1
+
+    # One cent less is a different problem
+    chosen = obligations_quantum.select_optional_events(events, 100.249, "exact").chosen
+    assert _ids(chosen) == ["a"] and memo.stats()["entries"] == 2
+    obligations_quantum.clear_knapsack_memo()
+
+
+if __name__ == "__main__":
+    for test in (
+        test_matches_brute_force_on_every_path,
+        test_beats_greedy_where_ratio_order_fails,
+        test_memoized_selection_matches_direct_solves,
+        test_exact_budgets_in_the_same_cent_share_an_entry,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Equivalence test for the compiled (pure-NumPy) guardian scorer.
+
+Fits guardian_pipeline on data/transactions.csv exactly like model_training.py,
+compiles it, and checks the compiled p_ml matches pipeline.predict_proba.
+
+Usage:
+    python test_model_compiler.py
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from model_training import build_pipeline, FEATURE_COLS_NUM, FEATURE_COLS_CAT
+from services.model_compiler import CompiledScorer, compile_pipeline
+
+DATA_PATH = Path(__file__).parent / "data" / "transactions.csv"
+TOLERANCE = 1e-9
+
+
+@lru_cache(maxsize=1)
+def _fit_pipeline():
+    df = pd.read_csv(DATA_PATH, parse_dates=["timestamp"])
+    df["hour_of_day"] = df["timestamp"].dt.hour
+    df["day_of_week"] = df["timestamp"].dt.dayofweek
+    df["micro_category"] = "NONE"
+    groc = df["base_category"] == "GROCERIES"
+    df.loc[groc, "micro_category"] = (df.loc[groc, "amount"] // 50 % 3).astype(int).astype(str)
+    X = df[FEATURE_COLS_NUM + FEATURE_COLS_CAT]
+    pipe = build_pipeline()
+    pipe.fit(X, df["label_avoidable"])
+    return pipe, X
+
+
+def test_compiled_matches_pipeline():
+    pipe, X = _fit_pipeline()
+    scorer = CompiledScorer(compile_pipeline(pipe))
+
+    expected = pipe.predict_proba(X)[:, 1]
+    actual = scorer.predict_proba_rows(X.to_dict("records"))
+
+    assert np.max(np.abs(expected - actual)) < TOLERANCE
+
+
+def test_unknown_categories_are_ignored():
+    pipe, _ = _fit_pipeline()
+    scorer = CompiledScorer(compile_pipeline(pipe))
+
+    rows = [{
+        "amount": 42.0,
+        "hour_of_day": 3,
+        "day_of_week": 6,
+        "saver_score": 1,
+        "base_category": "NOT_A_CATEGORY",
+        "micro_category": "7",
+        "channel": "carrier_pigeon",
+    }]
+    expected = pipe.predict_proba(pd.DataFrame(rows))[:, 1]
+    actual = scorer.predict_proba_rows(rows)
+
+    assert np.max(np.abs(expected - actual)) < TOLERANCE
+
+
+def test_empty_batch():
+    pipe, _ = _fit_pipeline()
+    scorer = CompiledScorer(compile_pipeline(pipe))
+    assert len(scorer.predict_proba_rows([])) == 0
+
+
+if __name__ == "__main__":
+    for test in (
+        test_compiled_matches_pipeline,
+        test_unknown_categories_are_ignored,
+        test_empty_batch,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
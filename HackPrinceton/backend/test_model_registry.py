@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Tests for versioned model activation and rollback (services/model_registry.py)
+and the admin endpoints in front of it (routes/models_admin.py).
+
+Usage:
+    python test_model_registry.py
+"""
+
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from flask import Flask
+
+import services.model_registry as registry
+from config import Config
+from routes.models_admin import models_admin_bp
+
+ADMIN_TOKEN = "test-admin-token"
+
+
+class _TempRegistry:
+    """
+    Point the registry at a temporary models/ directory with versions v1
+    and v2 copied from the real artifacts, and restore it afterwards.
+    """
+
+    _GLOBALS = ("MODELS_DIR", "VERSIONS_DIR", "MANIFEST_PATH", "_active", "_last_poll")
+
+    def __enter__(self):
+        self._saved = {name: getattr(registry, name) for name in self._GLOBALS}
+        self._saved_status = dict(registry._status)
+        self._tmp = tempfile.TemporaryDirectory()
+        models_dir = Path(self._tmp.name)
+        for version in ("v1", "v2"):
+            (models_dir / "versions" / version).mkdir(parents=True)
+            for name in ("guardian_pipeline.pkl", "kmeans_groceries.pkl"):
+                source = registry.MODELS_DIR / name
+                if source.exists():
+                    shutil.copy2(source, models_dir / "versions" / version / name)
+        registry.MODELS_DIR = models_dir
+        registry.VERSIONS_DIR = models_dir / "versions"
+        registry.MANIFEST_PATH = models_dir / "manifest.json"
+        registry._active = None
+        registry._status.update(loading=None, last_error=None)
+        return models_dir
+
+    def __exit__(self, *exc):
+        for name, value in self._saved.items():
+            setattr(registry, name, value)
+        registry._status.update(self._saved_status)
+        self._tmp.cleanup()
+
+
+def test_activate_and_rollback():
+    with _TempRegistry():
+        status = registry.activate("v1", background=False)
+        assert status["active"] == "v1" and status["manifest_active"] == "v1"
+        assert status["history"] == [] and status["last_error"] is None
+
+        status = registry.activate("v2", background=False)
+        assert status["active"] == "v2" and status["history"] == ["v1"]
+        assert registry.get_active_bundle().version == "v2"
+
+        status = registry.rollback(background=False)
+        assert status["active"] == "v1" and status["manifest_active"] == "v1"
+        assert status["history"] == []
+
+        try:
+            registry.rollback(background=False)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("rollback with no history should fail")
+        try:
+            registry.activate("v9", background=False)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("unknown version should fail")
+
+
+def test_failed_load_keeps_the_active_version():
+    with _TempRegistry() as models_dir:
+        registry.activate("v1", background=False)
+        broken = models_dir / "versions" / "broken"
+        broken.mkdir()
+        (broken / "guardian_pipeline.pkl").write_bytes(b"not a pickle")
+
+        status = registry.activate("broken", background=False)
+        assert status["active"] == "v1" and status["manifest_active"] == "v1"
+        assert status["loading"] is None
+        assert status["last_error"]["version"] == "broken"
+
+        # The next successful load clears the error
+        status = registry.activate("v2", background=False)
+        assert status["active"] == "v2" and status["last_error"] is None
+
+
+def test_only_one_load_at_a_time():
+    with _TempRegistry():
+        started = threading.Event()
+        release = threading.Event()
+        original = registry.load_bundle
+
+        def slow_load(version):
+            started.set()
+            release.wait(5)
+            return original(version)
+
+        registry.load_bundle = slow_load
+        try:
+            registry.activate("v1")
+            assert started.wait(5)
+            assert registry.get_status()["loading"] == "v1"
+            try:
+                registry.activate("v2")
+            except registry.LoadInProgress:
+                pass
+            else:
+                raise AssertionError("second load should be refused")
+        finally:
+            release.set()
+            registry.load_bundle = original
+
+        for _ in range(500):
+            if registry.get_status()["loading"] is None:
+                break
+            threading.Event().wait(0.01)
+        assert registry.get_status()["active"] == "v1"
+
+
+def test_only_plain_registered_versions_activate():
+    with _TempRegistry() as models_dir:
+        registry.activate("v1", background=False)
+        (models_dir / "versions" / ".v3.tmp").mkdir()
+        shutil.copy2(models_dir / "versions" / "v1" / "guardian_pipeline.pkl",
+                     models_dir / "versions" / ".v3.tmp")
+        for version in ("..", "../..", ".v3.tmp", "v1/../v2", "", "\\v2"):
+            try:
+                registry.activate(version, background=False)
+                assert False, f"{version!r} should have been rejected"
+            except ValueError:
+                pass
+        assert [v["version"] for v in registry.list_versions()] == ["v1", "v2"]
+
+        # A version without its pipeline would score everything at p_ml=0.5
+        (models_dir / "versions" / "empty").mkdir()
+        try:
+            registry.activate("empty", background=False)
+            assert False, "a version without a pipeline should not activate"
+        except ValueError as e:
+            assert "guardian_pipeline.pkl" in str(e)
+        assert registry.get_status()["active"] == "v1"
+
+
+def test_rollback_refuses_a_version_without_its_pipeline():
+    with _TempRegistry() as models_dir:
+        registry.activate("v1", background=False)
+        registry.activate("v2", background=False)
+        (models_dir / "versions" / "v1" / "guardian_pipeline.pkl").unlink()
+        try:
+            registry.rollback(background=False)
+            assert False, "rollback to a version without a pipeline should fail"
+        except ValueError:
+            pass
+        status = registry.get_status()
+        assert status["active"] == "v2" and status["history"] == ["v1"]
+
+
+def _client(**config):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(config)
+    app.register_blueprint(models_admin_bp)
+    return app.test_client()
+
+
+def test_admin_endpoints_fail_closed():
+    with _TempRegistry():
+        # No token configured: closed unless explicitly opened for dev
+        assert _client(ADMIN_API_TOKEN="", ADMIN_API_OPEN=False).get("/admin/models").status_code == 403
+        assert _client(ADMIN_API_TOKEN="", ADMIN_API_OPEN=True).get("/admin/models").status_code == 200
+
+        client = _client(ADMIN_API_TOKEN=ADMIN_TOKEN, ADMIN_API_OPEN=True)
+        assert client.get("/admin/models").status_code == 403
+        assert client.get("/admin/models", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        admin = {"X-Admin-Token": ADMIN_TOKEN}
+        listed = client.get("/admin/models", headers=admin).get_json()
+        assert [v["version"] for v in listed["versions"]] == ["v1", "v2"]
+
+        activated = client.post("/admin/models/activate", headers=admin,
+                                json={"version": "v2", "wait": True})
+        assert activated.status_code == 200 and activated.get_json()["active"] == "v2"
+        assert client.post("/admin/models/activate", headers=admin,
+                           json={"version": "v9"}).status_code == 404
+        assert client.post("/admin/models/activate", headers=admin,
+                           json={"version": "../.."}).status_code == 404
+
+
+if __name__ == "__main__":
+    for test in (
+        test_activate_and_rollback,
+        test_failed_load_keeps_the_active_version,
+        test_only_one_load_at_a_time,
+        test_only_plain_registered_versions_activate,
+        test_rollback_refuses_a_version_without_its_pipeline,
+        test_admin_endpoints_fail_closed,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
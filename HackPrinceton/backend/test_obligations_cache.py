@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for the obligations summary caches (services/obligations_cache.py)
+and the cached summaries get_cached_obligations_summary hands out.
+
+Usage:
+    python test_obligations_cache.py
+"""
+
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+
+from services.obligations_cache import ObligationsSummaryCache, PrecomputedSummaryStore
+from services.obligations_planner import get_cached_obligations_summary, invalidate_obligations_summary
+from services.state_backend import InProcessBackend, SQLiteBackend
+
+DAY = date(2025, 11, 9)
+# A day before fixture user u1's obligations fall due, so its summaries
+# have obligations in the horizon
+NOW = datetime(2025, 11, 9)
+
+
+def test_invalidation_in_another_worker_reaches_the_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Two connections to one state file, as two workers would have
+        worker_a = SQLiteBackend(Path(tmp) / "state.db")
+        worker_b = SQLiteBackend(Path(tmp) / "state.db")
+        cache = ObligationsSummaryCache(backend=lambda: worker_a)
+        other = PrecomputedSummaryStore(worker_b)
+
+        for user_id in ("u1", "u2"):
+            cache.put(user_id, DAY, 1000.0, {"free_to_spend": 1.0}, cache.epoch(user_id))
+        assert cache.get("u1", DAY, 1000.0) is not None
+
+        # An unrelated write: entries are checked again and kept
+        worker_b.set("other", "key", 1)
+        assert cache.get("u1", DAY, 1000.0) is not None
+        assert cache.get("u2", DAY, 1000.0) is not None
+
+        other.invalidate("u1")
+        assert cache.get("u1", DAY, 1000.0) is None
+        assert cache.get("u2", DAY, 1000.0) is not None
+        other.clear()
+        assert cache.get("u2", DAY, 1000.0) is None
+        assert cache.stats()["stale"] == 2
+
+        # Computed before the other worker's write: never served
+        epoch = cache.epoch("u3")
+        other.invalidate("u3")
+        cache.put("u3", DAY, 1000.0, {"free_to_spend": 1.0}, epoch)
+        assert cache.get("u3", DAY, 1000.0) is None
+
+        cache.put("u3", DAY, 1000.0, {"free_to_spend": 2.0}, cache.epoch("u3"))
+        assert cache.get("u3", DAY, 1000.0)["free_to_spend"] == 2.0
+
+
+def test_obligations_summary_not_shared():
+    invalidate_obligations_summary("u1")
+    # Enough income that some of it is safe to spend after the obligations
+    first = get_cached_obligations_summary("u1", 5000.0, 0.0, now=NOW)
+    assert first["all_obligations"] and first["reserved_obligations"] > 0
+    assert first["safe_left"] > 50
+
+    def call(spent):
+        summary = get_cached_obligations_summary("u1", 5000.0, float(spent), now=NOW)
+        return spent, summary["safe_left"]
+
+    with ThreadPoolExecutor(32) as ex:
+        results = list(ex.map(call, [i % 50 for i in range(2000)]))
+    for spent, safe_left in results:
+        assert safe_left == max(0.0, first["safe_left"] - spent)
+
+    # The top-level dict is the caller's: changing it leaves the cache alone
+    expected = dict(first)
+    first["safe_left"] = -1.0
+    first["free_to_spend"] = -1.0
+    first["all_obligations"] = []
+    again = get_cached_obligations_summary("u1", 5000.0, 0.0, now=NOW)
+    assert again is not first
+    assert again == expected
+
+
+def test_obligations_summary_cache_is_bounded_and_read_only():
+    summary = get_cached_obligations_summary("u1", 2000.0, 0.0, now=NOW)
+    assert summary["all_obligations"]
+    for entry in summary["all_obligations"]:
+        try:
+            entry["amount"] = 0.0
+        except TypeError:
+            continue
+        raise AssertionError("cached obligation entry is writable")
+
+    cache = ObligationsSummaryCache(max_entries=100)
+    day = date(2025, 11, 9)
+    for i in range(1000):
+        cache.put(f"user_{i}", day, 1000.0, {"free_to_spend": 1.0}, cache.epoch())
+    assert len(cache) == 100
+    assert cache.evictions == 900
+    assert cache.get("user_999", day, 1000.0) is not None
+    assert cache.get("user_0", day, 1000.0) is None
+
+    # A summary computed across an invalidation is not stored
+    epoch = cache.epoch()
+    cache.invalidate("user_999")
+    cache.put("user_999", day, 1000.0, {"free_to_spend": 2.0}, epoch)
+    assert cache.get("user_999", day, 1000.0) is None
+
+
+def test_obligations_summary_cache_counts_mismatches_apart_from_expirations():
+    cache = ObligationsSummaryCache(max_entries=10, ttl_seconds=3600.0)
+    day = date(2025, 11, 9)
+    cache.put("user_a", day, 1000.0, {"free_to_spend": 1.0}, cache.epoch())
+    cache.put("user_b", day, 1000.0, {"free_to_spend": 1.0}, cache.epoch())
+    assert cache.get("user_a", date(2025, 11, 10), 1000.0) is None
+    assert cache.get("user_b", day, 2000.0) is None
+    stats = cache.stats()
+    assert (stats["mismatches"], stats["expirations"], stats["entries"]) == (2, 0, 0)
+
+    expiring = ObligationsSummaryCache(max_entries=10, ttl_seconds=0.0)
+    expiring.put("user_a", day, 1000.0, {"free_to_spend": 1.0}, expiring.epoch())
+    assert expiring.get("user_a", day, 1000.0) is None
+    stats = expiring.stats()
+    assert (stats["mismatches"], stats["expirations"]) == (0, 1)
+
+
+def test_precomputed_summaries_go_stale_on_invalidation():
+    store = PrecomputedSummaryStore(InProcessBackend())
+    day = date(2025, 11, 10)
+    summary = {"free_to_spend": 5.0, "plan_start": day, "safe_left_by_day": [5.0]}
+
+    snapshot = store.snapshot()
+    store.put("user_a", day, 1000.0, summary, snapshot)
+    store.put("user_b", day, 1000.0, summary, snapshot)
+    assert store.get("user_a", day, 1000.0) == summary
+    assert store.get("user_a", date(2025, 11, 11), 1000.0) is None
+    assert store.get("user_a", day, 2000.0) is None
+
+    # Entries from before an invalidation are not served, even if the job
+    # writes them afterwards
+    store.invalidate("user_a")
+    store.put("user_a", day, 1000.0, summary, snapshot)
+    assert store.get("user_a", day, 1000.0) is None
+    assert store.get("user_b", day, 1000.0) == summary
+    store.clear()
+    assert store.get("user_b", day, 1000.0) is None
+
+    store.put("user_a", day, 1000.0, summary, store.snapshot())
+    assert store.get("user_a", day, 1000.0) == summary
+
+
+if __name__ == "__main__":
+    for test in (
+        test_obligations_summary_not_shared,
+        test_obligations_summary_cache_is_bounded_and_read_only,
+        test_obligations_summary_cache_counts_mismatches_apart_from_expirations,
+        test_precomputed_summaries_go_stale_on_invalidation,
+        test_invalidation_in_another_worker_reaches_the_cache,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
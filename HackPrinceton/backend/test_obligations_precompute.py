@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for the nightly obligations precompute (services/obligations_precompute.py).
+
+Usage:
+    python test_obligations_precompute.py
+"""
+
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from flask import Flask
+
+import services.obligations_planner as planner
+import services.obligations_precompute as precompute
+from config import Config
+from models import db, Obligation, RecurringObligation, User
+from services.obligations_cache import META_NAMESPACE, PrecomputedSummaryStore
+from services.state_backend import InProcessBackend
+
+DAY = date(2025, 11, 10)
+
+
+def test_run_fills_the_store():
+    store = PrecomputedSummaryStore(InProcessBackend())
+    with tempfile.TemporaryDirectory() as tmp:
+        users_csv = Path(tmp) / "users.csv"
+        users_csv.write_text("user_id\nu1\nu2\nu1\nnobody_precompute\n")
+        report = precompute.run_precompute(DAY, users_csv=users_csv, workers=1, store=store)
+        users = precompute.active_users(users_csv)
+
+    assert report["users"] == 3 and report["written"] == 3 and report["failed"] == 0
+    assert store.backend.get(META_NAMESPACE, "last_report") == report
+    assert [user_id for user_id, _ in users] == ["u1", "u2", "nobody_precompute"]
+    for user_id, monthly_income in users:
+        summary = store.get(user_id, DAY, monthly_income)
+        assert summary is not None, user_id
+        # The same summary the scorer would compute on demand
+        expected = planner.compute_obligations_for_transaction_scoring(
+            user_id, monthly_income, 0.0, datetime(DAY.year, DAY.month, DAY.day)
+        )
+        assert summary["safe_left_by_day"] == expected["safe_left_by_day"]
+        assert summary["chosen_optional_ids"] == expected["chosen_optional_ids"]
+
+
+def test_precomputed_summary_equals_on_demand():
+    # e2 falls due on the day itself: both paths must agree it is still ahead
+    day = date(2025, 11, 20)
+    store = PrecomputedSummaryStore(InProcessBackend())
+    with tempfile.TemporaryDirectory() as tmp:
+        users_csv = Path(tmp) / "users.csv"
+        users_csv.write_text("user_id\nu1\n")
+        precompute.run_precompute(day, users_csv=users_csv, workers=1, store=store)
+        [(user_id, monthly_income)] = precompute.active_users(users_csv)
+    precomputed = store.get(user_id, day, monthly_income)
+    assert "e2" in [ob["event_id"] for ob in precomputed["all_obligations"]]
+
+    for hour in (0, 9, 23):
+        on_demand = planner.compute_obligations_for_transaction_scoring(
+            user_id, monthly_income, 0.0, datetime(2025, 11, 20, hour)
+        )
+        assert precomputed == on_demand, hour
+
+
+def test_active_users_come_from_the_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        database_uri = f"sqlite:///{Path(tmp) / 'guardian.db'}"
+        app = Flask(__name__)
+        app.config.from_object(Config)
+        app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(email="a@example.com", external_sub="a"))
+            db.session.add(Obligation(user_id="u1", name="Rent", amount_cents=100,
+                                      due_date=datetime(2025, 11, 5)))
+            db.session.add(RecurringObligation(user_id="db_only_user", name="Gym", amount_cents=100,
+                                               day_of_month=1, start_date=datetime(2025, 1, 1)))
+            db.session.add(RecurringObligation(user_id="u1", name="Phone", amount_cents=100,
+                                               day_of_month=9, start_date=datetime(2025, 1, 1)))
+            db.session.commit()
+            db.engine.dispose()
+
+        users = precompute.active_users(database_uri=database_uri)
+
+    assert [user_id for user_id, _ in users] == ["1", "u1", "db_only_user"]
+    profiles = dict(users)
+    assert profiles["u1"] == 2000.0
+
+
+def test_schedule_records_a_day_only_after_it_succeeds():
+    store = PrecomputedSummaryStore(InProcessBackend())
+    today = datetime.utcnow().date()
+    attempts = []
+    done = threading.Event()
+
+    def run_precompute(day, database_uri=None, store=None):
+        attempts.append((day, store.day_done(day)))
+        if len(attempts) == 1:
+            raise RuntimeError("database unavailable")
+        done.set()
+        return {}
+
+    saved = (precompute.run_precompute, precompute._next_run, precompute.RETRY_SECONDS,
+             planner.get_precomputed_store)
+    precompute.run_precompute = run_precompute
+    precompute._next_run = lambda at, now: now + timedelta(milliseconds=20)
+    precompute.RETRY_SECONDS = 0.02
+    planner.get_precomputed_store = lambda: store
+    try:
+        thread = precompute.start_precompute_schedule("03:00")
+        assert done.wait(10)
+        # Later wake-ups the same day find it done and do not run again
+        time.sleep(0.2)
+    finally:
+        precompute.stop_precompute_schedule()
+        thread.join(5)
+        (precompute.run_precompute, precompute._next_run, precompute.RETRY_SECONDS,
+         planner.get_precomputed_store) = saved
+
+    assert attempts[:2] == [(today, False), (today, False)]
+    assert len(attempts) == 2 or attempts[2][0] != today
+    assert store.day_done(today)
+
+
+if __name__ == "__main__":
+    for test in (
+        test_run_fills_the_store,
+        test_precomputed_summary_equals_on_demand,
+        test_active_users_come_from_the_database,
+        test_schedule_records_a_day_only_after_it_succeeds,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
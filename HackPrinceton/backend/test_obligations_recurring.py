@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for recurring obligation rules (services/obligations_recurring.py).
+
+Usage:
+    python test_obligations_recurring.py
+"""
+
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import services.obligations_planner as planner
+from services.obligations_recurring import expand_rules
+from services.obligations_store import RecurringRule
+
+
+def _rule(rule_id, day_of_month, start, end=None, frequency="monthly", window=0):
+    return RecurringRule(
+        rule_id, rule_id, "RENT_BILLS", 100.0, frequency, day_of_month,
+        start, end, True, 5.0, window,
+    )
+
+
+def test_expands_only_inside_the_window():
+    rules = [
+        _rule("rent", 31, datetime(2025, 1, 1), window=5),
+        _rule("gym", 15, datetime(2025, 3, 15), datetime(2026, 1, 1), frequency="quarterly"),
+        _rule("insurance", 10, datetime(2024, 12, 1), frequency="yearly"),
+    ]
+    obligations = expand_rules(rules, datetime(2025, 11, 20), datetime(2026, 3, 1))
+
+    due = sorted((ob.due_date.date().isoformat(), ob.event_id) for ob in obligations)
+    assert due == [
+        ("2025-11-30", "rent:2025-11"),
+        ("2025-12-10", "insurance:2025-12"),
+        ("2025-12-15", "gym:2025-12"),
+        ("2025-12-31", "rent:2025-12"),
+        ("2026-01-31", "rent:2026-01"),
+        ("2026-02-28", "rent:2026-02"),
+    ]
+    assert [ob.due_date for ob in obligations] == sorted(ob.due_date for ob in obligations)
+    rent = obligations[0]
+    assert rent.min_pay_date == datetime(2025, 11, 25) and rent.max_pay_date == rent.due_date
+
+    # Nothing before the rule starts
+    assert expand_rules([_rule("late", 1, datetime(2025, 11, 15))],
+                        datetime(2025, 11, 1), datetime(2025, 11, 30)) == []
+
+
+def test_planner_merges_rules_from_csv():
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        (data_dir / "obligations.csv").write_text(
+            "user_id,event_id,name,category,amount,due_date,mandatory,importance,min_pay_date,max_pay_date\n"
+            "u1,e1,Ski Trip,TRIP,400,2025-11-20,0,4,2025-11-15,2025-11-20\n"
+        )
+        (data_dir / "recurring_obligations.csv").write_text(
+            "user_id,rule_id,name,category,amount,frequency,day_of_month,start_date,end_date,"
+            "mandatory,importance,pay_window_days\n"
+            "u1,rent,Rent,RENT_BILLS,1200,monthly,5,2025-01-05,,1,5,10\n"
+        )
+        original = planner.DATA_DIR
+        planner.DATA_DIR = data_dir
+        try:
+            obligations = planner.load_obligations_for_user(
+                "u1", datetime(2025, 11, 1), datetime(2025, 12, 1)
+            )
+        finally:
+            planner.DATA_DIR = original
+
+    assert [ob.event_id for ob in obligations] == ["rent:2025-11", "e1"]
+    assert obligations[0].amount == 1200.0 and obligations[0].mandatory
+
+
+if __name__ == "__main__":
+    for test in (
+        test_expands_only_inside_the_window,
+        test_planner_merges_rules_from_csv,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
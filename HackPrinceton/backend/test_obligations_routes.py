@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Tests for the obligations API (routes/obligations.py) and for loading
+obligations from the database with the obligations.csv fallback.
+
+Usage:
+    python test_obligations_routes.py
+"""
+
+import tempfile
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+from flask import Flask
+from jose import jwt
+
+import routes.obligations as obligations_routes
+import services.obligations_planner as planner
+from config import Config
+from models import db, Obligation as ObligationRow, User
+from services.obligations_store import bind_app
+
+JWT_SECRET = "test-secret"
+ADMIN_TOKEN = "test-admin-token"
+
+OBLIGATIONS_CSV = (
+    "user_id,event_id,name,category,amount,due_date,mandatory,importance,min_pay_date,max_pay_date\n"
+    "u1,rent,Rent,RENT_BILLS,1200,2025-11-05,1,5,2025-11-01,2025-11-05\n"
+    "u1,trip,Ski Trip,TRIP,400,2025-11-20,0,4,2025-11-15,2025-11-20\n"
+    "u2,gift,Gift,GIFT,50,2025-11-12,0,2,,\n"
+)
+
+
+def _app():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI="sqlite://",
+        SUPABASE_JWT_SECRET=JWT_SECRET,
+        SUPABASE_JWT_ISSUER="test-issuer",
+        ADMIN_API_TOKEN=ADMIN_TOKEN,
+    )
+    db.init_app(app)
+    app.register_blueprint(obligations_routes.obligations_bp)
+    return app
+
+
+def _auth(sub):
+    token = jwt.encode(
+        {"sub": sub, "aud": Config.SUPABASE_JWT_AUDIENCE, "iss": "test-issuer"},
+        JWT_SECRET,
+        algorithm="HS256",
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _user_id(app, sub):
+    with app.app_context():
+        return str(User.query.filter_by(external_sub=sub).one().id)
+
+
+def test_crud_is_scoped_to_the_authenticated_user():
+    app = _app()
+    client = app.test_client()
+    alice, bob = _auth("alice"), _auth("bob")
+    with app.app_context():
+        db.create_all()
+
+    created = client.post("/obligations", headers=alice, json={
+        "name": "Rent", "amount": 900, "due_date": "2025-11-05", "mandatory": True,
+        # Ignored: obligations always belong to the caller
+        "user_id": "u1",
+    })
+    assert created.status_code == 201
+    ob = created.get_json()
+    assert ob["user_id"] == _user_id(app, "alice") and ob["amount"] == 900.0
+
+    assert client.post("/obligations", headers=alice, json={"name": "x"}).status_code == 400
+    assert client.post("/obligations", headers=alice, json={
+        "name": "x", "amount": -1, "due_date": "2025-11-05",
+    }).status_code == 400
+    assert client.get("/obligations").status_code == 401
+
+    listed = client.get("/obligations?start=2025-11-01&end=2025-11-30", headers=alice).get_json()
+    assert [row["id"] for row in listed] == [ob["id"]]
+    assert client.get("/obligations?start=2025-12-01", headers=alice).get_json() == []
+
+    # Bob can neither see nor change Alice's obligation, even by naming her
+    assert client.get("/obligations", headers=bob).get_json() == []
+    assert client.get(f"/obligations?user_id={ob['user_id']}", headers=bob).get_json() == []
+    assert client.patch(f"/obligations/{ob['id']}?user_id={ob['user_id']}", headers=bob,
+                        json={"amount": 1}).status_code == 404
+    assert client.delete(f"/obligations/{ob['id']}?user_id={ob['user_id']}",
+                         headers=bob).status_code == 404
+
+    updated = client.patch(f"/obligations/{ob['id']}", headers=alice, json={"amount": 950.5})
+    assert updated.status_code == 200 and updated.get_json()["amount"] == 950.5
+    assert client.patch(f"/obligations/{ob['id']}", headers=alice,
+                        json={"due_date": "soon"}).status_code == 400
+
+    assert client.delete(f"/obligations/{ob['id']}", headers=alice).status_code == 200
+    assert client.get("/obligations", headers=alice).get_json() == []
+
+
+def test_recurring_crud_is_scoped_to_the_authenticated_user():
+    app = _app()
+    client = app.test_client()
+    alice, bob = _auth("alice"), _auth("bob")
+    with app.app_context():
+        db.create_all()
+
+    created = client.post("/obligations/recurring", headers=alice, json={
+        "name": "Rent", "amount": 1200, "day_of_month": 31, "start_date": "2025-01-01",
+        "pay_window_days": 5, "user_id": "u1",
+    })
+    assert created.status_code == 201
+    rule = created.get_json()
+    assert rule["user_id"] == _user_id(app, "alice") and rule["frequency"] == "monthly"
+
+    assert client.post("/obligations/recurring", headers=alice, json={
+        "name": "x", "amount": 1, "day_of_month": 32, "start_date": "2025-01-01",
+    }).status_code == 400
+    assert client.post("/obligations/recurring", headers=alice, json={
+        "name": "x", "amount": 1, "day_of_month": 1, "start_date": "2025-01-01",
+        "frequency": "weekly",
+    }).status_code == 400
+
+    assert client.get(f"/obligations/recurring?user_id={rule['user_id']}",
+                      headers=bob).get_json() == []
+    assert client.patch(f"/obligations/recurring/{rule['id']}?user_id={rule['user_id']}",
+                        headers=bob, json={"amount": 1}).status_code == 404
+    assert client.delete(f"/obligations/recurring/{rule['id']}?user_id={rule['user_id']}",
+                         headers=bob).status_code == 404
+
+    updated = client.patch(f"/obligations/recurring/{rule['id']}", headers=alice,
+                           json={"frequency": "quarterly"})
+    assert updated.status_code == 200 and updated.get_json()["frequency"] == "quarterly"
+    assert client.patch(f"/obligations/recurring/{rule['id']}", headers=alice,
+                        json={"end_date": "2024-01-01"}).status_code == 400
+
+    assert [r["id"] for r in client.get("/obligations/recurring", headers=alice).get_json()] == [rule["id"]]
+    assert client.delete(f"/obligations/recurring/{rule['id']}", headers=alice).status_code == 200
+    assert client.get("/obligations/recurring", headers=alice).get_json() == []
+
+
+def test_admin_import_is_idempotent():
+    app = _app()
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "obligations.csv").write_text(OBLIGATIONS_CSV)
+        original = obligations_routes.DATA_DIR
+        obligations_routes.DATA_DIR = Path(tmp)
+        try:
+            assert client.post("/admin/obligations/import").status_code == 403
+            admin = {"X-Admin-Token": ADMIN_TOKEN}
+            first = client.post("/admin/obligations/import", headers=admin).get_json()
+            second = client.post("/admin/obligations/import", headers=admin).get_json()
+        finally:
+            obligations_routes.DATA_DIR = original
+
+    assert first == {"imported": 3, "recurring_imported": 0, "skipped": 0}
+    assert second == {"imported": 0, "recurring_imported": 0, "skipped": 3}
+    with app.app_context():
+        rows = ObligationRow.query.order_by(ObligationRow.id).all()
+        assert [(r.user_id, r.event_id, r.amount_cents) for r in rows] == [
+            ("u1", "rent", 120000), ("u1", "trip", 40000), ("u2", "gift", 5000),
+        ]
+
+
+def test_loads_from_the_database_and_falls_back_to_csv():
+    app = _app()
+    window = (datetime(2025, 11, 1), datetime(2025, 11, 30))
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "obligations.csv").write_text(OBLIGATIONS_CSV)
+        original = planner.DATA_DIR
+        planner.DATA_DIR = Path(tmp)
+        bind_app(app)
+        try:
+            # No tables yet (migration not applied): obligations.csv
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                from_csv = planner.load_obligations_for_user("u1", *window)
+            assert [ob.event_id for ob in from_csv] == ["rent", "trip"]
+            assert any("using obligations.csv" in str(w.message) for w in caught)
+
+            with app.app_context():
+                db.create_all()
+                db.session.add(ObligationRow(
+                    user_id="u1", event_id="db-rent", name="Rent", category="RENT_BILLS",
+                    amount_cents=99900, due_date=datetime(2025, 11, 3), mandatory=True,
+                    importance=5.0,
+                ))
+                db.session.commit()
+            from_db = planner.load_obligations_for_user("u1", *window)
+        finally:
+            bind_app(None)
+            planner.DATA_DIR = original
+
+    assert [(ob.event_id, ob.amount) for ob in from_db] == [("db-rent", 999.0)]
+
+
+if __name__ == "__main__":
+    for test in (
+        test_crud_is_scoped_to_the_authenticated_user,
+        test_recurring_crud_is_scoped_to_the_authenticated_user,
+        test_admin_import_is_idempotent,
+        test_loads_from_the_database_and_falls_back_to_csv,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
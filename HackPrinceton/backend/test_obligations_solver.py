@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Tests for choosing and running the optional-obligations solvers
+(services/obligations_quantum.py): the solver registry, the process pool
+with its deadline and exact fallback, and optional_solver in summaries.
+
+Usage:
+    python test_obligations_solver.py
+"""
+
+import threading
+import time
+import warnings
+from datetime import datetime
+
+from services import obligations_quantum as quantum
+from services.obligations_planner import summarize_obligations
+from services.obligations_store import ObligationRecord
+
+EVENTS = [
+    {"event_id": "a", "amount": 60.0, "importance": 5.0},
+    {"event_id": "b", "amount": 50.0, "importance": 3.0},
+    {"event_id": "c", "amount": 50.0, "importance": 3.0},
+]
+
+
+# Pooled test solvers; module level so spawned workers can unpickle them
+def _pick_everything(events, budget):
+    return list(events)
+
+
+def _pick_first(events, budget):
+    return [min(events, key=lambda ev: ev["amount"])]
+
+
+def _fail(events, budget):
+    raise RuntimeError("solver crashed")
+
+
+def _sleep(events, budget):
+    time.sleep(30)
+    return []
+
+
+class _PooledSolvers:
+    """
+    Register the test solvers as pooled solvers with a short deadline,
+    and wait for the pool's workers unless warm is False.
+    """
+
+    def __init__(self, timeout_ms, warm=True):
+        self.timeout_ms = timeout_ms
+        self.warm = warm
+
+    def __enter__(self):
+        self._timeout = quantum.OBLIGATIONS_SOLVER_TIMEOUT_MS
+        quantum.OBLIGATIONS_SOLVER_TIMEOUT_MS = self.timeout_ms
+        for name, solve in (("everything", _pick_everything), ("first", _pick_first),
+                            ("fail", _fail), ("sleep", _sleep)):
+            quantum.SOLVERS[name] = solve
+            quantum.POOLED_SOLVERS.add(name)
+        quantum.clear_knapsack_memo()
+        if self.warm:
+            # Time solves, not starting the workers
+            quantum.warm_solver_pool("everything")
+            assert quantum._get_pool(60) is not None
+
+    def __exit__(self, *exc):
+        for name in ("everything", "first", "fail", "sleep"):
+            quantum.SOLVERS.pop(name)
+            quantum.POOLED_SOLVERS.discard(name)
+        quantum.OBLIGATIONS_SOLVER_TIMEOUT_MS = self._timeout
+        quantum.shutdown_solver_pool()
+        quantum.clear_knapsack_memo()
+
+
+def _ids(selection):
+    return [ev["event_id"] for ev in selection.chosen]
+
+
+def test_registry_picks_the_named_solver():
+    exact = quantum.select_optional_events(EVENTS, 100.0, solver="exact")
+    greedy = quantum.select_optional_events(EVENTS, 100.0, solver="greedy")
+    assert (exact.solver, _ids(exact)) == ("exact", ["b", "c"])
+    assert (greedy.solver, _ids(greedy)) == ("greedy", ["a"])
+    assert quantum.select_optional_events([], 100.0, solver="greedy") == ([], "greedy")
+
+    try:
+        quantum.select_optional_events(EVENTS, 100.0, solver="nope")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown solver should be rejected")
+
+    if not quantum._qiskit_installed():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            qaoa = quantum.select_optional_events(EVENTS, 100.0, solver="qaoa")
+        assert (qaoa.solver, _ids(qaoa)) == ("exact", ["b", "c"])
+
+
+def test_pooled_solver_deadline_and_fallbacks():
+    with _PooledSolvers(timeout_ms=1000), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        # Over budget, worse than exact, or failing: the exact answer is used
+        assert quantum.select_optional_events(EVENTS, 100.0, solver="everything") == (
+            [EVENTS[1], EVENTS[2]], "exact")
+        assert quantum.select_optional_events(EVENTS, 100.0, solver="first") == (
+            [EVENTS[1], EVENTS[2]], "exact")
+        assert quantum.select_optional_events(EVENTS, 100.0, solver="fail") == (
+            [EVENTS[1], EVENTS[2]], "exact")
+        # As good as exact: the pooled answer is used and memoized
+        assert quantum.select_optional_events(EVENTS, 500.0, solver="everything") == (
+            EVENTS, "everything")
+        assert quantum.get_knapsack_memo_stats()["entries"] == 1
+
+        _, generation = quantum._get_pool(0)
+        started = time.monotonic()
+        late = quantum.select_optional_events(EVENTS, 100.0, solver="sleep")
+        elapsed = time.monotonic() - started
+        assert late == ([EVENTS[1], EVENTS[2]], "exact")
+        # Waited out the deadline, not the solve, and dropped the busy workers
+        assert 1.0 <= elapsed < 10.0
+        assert quantum._pool_generation == generation + 1
+        assert quantum.get_knapsack_memo_stats()["entries"] == 1
+        # Replacements are already starting in the background
+        assert quantum._pool_start is not None and quantum._pool_start.generation == generation + 1
+        assert quantum._get_pool(60) is not None
+        assert quantum.select_optional_events(EVENTS, 600.0, solver="everything") == (
+            EVENTS, "everything")
+
+
+def test_starting_pool_does_not_block_solves():
+    original = quantum._start_pool
+    release = threading.Event()
+
+    def slow_start(start):
+        release.wait(30)
+        original(start)
+
+    quantum.shutdown_solver_pool()
+    quantum._start_pool = slow_start
+    try:
+        with _PooledSolvers(timeout_ms=300, warm=False), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            started = time.monotonic()
+            early = quantum.select_optional_events(EVENTS, 500.0, solver="everything")
+            elapsed = time.monotonic() - started
+            # Exact within the deadline while the workers start, and not memoized
+            assert early == (EVENTS, "exact")
+            assert elapsed < 2.0
+            assert quantum.get_knapsack_memo_stats()["entries"] == 0
+
+            release.set()
+            assert quantum._get_pool(60) is not None
+            assert quantum.select_optional_events(EVENTS, 500.0, solver="everything") == (
+                EVENTS, "everything")
+    finally:
+        release.set()
+        quantum._start_pool = original
+
+
+def test_falls_back_when_no_pool_can_start():
+    original = quantum._get_pool
+
+    def no_pool(timeout):
+        raise AssertionError("daemonic processes are not allowed to have children")
+
+    quantum._get_pool = no_pool
+    try:
+        with _PooledSolvers(timeout_ms=1000, warm=False), \
+                warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            selection = quantum.select_optional_events(EVENTS, 100.0, solver="everything")
+    finally:
+        quantum._get_pool = original
+
+    assert selection == ([EVENTS[1], EVENTS[2]], "exact")
+    assert any("solver pool unavailable" in str(w.message) for w in caught)
+
+
+def test_summary_reports_the_solver_used():
+    day = datetime(2025, 11, 20)
+    obligations = [
+        ObligationRecord("rent", "Rent", "RENT_BILLS", 500.0, day, True, 5.0, None, None),
+        ObligationRecord("trip", "Trip", "TRIP", 300.0, day, False, 4.0, None, None),
+    ]
+    summary = summarize_obligations(obligations, 1000.0, 0.0, 0.0, 0.0, solver="greedy")
+    assert summary["optional_solver"] == "greedy"
+    assert summary["chosen_optional_ids"] == ["trip"]
+    assert summarize_obligations(obligations[:1], 1000.0, 0.0, 0.0, 0.0)["optional_solver"] == "exact"
+    assert summarize_obligations([], 1000.0, 0.0, 0.0, 0.0)["optional_solver"] is None
+
+
+if __name__ == "__main__":
+    for test in (
+        test_registry_picks_the_named_solver,
+        test_pooled_solver_deadline_and_fallbacks,
+        test_starting_pool_does_not_block_solves,
+        test_falls_back_when_no_pool_can_start,
+        test_summary_reports_the_solver_used,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-user obligations index (services/obligations_store.py):
+range queries, users without obligations, and reloading on mtime change.
+
+Usage:
+    python test_obligations_store.py
+"""
+
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from services.obligations_store import (
+    ObligationRecord,
+    ObligationsIndex,
+    get_obligations_index,
+    load_by_mtime,
+)
+
+HEADER = "user_id,event_id,name,category,amount,due_date,mandatory,importance,min_pay_date,max_pay_date\n"
+
+
+def _ob(event_id, due_date):
+    return ObligationRecord(event_id, event_id, "RENT_BILLS", 10.0, due_date, True, 5.0, None, None)
+
+
+def _ids(obligations):
+    return [ob.event_id for ob in obligations]
+
+
+def nov(day):
+    return datetime(2025, 11, day)
+
+
+def test_range_query_boundaries():
+    index = ObligationsIndex.from_records([
+        ("u1", _ob("late", nov(30))),
+        ("u1", _ob("mid_a", nov(15))),
+        ("u1", _ob("start", nov(1))),
+        ("u1", _ob("mid_b", nov(15))),
+        ("u2", _ob("other", nov(15))),
+    ])
+    # Both ends are inclusive, and same-day obligations keep input order
+    assert _ids(index.query("u1", nov(1), nov(30))) == ["start", "mid_a", "mid_b", "late"]
+    assert _ids(index.query("u1", nov(15), nov(15))) == ["mid_a", "mid_b"]
+    assert _ids(index.query("u1", nov(2), nov(29))) == ["mid_a", "mid_b"]
+    assert _ids(index.query("u1", datetime(2025, 11, 15, 0, 0, 1), nov(30))) == ["late"]
+    assert index.query("u1", datetime(2025, 10, 1), datetime(2025, 10, 31)) == []
+    assert index.query("u1", datetime(2025, 12, 1), datetime(2025, 12, 31)) == []
+    assert index.query("u1", nov(30), nov(1)) == []
+    assert _ids(index.query("u2", nov(1), nov(30))) == ["other"]
+
+
+def test_users_without_rows():
+    index = ObligationsIndex.from_records([
+        ("u1", _ob("rent", datetime(2025, 11, 1))),
+        ("undated_only", _ob("undated", None)),
+    ])
+    # Undated obligations are left out, so that user has no rows at all
+    assert index.user_count() == 1 and len(index) == 1
+    assert index.query("undated_only", datetime.min, datetime.max) == []
+    assert index.query("nobody", datetime.min, datetime.max) == []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        header_only = Path(tmp) / "header_only.csv"
+        header_only.write_text(HEADER)
+        empty = Path(tmp) / "empty.csv"
+        empty.write_text("")
+        for csv_path in (header_only, empty):
+            loaded = ObligationsIndex.from_csv(csv_path)
+            assert len(loaded) == 0 and loaded.user_count() == 0
+            assert loaded.query("u1", datetime.min, datetime.max) == []
+
+
+def test_reloads_when_the_file_changes():
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "obligations.csv"
+        csv_path.write_text(HEADER + "u1,e1,Rent,RENT_BILLS,1200,2025-11-15,1,5,,\n")
+
+        first = get_obligations_index(csv_path)
+        assert _ids(first.query("u1", datetime(2025, 11, 1), datetime(2025, 11, 30))) == ["e1"]
+        assert get_obligations_index(csv_path) is first
+
+        csv_path.write_text(HEADER + "u1,e1,Rent,RENT_BILLS,1200,2025-11-15,1,5,,\n"
+                            "u1,e2,Gift,CLOTHING,80,2025-11-20,0,3,2025-11-10,2025-11-20\n")
+        # Make sure the mtime moves even on coarse-grained filesystems
+        stat = csv_path.stat()
+        os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        second = get_obligations_index(csv_path)
+        assert second is not first
+        assert _ids(second.query("u1", datetime(2025, 11, 1), datetime(2025, 11, 30))) == ["e1", "e2"]
+
+        csv_path.unlink()
+        assert get_obligations_index(csv_path) is None
+
+        builds = []
+
+        def build(path):
+            builds.append(path)
+            return len(builds)
+
+        other = Path(tmp) / "other.csv"
+        other.write_text(HEADER)
+        assert load_by_mtime(other, build, "test.load") == 1
+        assert load_by_mtime(other, build, "test.load") == 1
+        assert len(builds) == 1
+
+
+if __name__ == "__main__":
+    for test in (
+        test_range_query_boundaries,
+        test_users_without_rows,
+        test_reloads_when_the_file_changes,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
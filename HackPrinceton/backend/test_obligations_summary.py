@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the column-wise obligations summary (summarize_obligations in
+services/obligations_planner.py) against a plain row-by-row computation.
+
+Usage:
+    python test_obligations_summary.py
+"""
+
+import csv
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from services.obligations_planner import (
+    compute_obligations_summary,
+    summarize_obligations,
+    write_obligations_fixture,
+)
+from services.obligations_quantum import _solve_exact
+from services.obligations_store import ObligationsIndex
+
+START = datetime(2025, 11, 1)
+HORIZON_END = START + timedelta(days=30)
+
+
+def _reference_summary(rows, income, essentials, savings, buffer):
+    # One CSV row at a time, no shared code with the planner besides the
+    # exact solver
+    rows = sorted(rows, key=lambda r: datetime.fromisoformat(r["due_date"]))
+    mandatory_needed = 0.0
+    optional = []
+    for i, r in enumerate(rows):
+        if r["mandatory"] == "1":
+            mandatory_needed += float(r["amount"])
+        else:
+            optional.append({"event_id": r["event_id"], "amount": float(r["amount"]),
+                             "importance": float(r["importance"]), "row": i})
+    budget = max(0.0, income - mandatory_needed - essentials - savings - buffer)
+    chosen = _solve_exact(optional, budget) if optional and budget > 0 else []
+    chosen_rows = {ev["row"] for ev in chosen}
+    optional_needed = sum(ev["amount"] for ev in chosen)
+    reserved = mandatory_needed + optional_needed
+    return {
+        "mandatory_needed": mandatory_needed,
+        "optional_chosen_needed": optional_needed,
+        "reserved_obligations": reserved,
+        "free_to_spend": max(0.0, income - reserved - essentials - savings - buffer),
+        "chosen_optional_ids": [ev["event_id"] for ev in chosen],
+        "all_obligations": [
+            {
+                "event_id": r["event_id"],
+                "name": r["name"],
+                "category": r["category"],
+                "amount": float(r["amount"]),
+                "due_date": datetime.fromisoformat(r["due_date"]).isoformat(),
+                "mandatory": r["mandatory"] == "1",
+                "importance": float(r["importance"]),
+                "selected": r["mandatory"] == "1" or i in chosen_rows,
+            }
+            for i, r in enumerate(rows)
+        ],
+    }
+
+
+def test_summary_matches_row_by_row_reference():
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "obligations.csv"
+        write_obligations_fixture(csv_path, users=6, per_user=40, start=START, seed=3)
+        with open(csv_path, newline="") as f:
+            all_rows = list(csv.DictReader(f))
+        index = ObligationsIndex.from_csv(csv_path)
+
+        for u in range(6):
+            user_id = f"bench_u{u}"
+            rows = [r for r in all_rows if r["user_id"] == user_id]
+            for income in (0.0, 1500.0, 4000.0, 50000.0):
+                args = (income, 300.0, 200.0, 100.0)
+                summary = summarize_obligations(
+                    index.query(user_id, START, HORIZON_END), *args, solver="exact"
+                )
+                expected = _reference_summary(rows, *args)
+                assert summary["optional_solver"] == "exact"
+                for key, value in expected.items():
+                    assert summary[key] == value, (user_id, income, key)
+
+            # The same through the loader, with the CSV passed as data_dir
+            loaded = compute_obligations_summary(user_id, START, 4000.0, 300.0, 200.0, 100.0,
+                                                 solver="exact", data_dir=Path(tmp))
+            assert loaded["chosen_optional_ids"] == _reference_summary(
+                rows, 4000.0, 300.0, 200.0, 100.0)["chosen_optional_ids"]
+
+
+if __name__ == "__main__":
+    for test in (
+        test_summary_matches_row_by_row_reference,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the array-backed user profile store (services/profile_store.py).
+
+Usage:
+    python test_profile_store.py
+"""
+
+import tempfile
+
+import numpy as np
+
+import services.profile_store as profile_store
+from services.profile_store import ProfileStore
+
+ROWS = [
+    ("u1", "Saver", 4200.0),
+    ("u2", "Spender", 3100.5),
+    ("ünï", "Average", 2800.0),
+    ("u1", "Spender", 5000.0),
+]
+
+
+def test_save_and_load_memory_mapped():
+    store = ProfileStore.from_rows(ROWS)
+    with tempfile.TemporaryDirectory() as tmp:
+        store.save(tmp)
+        loaded = ProfileStore.load(tmp)
+        assert all(isinstance(getattr(loaded, name), np.memmap) for name in profile_store._ARRAY_NAMES
+                   if getattr(loaded, name).size)
+        for user_id in ("u1", "u2", "ünï"):
+            assert loaded.get(user_id) == store.get(user_id)
+        assert len(loaded) == len(store) == 3
+        assert ProfileStore.load(tmp, mmap=False).get("u2") == {
+            "profile_type": "Spender", "monthly_income": 3100.5,
+        }
+        del loaded
+
+
+def test_duplicates_keep_the_last_row():
+    store = ProfileStore.from_rows(ROWS)
+    assert len(store) == 3
+    assert store.get("u1") == {"profile_type": "Spender", "monthly_income": 5000.0}
+    assert store.get("ünï")["profile_type"] == "Average"
+
+
+def test_missing_ids_and_hash_collisions():
+    store = ProfileStore.from_rows(ROWS)
+    assert store.get("u3") is None and "u3" not in store
+    assert "" not in store
+    assert ProfileStore.from_rows([]).get("u1") is None
+
+    # Every id hashes alike: lookups must still tell users apart by id
+    original = profile_store._hash_user_id
+    profile_store._hash_user_id = lambda user_id: 12345
+    try:
+        colliding = ProfileStore.from_rows(ROWS + [("u9", "Saver", 10.0)])
+        assert colliding.get("u2")["monthly_income"] == 3100.5
+        assert colliding.get("u9")["monthly_income"] == 10.0
+        assert colliding.get("u1")["monthly_income"] == 5000.0
+        assert colliding.get("u3") is None
+        assert len(colliding) == 4
+    finally:
+        profile_store._hash_user_id = original
+
+
+if __name__ == "__main__":
+    for test in (
+        test_save_and_load_memory_mapped,
+        test_duplicates_keep_the_last_row,
+        test_missing_ids_and_hash_collisions,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
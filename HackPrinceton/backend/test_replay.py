@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline replay engine (services/replay.py).
+
+Replays data/transactions.csv and checks that decisions do not depend on
+how users are sharded across worker processes.
+
+Usage:
+    python test_replay.py
+"""
+
+import csv
+import os
+import tempfile
+
+from services.replay import DEFAULT_INPUT, _split_input, run_replay, shard_of
+
+
+def _decisions(path):
+    with open(path, newline="") as f:
+        return sorted(
+            (r["user_id"], r["timestamp"], r["amount"], r["decision"], r["p_avoid"])
+            for r in csv.DictReader(f)
+        )
+
+
+def test_replay_is_independent_of_sharding():
+    with open(DEFAULT_INPUT) as f:
+        expected_rows = sum(1 for _ in f) - 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        one = os.path.join(tmp, "one.csv")
+        three = os.path.join(tmp, "three.csv")
+        report_one = run_replay(output_path=one, workers=1)
+        report_three = run_replay(output_path=three, workers=3)
+
+        assert report_one["rows"] == report_three["rows"] == expected_rows
+        assert report_one["confusion"] == report_three["confusion"]
+        assert report_one["block_rate_by_profile"] == report_three["block_rate_by_profile"]
+        assert _decisions(one) == _decisions(three)
+
+
+
+def test_input_is_split_by_user_in_one_pass():
+    with open(DEFAULT_INPUT, newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _split_input(DEFAULT_INPUT, 3, tmp)
+        assert len(paths) == 3
+        seen = []
+        for shard, path in enumerate(paths):
+            with open(path, newline="") as f:
+                shard_rows = list(csv.DictReader(f))
+            assert all(shard_of(r["user_id"], 3) == shard for r in shard_rows)
+            seen.extend(shard_rows)
+        key = lambda r: (r["user_id"], r["timestamp"], r["amount"])
+        assert sorted(seen, key=key) == sorted(rows, key=key)
+
+
+if __name__ == "__main__":
+    for test in (
+        test_replay_is_independent_of_sharding,
+        test_input_is_split_by_user_in_one_pass,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
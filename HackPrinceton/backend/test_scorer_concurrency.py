@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Stress tests for running the transaction scorer from many threads.
+
+Hammers the same user and many different users concurrently and checks the
+final monthly spend totals and the per-transaction spend_before values.
+
+Usage:
+    python test_scorer_concurrency.py
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import services.transaction_scorer as ts
+from services.spend_store import SpendCounterStore
+from services.state_backend import InProcessBackend, set_state_backend
+
+THREADS = 32
+TIMESTAMP = "2025-11-09T10:00:00"
+MONTH = "2025-11"
+
+
+def _fresh_spend_store():
+    backend = InProcessBackend()
+    set_state_backend(backend)
+    ts.SPEND_STORE = SpendCounterStore(backend)
+
+
+def _score(user_id, amount=1.0, merchant_name="Zara"):
+    return ts.score_transaction(
+        user_id=user_id,
+        amount=amount,
+        merchant_name=merchant_name,
+        timestamp=TIMESTAMP,
+    )
+
+
+def test_same_user_is_serialized():
+    _fresh_spend_store()
+    n = 600
+    with ThreadPoolExecutor(THREADS) as ex:
+        results = list(ex.map(lambda _: _score("stress_same"), range(n)))
+
+    # Every transaction saw exactly the spend of the ones before it
+    befores = sorted(r["debug"]["spend_before"] for r in results)
+    assert befores == [float(i) for i in range(n)]
+    assert ts.SPEND_STORE.get_month("stress_same", MONTH) == {"CLOTHING": float(n)}
+
+
+def test_different_users_totals():
+    _fresh_spend_store()
+    users = [f"stress_u{i}" for i in range(100)]
+    per_user = 8
+    jobs = [(u, float(k % 5 + 1)) for k in range(per_user) for u in users]
+    with ThreadPoolExecutor(THREADS) as ex:
+        list(ex.map(lambda job: _score(job[0], job[1]), jobs))
+
+    expected = float(sum(k % 5 + 1 for k in range(per_user)))
+    for u in users:
+        assert ts.SPEND_STORE.get_month(u, MONTH) == {"CLOTHING": expected}
+
+
+def test_mixed_categories_same_user():
+    _fresh_spend_store()
+    merchants = ["Zara", "Whole Foods", "Uber", "Netflix"]
+    n = 400
+    with ThreadPoolExecutor(THREADS) as ex:
+        list(ex.map(lambda i: _score("stress_mixed", 2.0, merchants[i % 4]), range(n)))
+
+    totals = ts.SPEND_STORE.get_month("stress_mixed", MONTH)
+    assert totals == {
+        "CLOTHING": 200.0,
+        "GROCERIES": 200.0,
+        "TRANSPORT": 200.0,
+        "SUBSCRIPTION": 200.0,
+    }
+
+
+def test_unknown_users_get_default_profile():
+    _fresh_spend_store()
+    known = len(ts._get_profiles())
+    with ThreadPoolExecutor(THREADS) as ex:
+        prepared = list(ex.map(lambda i: ts._prepare_transaction(f"stress_new_user_{i}", 1.0, "Zara"), range(500)))
+    assert len(ts._get_profiles()) == known
+    assert {p["profile_type"] for p in prepared} == {ts.DEFAULT_PROFILE["profile_type"]}
+    assert {p["income"] for p in prepared} == {ts.DEFAULT_PROFILE["monthly_income"]}
+
+
+if __name__ == "__main__":
+    for test in (
+        test_same_user_is_serialized,
+        test_different_users_totals,
+        test_mixed_categories_same_user,
+        test_unknown_users_get_default_profile,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for shadow model evaluation (services/shadow_eval.py).
+
+Usage:
+    python test_shadow_eval.py
+"""
+
+import tempfile
+import threading
+from pathlib import Path
+
+from services.shadow_eval import ShadowEvaluator, report_from_log
+
+
+def _primary(p_avoid, decision):
+    return {"p_avoid": p_avoid, "decision": decision, "debug": {"model_version": "primary"}}
+
+
+def _evaluator(score_fn, **kwargs):
+    evaluator = ShadowEvaluator(["shadow"], score_fn, **kwargs)
+    # Skip loading a real bundle from models/
+    evaluator._bundles["shadow"] = object()
+    return evaluator
+
+
+def test_saturated_pool_drops_and_report_is_correct():
+    gate = threading.Event()
+
+    def score_fn(prepared, primary_debug, bundle):
+        gate.wait(10)
+        if prepared["amount"] < 0:
+            raise ValueError("bad row")
+        return (0.9, "BLOCK") if prepared["amount"] > 50 else (0.1, "ALLOW")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = Path(tmp) / "shadow.csv"
+        evaluator = _evaluator(score_fn, max_workers=1, max_pending=3, log_path=log_path)
+        try:
+            accepted = [
+                evaluator.submit({"user_id": "u1", "amount": 80.0}, _primary(0.8, "BLOCK")),
+                evaluator.submit({"user_id": "u1", "amount": 10.0}, _primary(0.7, "BLOCK")),
+                evaluator.submit({"user_id": "u2", "amount": -1.0}, _primary(0.2, "ALLOW")),
+            ]
+            # Every slot is held by a blocked or waiting job: the rest are dropped
+            dropped = [
+                evaluator.submit({"user_id": "u3", "amount": 5.0}, _primary(0.1, "ALLOW"))
+                for _ in range(4)
+            ]
+            assert accepted == [True, True, True] and dropped == [False] * 4
+            assert evaluator.report()["submitted"] == 3 and evaluator.report()["dropped"] == 4
+        finally:
+            gate.set()
+            evaluator.close()
+
+        report = evaluator.report()
+        stats = report["versions"]["shadow"]
+        assert (report["submitted"], report["dropped"], report["max_pending"]) == (3, 4, 3)
+        assert stats["scored"] == 2 and stats["errors"] == 1
+        assert stats["agreement_rate"] == 0.5
+        assert stats["primary_only_block"] == 1 and stats["shadow_only_block"] == 0
+        assert stats["mean_abs_p_avoid_diff"] == 0.35
+        assert stats["latency_ms"]["p50"] is not None
+
+        logged = report_from_log(log_path)["shadow"]
+        assert logged["scored"] == 2 and logged["agreement_rate"] == 0.5
+        assert logged["primary_only_block"] == 1
+
+
+def test_counts_are_exact_under_concurrent_submits():
+    evaluator = _evaluator(lambda prepared, primary_debug, bundle: (0.1, "ALLOW"),
+                           max_workers=2, max_pending=4, log_path=None)
+    start = threading.Barrier(8)
+
+    def submit_many():
+        start.wait()
+        for _ in range(500):
+            evaluator.submit({"user_id": "u1", "amount": 1.0}, _primary(0.1, "ALLOW"))
+
+    threads = [threading.Thread(target=submit_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    evaluator.close()
+
+    report = evaluator.report()
+    assert report["submitted"] + report["dropped"] == 8 * 500
+    assert report["versions"]["shadow"]["scored"] == report["submitted"]
+    # Nothing is accepted once the pool is shut down
+    assert evaluator.submit({"user_id": "u1", "amount": 1.0}, _primary(0.1, "ALLOW")) is False
+    assert evaluator.report()["submitted"] == report["submitted"]
+    assert evaluator.report()["dropped"] == report["dropped"] + 1
+
+
+if __name__ == "__main__":
+    for test in (
+        test_saturated_pool_drops_and_report_is_correct,
+        test_counts_are_exact_under_concurrent_submits,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for per-stage scoring latency (services/stage_timing.py) and the
+/score-transaction/stage-timings endpoint.
+
+Usage:
+    python test_stage_timing.py
+"""
+
+from flask import Flask
+
+import services.stage_timing as stage_timing
+import services.transaction_scorer as ts
+from config import Config
+from models import db
+from routes.transaction_scoring import transaction_scoring_bp
+from services.spend_store import SpendCounterStore
+from services.stage_timing import NULL_TIMER, StageHistogram, StageTimer, start_timer
+from services.state_backend import InProcessBackend, set_state_backend
+
+ADMIN = {"X-Admin-Token": "test-admin-token"}
+
+
+def test_histogram_buckets_and_percentiles():
+    hist = StageHistogram()
+    for ns in [500] * 50 + [3_000] * 45 + [10_000_000] * 5:
+        hist.record(ns)
+    snap = hist.snapshot()
+    assert snap["count"] == 100
+    assert snap["buckets"] == {"1": 50, "4": 45, "16384": 5}
+    assert snap["p50_us"] == 1.0 and snap["p95_us"] == 4.0 and snap["p99_us"] == 16384.0
+    assert snap["max_us"] == 10000.0
+    assert StageHistogram().snapshot()["p50_us"] is None
+
+
+def test_timer_laps_and_breakdown():
+    timer = StageTimer(histograms=False, breakdown=True)
+    timer.add("model", 2_000_000)
+    timer.add("model", 500_000)
+    timer.lap("rules")
+    timer.finish()
+    report = timer.report()
+    assert report["model"] == 2.5
+    assert set(report) == {"model", "rules", "total"}
+    assert report["total"] >= report["rules"] >= 0.0
+
+    # Off and no breakdown asked for: the shared no-op timer
+    was_enabled = stage_timing.is_enabled()
+    stage_timing.set_enabled(False)
+    try:
+        assert start_timer() is NULL_TIMER and NULL_TIMER.report() == {}
+        assert start_timer(breakdown=True).breakdown == {}
+    finally:
+        stage_timing.set_enabled(was_enabled)
+
+
+def _client():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["ADMIN_API_TOKEN"] = ADMIN["X-Admin-Token"]
+    db.init_app(app)
+    app.register_blueprint(transaction_scoring_bp)
+    return app.test_client()
+
+
+def test_stage_timings_endpoint_and_idempotent_results():
+    backend = InProcessBackend()
+    set_state_backend(backend)
+    ts.SPEND_STORE = SpendCounterStore(backend)
+    client = _client()
+    was_enabled = stage_timing.is_enabled()
+    stage_timing.set_enabled(True)
+    try:
+        assert client.delete("/score-transaction/stage-timings", headers=ADMIN).get_json()["stages"] == {}
+
+        body = {"user_id": "timing_u", "amount": 12.0, "merchant_name": "Zara",
+                "timestamp": "2025-11-09T10:00:00", "transaction_id": "timing-tx-1"}
+        first = client.post("/score-transaction", json={**body, "debug_timing": True}).get_json()
+        assert first["debug"]["timing_ms"]["total"] > 0
+
+        timings = client.get("/score-transaction/stage-timings").get_json()
+        assert timings["enabled"] is True
+        assert timings["stages"]["total"]["count"] == 1
+        assert sum(timings["stages"]["total"]["buckets"].values()) == 1
+
+        # The retry gets the stored decision, without the first call's timing
+        retry = client.post("/score-transaction", json=body).get_json()
+        assert retry["debug"]["idempotent_replay"] is True
+        assert "timing_ms" not in retry["debug"]
+        assert retry["decision"] == first["decision"] and retry["p_avoid"] == first["p_avoid"]
+
+        timed_retry = client.post("/score-transaction", headers={"X-Debug-Timing": "1"},
+                                  json=body).get_json()
+        assert set(timed_retry["debug"]["timing_ms"]) == {"total"}
+
+        # Only admins can clear the histograms
+        recorded = client.get("/score-transaction/stage-timings").get_json()["stages"]
+        assert recorded["total"]["count"] > 0
+        assert client.delete("/score-transaction/stage-timings").status_code == 403
+        assert client.delete("/score-transaction/stage-timings",
+                             headers={"X-Admin-Token": "wrong"}).status_code == 403
+        assert client.get("/score-transaction/stage-timings").get_json()["stages"] == recorded
+        assert client.delete("/score-transaction/stage-timings", headers=ADMIN).get_json()["stages"] == {}
+    finally:
+        stage_timing.set_enabled(was_enabled)
+
+
+if __name__ == "__main__":
+    for test in (
+        test_histogram_buckets_and_percentiles,
+        test_timer_laps_and_breakdown,
+        test_stage_timings_endpoint_and_idempotent_results,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
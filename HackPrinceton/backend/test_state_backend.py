@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared state backends used by the scorer and geo-guardian.
+
+The SQLite tests run several worker processes against one database file and
+check that increments and compare-and-set never lose updates.
+
+Usage:
+    python test_state_backend.py
+"""
+
+import os
+import tempfile
+from multiprocessing import Pool
+
+from services.spend_store import SpendCounterStore
+from services.state_backend import InProcessBackend, SQLiteBackend, get_state_backend, set_state_backend
+
+WORKERS = 4
+OPS_PER_WORKER = 200
+
+
+def _incr_worker(path):
+    backend = SQLiteBackend(path)
+    for _ in range(OPS_PER_WORKER):
+        backend.incr("test", "counter", 1.0)
+
+
+def _cas_worker(path):
+    backend = SQLiteBackend(path)
+    for _ in range(OPS_PER_WORKER):
+        while True:
+            current = backend.get("test", "cas_counter")
+            if backend.compare_and_set("test", "cas_counter", current, (current or 0) + 1):
+                break
+
+
+def _spend_worker(path):
+    store = SpendCounterStore(SQLiteBackend(path))
+    for _ in range(OPS_PER_WORKER):
+        while True:
+            before = store.get_month("u1", "2025-11").get("CLOTHING", 0.0)
+            if store.add_if_unchanged("u1", "2025-11", "CLOTHING", before, 1.0):
+                break
+
+
+def _run_workers(target):
+    path = os.path.join(tempfile.mkdtemp(), "state.db")
+    SQLiteBackend(path)  # create the schema before workers race on it
+    with Pool(WORKERS) as pool:
+        pool.map(target, [path] * WORKERS)
+    return SQLiteBackend(path)
+
+
+def test_sqlite_incr_across_processes():
+    backend = _run_workers(_incr_worker)
+    assert backend.get("test", "counter") == WORKERS * OPS_PER_WORKER
+
+
+def test_sqlite_cas_across_processes():
+    backend = _run_workers(_cas_worker)
+    assert backend.get("test", "cas_counter") == WORKERS * OPS_PER_WORKER
+
+
+def test_spend_store_across_processes():
+    backend = _run_workers(_spend_worker)
+    store = SpendCounterStore(backend)
+    assert store.get_month("u1", "2025-11") == {"CLOTHING": float(WORKERS * OPS_PER_WORKER)}
+
+
+def test_spend_cache_sees_other_process_writes():
+    path = os.path.join(tempfile.mkdtemp(), "state.db")
+    store = SpendCounterStore(SQLiteBackend(path))
+    store.add("u1", "2025-11", "CLOTHING", 5.0)
+    assert store.get_month("u1", "2025-11") == {"CLOTHING": 5.0}
+
+    with Pool(1) as pool:
+        pool.map(_incr_other_store, [path])
+
+    assert store.get_month("u1", "2025-11") == {"CLOTHING": 12.0}
+
+
+def _incr_other_store(path):
+    SpendCounterStore(SQLiteBackend(path)).add("u1", "2025-11", "CLOTHING", 7.0)
+
+
+def test_compare_and_set_semantics():
+    for backend in (InProcessBackend(), SQLiteBackend(":memory:")):
+        assert backend.compare_and_set("ns", "k", None, {"a": 1})
+        assert not backend.compare_and_set("ns", "k", None, {"a": 2})
+        assert not backend.compare_and_set("ns", "k", {"a": 3}, {"a": 4})
+        assert backend.compare_and_set("ns", "k", {"a": 1}, {"a": 5})
+        assert backend.get("ns", "k") == {"a": 5}
+        assert backend.incr("ns", "n", 2.5) == 2.5
+        assert backend.scan_prefix("ns", "k") == {"k": {"a": 5}}
+
+
+def test_set_state_backend_swaps_and_restores():
+    replacement = InProcessBackend()
+    previous = set_state_backend(replacement)
+    try:
+        assert get_state_backend() is replacement
+    finally:
+        assert set_state_backend(previous) is replacement
+    assert get_state_backend() is not replacement
+
+
+if __name__ == "__main__":
+    for test in (
+        test_sqlite_incr_across_processes,
+        test_sqlite_cas_across_processes,
+        test_spend_store_across_processes,
+        test_spend_cache_sees_other_process_writes,
+        test_compare_and_set_semantics,
+        test_set_state_backend_swaps_and_restores,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")
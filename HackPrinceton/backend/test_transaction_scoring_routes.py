@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk scoring endpoints in routes/transaction_scoring.py.
+
+Usage:
+    python test_transaction_scoring_routes.py
+"""
+
+import json
+
+from flask import Flask
+
+import routes.transaction_scoring as scoring_routes
+import services.transaction_scorer as ts
+from config import Config
+from models import db
+from services.spend_store import SpendCounterStore
+from services.state_backend import InProcessBackend, set_state_backend
+
+TIMESTAMP = "2025-11-09T10:00:00"
+MONTH = "2025-11"
+
+
+def _client():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    app.register_blueprint(scoring_routes.transaction_scoring_bp)
+    return app.test_client()
+
+
+def _fresh_spend_store():
+    backend = InProcessBackend()
+    set_state_backend(backend)
+    ts.SPEND_STORE = SpendCounterStore(backend)
+
+
+def _tx(user_id, amount, merchant_name="Zara", **extra):
+    return {"user_id": user_id, "amount": amount, "merchant_name": merchant_name,
+            "timestamp": TIMESTAMP, **extra}
+
+
+def _ndjson(client, lines):
+    body = "".join(line + "\n" for line in lines)
+    response = client.post("/score-transactions/stream", data=body,
+                           content_type="application/x-ndjson")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_stream_scores_good_lines_and_reports_bad_ones():
+    _fresh_spend_store()
+    original_max = scoring_routes.MAX_STREAM_LINE_BYTES
+    scoring_routes.MAX_STREAM_LINE_BYTES = 200
+    try:
+        out = _ndjson(_client(), [
+            json.dumps(_tx("stream_u", 5.0, transaction_id="t1")),
+            "{not json",
+            json.dumps(_tx("stream_u", 7.0, merchant_name="Z" * 300)),
+            json.dumps({"user_id": "stream_u", "amount": 1.0}),
+            "",
+            json.dumps(_tx("stream_u", 3.0, transaction_id="t6")),
+        ])
+    finally:
+        scoring_routes.MAX_STREAM_LINE_BYTES = original_max
+
+    by_line = {row["line"]: row for row in out if "line" in row}
+    assert sorted(by_line) == [1, 2, 3, 4, 6]
+    assert [row.get("line") for row in out[:-1]] == [1, 2, 3, 4, 6]
+    assert by_line[1]["transaction_id"] == "t1" and by_line[1]["decision"] in ("ALLOW", "BLOCK")
+    assert "error" in by_line[2]
+    assert by_line[3]["error"] == "line longer than 200 bytes"
+    assert by_line[4]["error"] == "amount and merchant_name are required"
+    assert by_line[6]["debug"]["spend_before"] == 5.0
+    assert out[-1] == {"summary": {"scored": 2, "errors": 3}}
+    assert ts.SPEND_STORE.get_month("stream_u", MONTH) == {"CLOTHING": 8.0}
+
+
+def test_failed_row_does_not_fail_rows_already_recorded():
+    _fresh_spend_store()
+    original = ts._apply_decision
+
+    def apply_decision(prepared, p_ml, model_version):
+        if prepared["amount"] == 13.0:
+            raise RuntimeError("row failed")
+        return original(prepared, p_ml, model_version)
+
+    ts._apply_decision = apply_decision
+    try:
+        client = _client()
+        out = _ndjson(client, [
+            json.dumps(_tx("partial_u", 2.0)),
+            json.dumps(_tx("partial_u", 13.0)),
+            json.dumps(_tx("partial_u", 4.0)),
+        ])
+        batch = client.post("/score-transactions/batch", json={"transactions": [
+            _tx("partial_b", 2.0), _tx("partial_b", 13.0), _tx("partial_b", 4.0),
+        ]})
+    finally:
+        ts._apply_decision = original
+
+    assert [row.get("error") for row in out[:3]] == [None, "row failed", None]
+    assert out[2]["debug"]["spend_before"] == 2.0
+    assert out[-1] == {"summary": {"scored": 2, "errors": 1}}
+    assert ts.SPEND_STORE.get_month("partial_u", MONTH) == {"CLOTHING": 6.0}
+
+    assert batch.status_code == 200
+    results = batch.get_json()["results"]
+    assert results[1] == {"error": "row failed"}
+    assert results[2]["debug"]["spend_before"] == 2.0
+    assert ts.SPEND_STORE.get_month("partial_b", MONTH) == {"CLOTHING": 6.0}
+
+
+def test_non_numeric_fields_are_rejected_per_item():
+    _fresh_spend_store()
+    client = _client()
+    out = _ndjson(client, [
+        json.dumps({"user_id": "typed_u", "amount": {"a": 1}, "merchant_name": "x"}),
+        json.dumps(_tx("typed_u", 5.0, mcc=[5411])),
+        json.dumps(_tx("typed_u", 5.0, mcc="abc")),
+        json.dumps(_tx("typed_u", 5.0, merchant_name=["Zara"])),
+        json.dumps(_tx("typed_u", 4.0)),
+    ])
+    assert [row.get("error") for row in out[:4]] == [
+        "amount must be a number", "mcc must be an integer",
+        "mcc must be an integer", "merchant_name must be a string",
+    ]
+    assert out[4]["line"] == 5 and out[4]["decision"] in ("ALLOW", "BLOCK")
+    assert out[-1] == {"summary": {"scored": 1, "errors": 4}}
+
+    for bad, message in (({"amount": [1]}, "amount must be a number"),
+                         ({"mcc": {"code": 1}}, "mcc must be an integer")):
+        response = client.post("/score-transactions/batch", json={"transactions": [
+            _tx("typed_b", 1.0), {**_tx("typed_b", 2.0), **bad},
+        ]})
+        assert response.status_code == 400
+        assert response.get_json() == {"error": f"transactions[1]: {message}"}
+    # Rejected requests score nothing
+    assert ts.SPEND_STORE.get_month("typed_b", MONTH) == {}
+
+
+if __name__ == "__main__":
+    for test in (
+        test_stream_scores_good_lines_and_reports_bad_ones,
+        test_failed_row_does_not_fail_rows_already_recorded,
+        test_non_numeric_fields_are_rejected_per_item,
+    ):
+        test()
+        print(f"✅ PASS - {test.__name__}")